@@ -0,0 +1,74 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import List, Tuple
+from utils.distance import haversine_matrix
+
+# City-sized bounding box the synthetic stops are drawn from (about 20 x 20 km)
+CITY_CENTER = (40.7128, -74.0060)
+CITY_SPAN_DEGREES = (0.18, 0.24)
+
+INSTANCE_KINDS = ("uniform", "clustered", "hub")
+INSTANCE_SIZES = (10, 50, 100, 500, 1000, 2000)
+
+@dataclass
+class Instance:
+    """A round trip from a depot through n stops"""
+    name: str
+    kind: str
+    size: int
+    seed: int
+    depot: Tuple[float, float]
+    stops: List[Tuple[float, float]]
+
+    @property
+    def points(self) -> List[Tuple[float, float]]:
+        # Node 0 is the depot, nodes 1..n the stops, node n + 1 the depot again
+        return [self.depot, *self.stops, self.depot]
+
+    def distance_matrix(self) -> np.ndarray:
+        """Straight-line distance matrix (km) over depot, stops, depot"""
+        points = self.points
+        return haversine_matrix(points, points)
+
+def _uniform(rng: np.random.Generator, n: int) -> np.ndarray:
+    return rng.uniform(-0.5, 0.5, size=(n, 2))
+
+def _clustered(rng: np.random.Generator, n: int) -> np.ndarray:
+    """Gaussian blobs (hospital campuses, residential blocks) plus 10% scattered stops"""
+    clusters = max(2, n // 50)
+    centres = rng.uniform(-0.4, 0.4, size=(clusters, 2))
+    scattered = n // 10
+    members = rng.integers(0, clusters, size=n - scattered)
+    blob_points = centres[members] + rng.normal(0, 0.02, size=(n - scattered, 2))
+    return np.vstack((blob_points, _uniform(rng, scattered)))
+
+def _hub(rng: np.random.Generator, n: int) -> np.ndarray:
+    """Stops strung along spokes radiating from a few hubs (arterial roads)"""
+    hubs = rng.uniform(-0.3, 0.3, size=(max(1, n // 200 + 1), 2))
+    spokes_per_hub = 6
+    hub_index = rng.integers(0, len(hubs), size=n)
+    angles = rng.integers(0, spokes_per_hub, size=n) * (2 * np.pi / spokes_per_hub) + rng.normal(0, 0.05, size=n)
+    radius = rng.exponential(0.12, size=n)
+    offsets = np.column_stack((np.cos(angles), np.sin(angles))) * radius[:, np.newaxis]
+    return np.clip(hubs[hub_index] + offsets, -0.5, 0.5)
+
+_GENERATORS = {
+    "uniform": _uniform,
+    "clustered": _clustered,
+    "hub": _hub
+}
+
+def generate_instance(kind: str, size: int, seed: int = 0) -> Instance:
+    """Reproducible synthetic instance: same kind, size and seed give the same stops"""
+    rng = np.random.default_rng([seed, INSTANCE_KINDS.index(kind), size])
+    unit = _GENERATORS[kind](rng, size)
+    latitudes = CITY_CENTER[0] + unit[:, 0] * CITY_SPAN_DEGREES[0]
+    longitudes = CITY_CENTER[1] + unit[:, 1] * CITY_SPAN_DEGREES[1]
+    return Instance(
+        name=f"{kind}-{size}-s{seed}",
+        kind=kind,
+        size=size,
+        seed=seed,
+        depot=CITY_CENTER,
+        stops=list(zip(latitudes.tolist(), longitudes.tolist()))
+    )
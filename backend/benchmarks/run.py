@@ -0,0 +1,188 @@
+"""
+Route optimizer benchmark over reproducible synthetic instances.
+
+Usage (from the backend directory):
+    python -m benchmarks.run [--kinds uniform clustered hub] [--sizes 10 50 100]
+                             [--seed 0] [--time-limit 2] [--google]
+                             [--output results.json] [--update-best-known]
+                             [--fail-gap 0.05]
+
+Every instance is a round trip from a depot through n stops (the shape
+optimize_route solves when no destination is given). Each strategy is
+timed, its peak Python/NumPy memory is traced in a second run, and its
+tour length is compared with the best-known length for the instance
+(benchmarks/best_known.json, or the best of this run if better).
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from dotenv import load_dotenv
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+load_dotenv(ROOT_DIR / '.env')
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import numpy as np
+from benchmarks.instances import INSTANCE_KINDS, INSTANCE_SIZES, Instance, generate_instance
+from solvers.tsp import EXACT_MAX_STOPS, held_karp, nearest_neighbour, route_cost, solve_open_tsp
+from utils.google_maps import GOOGLE_MAX_OPTIMIZED_WAYPOINTS, LOCAL_OPTIMIZER_TIME_LIMIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+BEST_KNOWN_PATH = Path(__file__).resolve().parent / "best_known.json"
+
+Strategy = Callable[[Instance, np.ndarray, float], Optional[List[int]]]
+
+def _fallback_order(instance: Instance, cost: np.ndarray, time_limit: float) -> List[int]:
+    """Stops in the order given, as optimize_route returns when no optimizer is available"""
+    return list(range(cost.shape[0]))
+
+def _nearest_neighbour(instance: Instance, cost: np.ndarray, time_limit: float) -> List[int]:
+    return nearest_neighbour(cost)
+
+def _local(instance: Instance, cost: np.ndarray, time_limit: float) -> List[int]:
+    route, _ = solve_open_tsp(cost, time_limit_seconds=time_limit)
+    return route
+
+def _exact(instance: Instance, cost: np.ndarray, time_limit: float) -> Optional[List[int]]:
+    if instance.size > EXACT_MAX_STOPS:
+        return None
+    return held_karp(cost)
+
+def _google(instance: Instance, cost: np.ndarray, time_limit: float) -> Optional[List[int]]:
+    """Directions API optimize:true (only with an API key and at most 23 stops)"""
+    from utils.google_maps import _api_key_configured, close_maps_client, optimize_route
+    if not _api_key_configured() or instance.size > GOOGLE_MAX_OPTIMIZED_WAYPOINTS:
+        return None
+
+    async def _run():
+        try:
+            return await optimize_route(instance.depot, instance.stops, instance.depot, strategy="google")
+        finally:
+            await close_maps_client()
+
+    result = asyncio.run(_run())
+    if not result or result.get("strategy") != "google":
+        return None
+    return [0] + [index + 1 for index in result["waypoint_order"]] + [instance.size + 1]
+
+STRATEGIES: Dict[str, Strategy] = {
+    "fallback_order": _fallback_order,
+    "nearest_neighbour": _nearest_neighbour,
+    "local": _local,
+    "exact": _exact
+}
+
+def _measure(strategy: Strategy, instance: Instance, cost: np.ndarray, time_limit: float, trace_memory: bool) -> Optional[Dict[str, Any]]:
+    started = time.perf_counter()
+    route = strategy(instance, cost, time_limit)
+    wall_seconds = time.perf_counter() - started
+    if route is None:
+        return None
+
+    if sorted(route) != list(range(cost.shape[0])) or route[0] != 0 or route[-1] != cost.shape[0] - 1:
+        raise ValueError(f"invalid route from {strategy.__name__} on {instance.name}")
+
+    peak_kib = None
+    if trace_memory:
+        # Separate run: tracing slows Python-level loops and would skew the timing
+        tracemalloc.start()
+        strategy(instance, cost, time_limit)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_kib = round(peak / 1024, 1)
+
+    return {
+        "wall_ms": round(wall_seconds * 1000, 2),
+        "peak_kib": peak_kib,
+        "length_km": round(route_cost(cost, route), 3)
+    }
+
+def load_best_known(path: Path) -> Dict[str, float]:
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def run_benchmarks(
+    kinds: List[str],
+    sizes: List[int],
+    seed: int,
+    time_limit: float,
+    strategies: Dict[str, Strategy],
+    best_known: Dict[str, float],
+    trace_memory: bool = True
+) -> List[Dict[str, Any]]:
+    results: List[Dict[str, Any]] = []
+    for kind in kinds:
+        for size in sizes:
+            instance = generate_instance(kind, size, seed)
+            cost = instance.distance_matrix()
+            rows = []
+            for name, strategy in strategies.items():
+                measured = _measure(strategy, instance, cost, time_limit, trace_memory)
+                if measured is None:
+                    continue
+                rows.append({"instance": instance.name, "kind": kind, "stops": size, "strategy": name, **measured})
+
+            best = min([row["length_km"] for row in rows] + [best_known.get(instance.name, float("inf"))])
+            best_known[instance.name] = best
+            for row in rows:
+                row["best_known_km"] = best
+                row["gap_pct"] = round((row["length_km"] / best - 1) * 100, 2) if best > 0 else 0.0
+                logger.info(
+                    f"{row['instance']:<20} {row['strategy']:<18} {row['wall_ms']:>10.1f} ms "
+                    f"{row['peak_kib'] if row['peak_kib'] is not None else '-':>10} KiB "
+                    f"{row['length_km']:>10.2f} km {row['gap_pct']:>7.2f}%"
+                )
+            results.extend(rows)
+    return results
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    parser = argparse.ArgumentParser(description="Benchmark route optimization strategies")
+    parser.add_argument("--kinds", nargs="+", choices=INSTANCE_KINDS, default=list(INSTANCE_KINDS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(INSTANCE_SIZES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--time-limit", type=float, default=LOCAL_OPTIMIZER_TIME_LIMIT_SECONDS,
+                        help="Time budget per local solver run (seconds)")
+    parser.add_argument("--google", action="store_true", help="Also call the Directions API (billed)")
+    parser.add_argument("--skip-memory", action="store_true", help="Do not trace peak memory")
+    parser.add_argument("--best-known", default=str(BEST_KNOWN_PATH))
+    parser.add_argument("--update-best-known", action="store_true", help="Store improved best-known lengths")
+    parser.add_argument("--output", help="Write all results as JSON")
+    parser.add_argument("--fail-gap", type=float,
+                        help="Exit with status 1 if the local solver is more than this fraction above best-known")
+    args = parser.parse_args()
+
+    strategies = dict(STRATEGIES)
+    if args.google:
+        strategies["google"] = _google
+
+    best_known_path = Path(args.best_known)
+    best_known = load_best_known(best_known_path)
+    logger.info(f"{'instance':<20} {'strategy':<18} {'wall time':>13} {'peak memory':>14} {'length':>13} {'gap':>8}")
+    results = run_benchmarks(
+        args.kinds, args.sizes, args.seed, args.time_limit, strategies, best_known, not args.skip_memory
+    )
+
+    if args.update_best_known:
+        with open(best_known_path, "w") as f:
+            json.dump(dict(sorted(best_known.items())), f, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.fail_gap is not None:
+        regressions = [row for row in results if row["strategy"] == "local" and row["gap_pct"] > args.fail_gap * 100]
+        for row in regressions:
+            logger.error(f"local solver {row['gap_pct']}% above best-known on {row['instance']}")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,42 @@
+"""
+One-off job: add the GeoJSON location fields to drivers and orders stored
+before they existed, so the 2dsphere indexes and geo endpoints cover them.
+
+Usage (from the backend directory):
+    python -m jobs.backfill_geo_points
+
+Safe to re-run: only documents that still lack a point are updated.
+"""
+import asyncio
+import logging
+import os
+import sys
+from pathlib import Path
+from dotenv import load_dotenv
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+load_dotenv(ROOT_DIR / '.env')
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from utils.geo import backfill_geo_points
+
+logger = logging.getLogger(__name__)
+
+async def main():
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    try:
+        updated = await backfill_geo_points(db)
+        logger.info(f"GeoJSON points backfilled: {updated}")
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    asyncio.run(main())
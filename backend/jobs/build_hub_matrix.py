@@ -0,0 +1,51 @@
+"""
+Batch job: precompute the vendor -> delivery zone road distance matrix.
+
+Usage (from the backend directory):
+    python -m jobs.build_hub_matrix [--days 28] [--output PATH]
+
+Schedule periodically (cron/systemd timer, e.g. nightly or hourly); running
+API processes reload the matrix file within HUB_MATRIX_RELOAD_SECONDS of
+it being replaced.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from pathlib import Path
+from dotenv import load_dotenv
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+load_dotenv(ROOT_DIR / '.env')
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from utils.google_maps import close_maps_client
+from utils.hub_matrix import build_hub_matrix, HUB_MATRIX_PATH
+
+logger = logging.getLogger(__name__)
+
+async def main(days: int, output: str):
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    try:
+        matrix = await build_hub_matrix(db, days=days)
+        matrix.save(output)
+        logger.info(f"Hub matrix saved to {output}: {matrix.info()}")
+    finally:
+        await close_maps_client()
+        client.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    parser = argparse.ArgumentParser(description="Precompute the vendor to delivery zone distance matrix")
+    parser.add_argument("--days", type=int, default=28, help="Days of orders used to find delivery zones")
+    parser.add_argument("--output", default=HUB_MATRIX_PATH, help="Output .npz path")
+    args = parser.parse_args()
+    asyncio.run(main(args.days, args.output))
@@ -0,0 +1,48 @@
+"""
+Batch job: train the local ETA model from location_events speed history.
+
+Usage (from the backend directory):
+    python -m jobs.train_eta_model [--days 28] [--output PATH]
+
+Schedule nightly (cron/systemd timer); running API processes pick up the
+new model file on their next restart.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from pathlib import Path
+from dotenv import load_dotenv
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+load_dotenv(ROOT_DIR / '.env')
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from utils.eta_model import train_eta_model, ETA_MODEL_PATH
+
+logger = logging.getLogger(__name__)
+
+async def main(days: int, output: str):
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    try:
+        model = await train_eta_model(db, days=days)
+        model.save(output)
+        logger.info(f"ETA model saved to {output}: {model.info()}")
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    parser = argparse.ArgumentParser(description="Train the local ETA model")
+    parser.add_argument("--days", type=int, default=28, help="Days of location history to use")
+    parser.add_argument("--output", default=ETA_MODEL_PATH, help="Output .npz path")
+    args = parser.parse_args()
+    asyncio.run(main(args.days, args.output))
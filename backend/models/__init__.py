@@ -13,7 +13,8 @@ from .order import (
     OrderCreate,
     OrderResponse,
     OrderStatus,
-    CustomerLocationUpdate
+    CustomerLocationUpdate,
+    OrderAreaQuery
 )
 from .location_event import LocationEvent, LocationEventCreate
 from .assignment import (
@@ -26,7 +27,20 @@ from .assignment import (
 from .route import (
     RoutePoint,
     RouteOptimizationRequest,
-    RouteOptimizationResponse
+    RouteOptimizationResponse,
+    RoutePlanRequest,
+    RoutePlanResponse,
+    DriverRoutePlan,
+    PlannedStop,
+    PickupDeliveryRequest,
+    PickupDeliveryResponse,
+    PickupDeliveryStop,
+    RouteInsertionRequest,
+    RouteInsertionResponse,
+    OptimizationJobResponse,
+    RoutePlan,
+    OrderBatch,
+    OrderBatchResponse
 )
 from .wp_sync import (
     WooOrderPayload
@@ -36,9 +50,13 @@ __all__ = [
     "User", "UserCreate", "UserLogin", "UserResponse",
     "Vendor", "VendorCreate", "VendorResponse",
     "Driver", "DriverCreate", "DriverResponse", "DriverStatus", "DriverLogin", "DriverPushTokenUpdate",
-    "Order", "OrderCreate", "OrderResponse", "OrderStatus", "CustomerLocationUpdate",
+    "Order", "OrderCreate", "OrderResponse", "OrderStatus", "CustomerLocationUpdate", "OrderAreaQuery",
     "LocationEvent", "LocationEventCreate",
     "Assignment", "AssignmentCreate", "AssignmentResponse", "AssignmentDecision", "AssignmentStatus",
     "RoutePoint", "RouteOptimizationRequest", "RouteOptimizationResponse",
+    "RoutePlanRequest", "RoutePlanResponse", "DriverRoutePlan", "PlannedStop",
+    "PickupDeliveryRequest", "PickupDeliveryResponse", "PickupDeliveryStop",
+    "RouteInsertionRequest", "RouteInsertionResponse", "OptimizationJobResponse", "RoutePlan",
+    "OrderBatch", "OrderBatchResponse",
     "WooOrderPayload"
 ]
\ No newline at end of file
@@ -8,6 +8,9 @@ class AssignmentStatus(str, Enum):
     PENDING = "pending"
     ACCEPTED = "accepted"
     DECLINED = "declined"
+    EXPIRED = "expired"
+    # Replaced by a manual reassignment; not counted as the driver passing on the order
+    SUPERSEDED = "superseded"
     COMPLETED = "completed"
 
 class AssignmentBase(BaseModel):
@@ -27,9 +30,13 @@ class Assignment(AssignmentBase):
     
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     status: AssignmentStatus = AssignmentStatus.PENDING
+    auto_dispatched: bool = False
     assigned_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    expires_at: Optional[datetime] = None
     accepted_at: Optional[datetime] = None
     declined_at: Optional[datetime] = None
+    expired_at: Optional[datetime] = None
+    superseded_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
     decline_reason: Optional[str] = None
 
@@ -37,5 +44,6 @@ class AssignmentResponse(AssignmentBase):
     id: str
     status: AssignmentStatus
     assigned_at: datetime
+    expires_at: Optional[datetime] = None
     accepted_at: Optional[datetime]
     completed_at: Optional[datetime]
\ No newline at end of file
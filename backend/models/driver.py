@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, EmailStr, ConfigDict
-from typing import Optional
+from typing import Optional, Dict, Any
 from datetime import datetime, timezone
 from enum import Enum
 import uuid
@@ -41,6 +41,8 @@ class Driver(DriverBase):
     status: DriverStatus = DriverStatus.OFFLINE
     current_latitude: Optional[float] = None
     current_longitude: Optional[float] = None
+    # GeoJSON point mirroring the current coordinates (2dsphere indexed)
+    current_location: Optional[Dict[str, Any]] = None
     last_location_update: Optional[datetime] = None
     is_active: bool = True
     total_deliveries: int = 0
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Literal, Tuple
 from datetime import datetime, timezone
 from enum import Enum
 import uuid
@@ -27,6 +27,9 @@ class OrderBase(BaseModel):
     items: list = Field(default_factory=list)  # List of items/medicines
     notes: Optional[str] = None
     estimated_delivery_time: Optional[datetime] = None
+    # Customer delivery window, honoured by the route planner
+    delivery_window_start: Optional[datetime] = None
+    delivery_window_end: Optional[datetime] = None
     # WooCommerce compatibility
     woo_order_id: Optional[str] = Field(default=None, description="Original WooCommerce order ID")
     woo_vendor_id: Optional[str] = Field(default=None, description="WooCommerce vendor ID/author")
@@ -40,6 +43,14 @@ class CustomerLocationUpdate(BaseModel):
     heading: Optional[float] = None
     speed: Optional[float] = None
 
+class OrderAreaQuery(BaseModel):
+    # Polygon vertices as [latitude, longitude]; the ring is closed automatically
+    polygon: List[Tuple[float, float]] = Field(..., min_length=3)
+    location: Literal["pickup", "delivery"] = "delivery"
+    vendor_id: Optional[str] = None
+    statuses: Optional[List[OrderStatus]] = None
+    limit: int = Field(default=500, ge=1, le=5000)
+
 class OrderCreate(OrderBase):
     pass
 
@@ -56,6 +67,10 @@ class Order(OrderBase):
     actual_distance_km: Optional[float] = None
     delivery_fee: float = 0.0
     
+    # GeoJSON points mirroring the pickup/delivery coordinates (2dsphere indexed)
+    pickup_location: Optional[Dict[str, Any]] = None
+    delivery_location: Optional[Dict[str, Any]] = None
+    
     # Proof of delivery
     proof_photo_url: Optional[str] = None
     signature_url: Optional[str] = None
@@ -1,5 +1,6 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, Field, ConfigDict
+from typing import Any, Dict, List, Optional, Literal
+from datetime import datetime
 
 class RoutePoint(BaseModel):
     latitude: float
@@ -10,6 +11,8 @@ class RouteOptimizationRequest(BaseModel):
     origin: RoutePoint
     destination: Optional[RoutePoint] = None
     stops: List[RoutePoint] = Field(default_factory=list, description="Waypoints to optimize")
+    strategy: Literal["auto", "google", "local"] = Field(default="auto", description="auto | google | local")
+    time_limit_seconds: Optional[float] = Field(default=None, gt=0, description="Time budget for the built-in solver")
 
 class RouteOptimizationResponse(BaseModel):
     origin: RoutePoint
@@ -19,4 +22,117 @@ class RouteOptimizationResponse(BaseModel):
     total_distance_km: Optional[float] = None
     total_duration_minutes: Optional[float] = None
     polyline: Optional[str] = None
+    strategy: Optional[str] = None
 
+
+class RoutePlanRequest(BaseModel):
+    vendor_id: str
+    order_ids: Optional[List[str]] = Field(default=None, description="Defaults to the vendor's unassigned pending/accepted orders")
+    driver_ids: Optional[List[str]] = Field(default=None, description="Defaults to the vendor's available drivers")
+    start_time: Optional[datetime] = Field(default=None, description="Planned departure from the pickup; defaults to now")
+    service_minutes: float = Field(default=3.0, ge=0, description="Handover time spent at each stop")
+    time_limit_seconds: Optional[float] = Field(default=None, gt=0, description="Solver time budget; the best plan found by then is returned")
+
+class PlannedStop(BaseModel):
+    order_id: str
+    order_number: Optional[str] = None
+    latitude: float
+    longitude: float
+    sequence: int
+    arrival_time: datetime
+    delivery_window_start: Optional[datetime] = None
+    delivery_window_end: Optional[datetime] = None
+
+class DriverRoutePlan(BaseModel):
+    driver_id: str
+    vehicle_type: Optional[str] = None
+    capacity: int
+    stops: List[PlannedStop] = Field(default_factory=list)
+    total_distance_km: float = 0.0
+    total_duration_minutes: float = 0.0
+
+class RoutePlanResponse(BaseModel):
+    vendor_id: str
+    routes: List[DriverRoutePlan]
+    unassigned_order_ids: List[str] = Field(default_factory=list)
+    total_distance_km: float = 0.0
+    total_duration_minutes: float = 0.0
+    estimated: bool = Field(default=False, description="True when any travel cost came from a straight-line estimate")
+    generated_at: datetime
+
+class PickupDeliveryRequest(BaseModel):
+    order_ids: List[str] = Field(..., min_length=1)
+    origin: Optional[RoutePoint] = Field(default=None, description="Route start; defaults to the first pickup")
+    time_limit_seconds: Optional[float] = Field(default=None, gt=0, description="Solver time budget; the best route found by then is returned")
+
+class PickupDeliveryStop(RoutePoint):
+    order_id: str
+    order_number: Optional[str] = None
+    stop_type: Literal["pickup", "delivery"]
+    address: Optional[str] = None
+
+class PickupDeliveryResponse(BaseModel):
+    origin: RoutePoint
+    stops: List[PickupDeliveryStop]
+    total_distance_km: float
+    total_duration_minutes: float
+    estimated: bool = False
+
+class RouteInsertionRequest(BaseModel):
+    origin: RoutePoint = Field(..., description="Driver's current position")
+    stops: List[PickupDeliveryStop] = Field(default_factory=list, description="Remaining planned sequence")
+    order_id: str = Field(..., description="Order to insert")
+
+class RouteInsertionResponse(BaseModel):
+    origin: RoutePoint
+    stops: List[PickupDeliveryStop]
+    inserted_positions: List[int]
+    delta_distance_km: float
+    delta_duration_minutes: float
+    total_distance_km: float
+    total_duration_minutes: float
+    estimated: bool = False
+
+class OptimizationJobResponse(BaseModel):
+    job_id: str
+    kind: str
+    status: Literal["queued", "running", "completed", "failed"]
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+class RoutePlan(BaseModel):
+    """Stored route of a driver (route_plans collection); version increases on every change"""
+    model_config = ConfigDict(extra="ignore")
+
+    id: str
+    driver_id: str
+    vendor_id: Optional[str] = None
+    version: int
+    status: Literal["current", "stale"] = "current"
+    origin: Optional[RoutePoint] = None
+    stops: List[PickupDeliveryStop] = Field(default_factory=list)
+    polyline: Optional[str] = None
+    total_distance_km: float = 0.0
+    total_duration_minutes: float = 0.0
+    estimated: bool = False
+    created_at: datetime
+    updated_at: datetime
+
+class OrderBatch(BaseModel):
+    batch_id: str
+    order_ids: List[str]
+    order_numbers: List[Optional[str]] = Field(default_factory=list)
+    size: int
+    centroid: RoutePoint
+    radius_km: float
+    earliest_ready_at: datetime
+    latest_ready_at: datetime
+
+class OrderBatchResponse(BaseModel):
+    vendor_id: str
+    batches: List[OrderBatch]
+    unbatched_order_ids: List[str] = Field(default_factory=list)
+    generated_at: datetime
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query
 from motor.motor_asyncio import AsyncIOMotorClient
 from models import (
     Driver,
@@ -7,6 +7,7 @@ from models import (
     DriverStatus,
     DriverLogin,
     DriverPushTokenUpdate,
+    RoutePlan,
     User,
     OrderStatus
 )
@@ -16,12 +17,18 @@ from utils import (
     verify_password,
     create_access_token,
     create_refresh_token,
-    calculate_eta
+    calculate_live_eta,
+    path_length_km
 )
 import os
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
 from typing import List, Optional, Dict
 from socket_handlers.manager import manager
+from utils.eta_tracker import eta_tracker
+from utils.driver_index import driver_index
+from utils.geo import geo_point
+from utils.polyline import simplify, encode
+from utils.route_plans import get_or_build_route_plan
 
 router = APIRouter(prefix="/drivers", tags=["Drivers"])
 
@@ -154,6 +161,48 @@ async def get_drivers(
     
     return [DriverResponse(**driver) for driver in drivers]
 
+@router.get("/nearby", response_model=dict)
+async def get_nearby_drivers(
+    latitude: float,
+    longitude: float,
+    k: int = Query(10, ge=1, le=100),
+    radius_km: Optional[float] = Query(None, gt=0, le=100),
+    vendor_id: Optional[str] = None,
+    driver_status: Optional[DriverStatus] = Query(None, alias="status"),
+    current_user: dict = Depends(require_role(["vendor", "admin"]))
+):
+    """
+    Drivers nearest to a point from the in-memory live position index
+    (k nearest, or every driver within radius_km when it is given)
+    """
+    if current_user["role"] == "vendor":
+        own_vendor_id = await _get_vendor_id_for_user(current_user["id"])
+        if vendor_id and vendor_id != own_vendor_id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+        vendor_id = own_vendor_id
+    
+    statuses = [driver_status] if driver_status else None
+    if radius_km is not None:
+        found = driver_index.within(latitude, longitude, radius_km, vendor_id=vendor_id, statuses=statuses)[:k]
+    else:
+        found = driver_index.nearest(latitude, longitude, k=k, vendor_id=vendor_id, statuses=statuses)
+    
+    return {
+        "count": len(found),
+        "drivers": [
+            {
+                "driver_id": position.driver_id,
+                "vendor_id": position.vendor_id,
+                "status": position.status,
+                "latitude": position.latitude,
+                "longitude": position.longitude,
+                "distance_km": round(km, 3),
+                "last_location_update": position.fixed_at.isoformat()
+            }
+            for position, km in found
+        ]
+    }
+
 @router.get("/{driver_id}", response_model=DriverResponse)
 async def get_driver(driver_id: str, current_user: dict = Depends(get_current_user)):
     """
@@ -208,6 +257,7 @@ async def update_driver_status(
             }
         }
     )
+    driver_index.set_status(driver_id, new_status)
     
     return {
         "message": "Driver status updated",
@@ -218,8 +268,8 @@ async def update_driver_status(
 @router.post("/{driver_id}/location", response_model=dict)
 async def update_driver_location(
     driver_id: str,
-    latitude: float,
-    longitude: float,
+    latitude: float = Query(..., ge=-90, le=90),
+    longitude: float = Query(..., ge=-180, le=180),
     current_user: dict = Depends(get_current_user)
 ):
     """
@@ -246,11 +296,13 @@ async def update_driver_location(
             "$set": {
                 "current_latitude": latitude,
                 "current_longitude": longitude,
+                "current_location": geo_point(latitude, longitude),
                 "last_location_update": datetime.now(timezone.utc).isoformat(),
                 "updated_at": datetime.now(timezone.utc).isoformat()
             }
         }
     )
+    driver_index.update(driver_id, driver["vendor_id"], latitude, longitude, status=driver.get("status"))
     
     # Store location event
     from models import LocationEvent
@@ -280,9 +332,12 @@ async def update_driver_location(
     }, {"_id": 0})
     
     if active_order:
-        eta_minutes = calculate_eta(
+        eta_minutes = await eta_tracker.get_eta(
+            active_order["id"],
+            active_order["status"],
             (latitude, longitude),
-            (active_order["delivery_latitude"], active_order["delivery_longitude"])
+            (active_order["delivery_latitude"], active_order["delivery_longitude"]),
+            calculate_live_eta
         )
         await manager.broadcast_to_room(f"order_{active_order['id']}", {
             "type": "driver_location",
@@ -316,6 +371,19 @@ def _format_dt(value: Optional[str]) -> Optional[str]:
         return value.isoformat()
     return value
 
+def _parse_query_datetime(value: str, name: str) -> datetime:
+    """ISO date/time query parameter as an aware UTC datetime (naive values are taken as UTC)"""
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid {name}: expected an ISO date/time"
+        )
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
 async def _ensure_driver_access(driver: dict, current_user: dict):
     role = current_user["role"]
     if role == "driver":
@@ -448,6 +516,76 @@ async def get_driver_live_state(driver_id: str, current_user: dict = Depends(get
         "generated_at": now.isoformat()
     }
 
+@router.get("/{driver_id}/route-plan", response_model=RoutePlan)
+async def get_driver_route_plan(
+    driver_id: str,
+    refresh: bool = Query(False, description="Re-optimize instead of returning the stored plan"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Stored route plan for the driver's active orders. The plan is kept up to
+    date as orders are assigned, picked up or delivered and is only
+    re-optimized when missing, invalidated or refresh is requested.
+    """
+    driver = await db.drivers.find_one({"id": driver_id}, {"_id": 0})
+    if not driver:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Driver not found")
+    
+    await _ensure_driver_access(driver, current_user)
+    
+    plan = await get_or_build_route_plan(driver, refresh=refresh)
+    if not plan:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unable to build route plan at this time"
+        )
+    return RoutePlan(**plan)
+
+@router.get("/{driver_id}/trail", response_model=dict)
+async def get_driver_trail(
+    driver_id: str,
+    start_date: Optional[str] = Query(None, description="ISO date/time, defaults to one hour ago"),
+    end_date: Optional[str] = Query(None, description="ISO date/time, defaults to now"),
+    tolerance_m: float = Query(10.0, ge=0, description="Douglas-Peucker tolerance in meters"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Travelled path as an encoded polyline built from location events
+    (no Directions API call), simplified to the requested tolerance
+    """
+    driver = await db.drivers.find_one({"id": driver_id}, {"_id": 0})
+    if not driver:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Driver not found")
+    
+    await _ensure_driver_access(driver, current_user)
+    
+    now = datetime.now(timezone.utc)
+    start_dt = _parse_query_datetime(start_date, "start_date") if start_date else now - timedelta(hours=1)
+    end_dt = _parse_query_datetime(end_date, "end_date") if end_date else now
+    
+    events = await db.location_events.find(
+        {
+            "driver_id": driver_id,
+            "timestamp": {"$gte": start_dt.isoformat(), "$lte": end_dt.isoformat()}
+        },
+        {"_id": 0, "latitude": 1, "longitude": 1}
+    ).sort("timestamp", 1).to_list(20000)
+    
+    points = [(e["latitude"], e["longitude"]) for e in events]
+    simplified = simplify(points, tolerance_m)
+    
+    return {
+        "driver_id": driver_id,
+        "time_window": {
+            "start": start_dt.isoformat(),
+            "end": end_dt.isoformat()
+        },
+        "polyline": encode(simplified),
+        "raw_points": len(points),
+        "simplified_points": len(simplified),
+        "distance_km": round(path_length_km(points), 2)
+    }
+
 @router.post("/{driver_id}/push-token", response_model=dict)
 async def update_driver_push_token(
     driver_id: str,
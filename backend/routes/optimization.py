@@ -1,21 +1,56 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from middleware import get_current_user
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from motor.motor_asyncio import AsyncIOMotorClient
+from middleware import get_current_user, require_role
 from models import (
     RouteOptimizationRequest,
     RouteOptimizationResponse,
-    RoutePoint
+    RoutePoint,
+    RoutePlanRequest,
+    RoutePlanResponse,
+    DriverRoutePlan,
+    PlannedStop,
+    PickupDeliveryRequest,
+    PickupDeliveryResponse,
+    RouteInsertionRequest,
+    RouteInsertionResponse,
+    OptimizationJobResponse,
+    OrderBatch,
+    OrderBatchResponse,
+    OrderStatus,
+    DriverStatus
 )
 from utils import optimize_route
+from utils.route_plans import (
+    ROUTE_PLAN_TIME_LIMIT_SECONDS,
+    order_stops,
+    plan_cost_matrices,
+    solve_order_run,
+    insert_order_stops
+)
+from solvers.vrp import DEFAULT_VEHICLE_CAPACITY, plan_routes, vehicle_capacity
+from solvers.clustering import NOISE, dbscan, project_km, split_cluster
+from solvers.pool import run_in_pool, time_budget
+from utils.jobs import Job, optimization_jobs
+import os
+import hashlib
+import numpy as np
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, List, Optional
 
 router = APIRouter(prefix="/routes", tags=["Routes"])
 
+mongo_url = os.environ['MONGO_URL']
+client = AsyncIOMotorClient(mongo_url)
+db = client[os.environ['DB_NAME']]
+
 @router.post("/optimize", response_model=RouteOptimizationResponse)
 async def optimize_delivery_route(
     payload: RouteOptimizationRequest,
     current_user: dict = Depends(get_current_user)
 ):
     """
-    Optimize the order of multiple stops using Google Directions API.
+    Optimize the order of multiple stops using Google Directions API
+    or the built-in solver (large stop sets, no API key).
     Accessible to vendors, drivers, and admins.
     """
     if current_user["role"] not in ["vendor", "driver", "admin"]:
@@ -35,7 +70,9 @@ async def optimize_delivery_route(
     destination_tuple = (destination_point.latitude, destination_point.longitude)
     waypoint_tuples = [(stop.latitude, stop.longitude) for stop in payload.stops]
     
-    optimization = optimize_route(origin_tuple, waypoint_tuples, destination_tuple)
+    optimization = await optimize_route(
+        origin_tuple, waypoint_tuples, destination_tuple, payload.strategy, payload.time_limit_seconds
+    )
     if not optimization:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -54,6 +91,326 @@ async def optimize_delivery_route(
         waypoint_order=optimization["waypoint_order"],
         total_distance_km=optimization.get("total_distance_km"),
         total_duration_minutes=optimization.get("total_duration_minutes"),
-        polyline=optimization.get("polyline")
+        polyline=optimization.get("polyline"),
+        strategy=optimization.get("strategy")
+    )
+
+
+@router.post("/plan", response_model=RoutePlanResponse)
+async def plan_vendor_routes(
+    payload: RoutePlanRequest,
+    current_user: dict = Depends(require_role(["vendor", "admin"]))
+):
+    """
+    Plan routes for several drivers at once (Vendor/Admin role).
+    Splits the vendor's pending orders across available drivers, respecting
+    vehicle capacity and customer delivery windows, and returns one ordered
+    route per driver with arrival times and totals. Explicit order_ids must
+    all belong to the vendor and be pending or accepted without a driver (400 otherwise).
+    """
+    await _ensure_vendor_access(payload.vendor_id, current_user)
+    return await _build_route_plan(payload)
+
+@router.post("/plan/jobs", response_model=OptimizationJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_route_plan_job(
+    payload: RoutePlanRequest,
+    current_user: dict = Depends(require_role(["vendor", "admin"]))
+):
+    """
+    Submit a multi-driver plan as a background job (Vendor/Admin role).
+    Poll GET /routes/jobs/{job_id} for the result; suited to large plans
+    and long time budgets.
+    """
+    await _ensure_vendor_access(payload.vendor_id, current_user)
+
+    async def _run() -> Dict[str, Any]:
+        plan = await _build_route_plan(payload)
+        return plan.model_dump(mode="json")
+
+    job = optimization_jobs.submit("route_plan", current_user["id"], _run)
+    return _job_response(job)
+
+@router.get("/jobs/{job_id}", response_model=OptimizationJobResponse)
+async def get_optimization_job(
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Poll a background optimization job. Only the submitter or an admin
+    can read it.
+    """
+    job = optimization_jobs.get(job_id)
+    if not job or (current_user["role"] != "admin" and job.owner_id != current_user["id"]):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return _job_response(job)
+
+async def _build_route_plan(payload: RoutePlanRequest) -> RoutePlanResponse:
+    vendor = await db.vendors.find_one({"id": payload.vendor_id}, {"_id": 0})
+    if not vendor:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Vendor not found")
+
+    order_query: Dict[str, Any] = {"vendor_id": payload.vendor_id}
+    if payload.order_ids:
+        order_ids = list(dict.fromkeys(payload.order_ids))
+        order_query["id"] = {"$in": order_ids}
+    else:
+        order_query["status"] = {"$in": [OrderStatus.PENDING, OrderStatus.ACCEPTED]}
+        order_query["driver_id"] = None
+    orders = await db.orders.find(order_query, {"_id": 0}).to_list(None)
+
+    if payload.order_ids:
+        found = {order["id"] for order in orders}
+        missing = [order_id for order_id in order_ids if order_id not in found]
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Orders not found for this vendor: {', '.join(missing)}"
+            )
+        unplannable = [
+            order["id"] for order in orders
+            if order.get("status") not in (OrderStatus.PENDING, OrderStatus.ACCEPTED) or order.get("driver_id")
+        ]
+        if unplannable:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Orders already assigned or past acceptance: {', '.join(unplannable)}"
+            )
+
+    driver_query: Dict[str, Any] = {"vendor_id": payload.vendor_id, "is_active": True}
+    if payload.driver_ids:
+        driver_query["id"] = {"$in": payload.driver_ids}
+    else:
+        driver_query["status"] = DriverStatus.AVAILABLE
+    drivers = await db.drivers.find(driver_query, {"_id": 0}).to_list(None)
+
+    if not orders:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No orders to plan")
+    if not drivers:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No available drivers")
+
+    if vendor.get("latitude") is not None and vendor.get("longitude") is not None:
+        depot = (vendor["latitude"], vendor["longitude"])
+    else:
+        depot = (orders[0]["pickup_latitude"], orders[0]["pickup_longitude"])
+    points = [depot] + [(order["delivery_latitude"], order["delivery_longitude"]) for order in orders]
+
+    start_time = payload.start_time or datetime.now(timezone.utc)
+    if start_time.tzinfo is None:
+        start_time = start_time.replace(tzinfo=timezone.utc)
+    window_start = np.zeros(len(points))
+    window_end = np.full(len(points), np.inf)
+    for index, order in enumerate(orders, start=1):
+        opens = _as_utc(order.get("delivery_window_start"))
+        closes = _as_utc(order.get("delivery_window_end"))
+        if opens:
+            window_start[index] = max(0.0, (opens - start_time).total_seconds() / 60)
+        if closes:
+            window_end[index] = (closes - start_time).total_seconds() / 60
+
+    distance_km, duration_minutes, estimated = await plan_cost_matrices(points)
+    capacities = [vehicle_capacity(driver.get("vehicle_type")) for driver in drivers]
+    plan = await run_in_pool(
+        plan_routes,
+        duration_minutes,
+        np.concatenate(([0], np.ones(len(orders), dtype=np.int64))),
+        capacities,
+        window_start,
+        window_end,
+        payload.service_minutes,
+        time_budget(payload.time_limit_seconds, ROUTE_PLAN_TIME_LIMIT_SECONDS)
+    )
+
+    routes: List[DriverRoutePlan] = []
+    for driver, capacity, nodes, arrivals in zip(drivers, capacities, plan["routes"], plan["arrivals"]):
+        path = [0] + nodes
+        stops = [
+            PlannedStop(
+                order_id=orders[node - 1]["id"],
+                order_number=orders[node - 1].get("order_number"),
+                latitude=points[node][0],
+                longitude=points[node][1],
+                sequence=sequence,
+                arrival_time=start_time + timedelta(minutes=arrival),
+                delivery_window_start=_as_utc(orders[node - 1].get("delivery_window_start")),
+                delivery_window_end=_as_utc(orders[node - 1].get("delivery_window_end"))
+            )
+            for sequence, (node, arrival) in enumerate(zip(nodes, arrivals), start=1)
+        ]
+        routes.append(DriverRoutePlan(
+            driver_id=driver["id"],
+            vehicle_type=driver.get("vehicle_type"),
+            capacity=capacity,
+            stops=stops,
+            total_distance_km=round(float(distance_km[path[:-1], path[1:]].sum()), 2),
+            total_duration_minutes=round(arrivals[-1] + payload.service_minutes, 2) if arrivals else 0.0
+        ))
+
+    return RoutePlanResponse(
+        vendor_id=payload.vendor_id,
+        routes=routes,
+        unassigned_order_ids=[orders[node - 1]["id"] for node in plan["unassigned"]],
+        total_distance_km=round(sum(route.total_distance_km for route in routes), 2),
+        total_duration_minutes=round(sum(route.total_duration_minutes for route in routes), 2),
+        estimated=estimated,
+        generated_at=datetime.now(timezone.utc)
     )
 
+@router.post("/optimize/orders", response_model=PickupDeliveryResponse)
+async def optimize_order_run(
+    payload: PickupDeliveryRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Optimize a multi-order run where every order is picked up before it is
+    delivered. Orders already picked up contribute only their drop-off.
+    Accessible to vendors (own orders), drivers (assigned orders), and admins.
+    """
+    order_ids = list(dict.fromkeys(payload.order_ids))
+    orders = await db.orders.find({"id": {"$in": order_ids}}, {"_id": 0}).to_list(None)
+    if len(orders) != len(order_ids):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
+    await _ensure_orders_access(orders, current_user)
+
+    if payload.origin:
+        origin = payload.origin
+    else:
+        origin = RoutePoint(latitude=orders[0]["pickup_latitude"], longitude=orders[0]["pickup_longitude"])
+
+    result = await solve_order_run(origin, orders, payload.time_limit_seconds)
+    return PickupDeliveryResponse(origin=origin, **result)
+
+@router.post("/insert", response_model=RouteInsertionResponse)
+async def insert_order_into_route(
+    payload: RouteInsertionRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Add a new order to a driver's planned sequence without re-optimizing it.
+    The pickup and drop-off go to the cheapest positions (pickup first) found
+    in one linear pass over the existing legs, whose costs are cached.
+    Accessible to vendors (own orders), drivers (assigned orders), and admins.
+    """
+    order = await db.orders.find_one({"id": payload.order_id}, {"_id": 0})
+    if not order:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
+    await _ensure_orders_access([order], current_user)
+
+    if any(stop.order_id == payload.order_id for stop in payload.stops):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Order is already in the route")
+
+    result = await insert_order_stops(payload.origin, payload.stops, order_stops(order))
+    return RouteInsertionResponse(origin=payload.origin, **result)
+
+@router.get("/batches", response_model=OrderBatchResponse)
+async def suggest_order_batches(
+    vendor_id: str = Query(...),
+    radius_km: float = Query(0.5, gt=0, description="Delivery points closer than this can share a batch"),
+    window_minutes: float = Query(30, gt=0, description="Orders ready further apart than this are not batched"),
+    min_orders: int = Query(2, ge=2, description="Smallest batch worth suggesting"),
+    max_batch_size: int = Query(DEFAULT_VEHICLE_CAPACITY, ge=2, description="Largest batch (vehicle capacity)"),
+    current_user: dict = Depends(require_role(["vendor", "admin"]))
+):
+    """
+    Suggested pickup batches for a vendor's pending/accepted unassigned
+    orders (Vendor/Admin role). Orders are clustered by delivery proximity
+    and ready time (delivery window start, else creation time) with
+    grid-accelerated DBSCAN; oversized clusters are split to max_batch_size.
+    A batch's order_ids can be planned or assigned as one trip.
+    """
+    await _ensure_vendor_access(vendor_id, current_user)
+
+    orders = await db.orders.find(
+        {
+            "vendor_id": vendor_id,
+            "status": {"$in": [OrderStatus.PENDING, OrderStatus.ACCEPTED]},
+            "driver_id": None
+        },
+        {"_id": 0}
+    ).to_list(None)
+
+    generated_at = datetime.now(timezone.utc)
+    if not orders:
+        return OrderBatchResponse(vendor_id=vendor_id, batches=[], generated_at=generated_at)
+
+    ready_at = [
+        _as_utc(order.get("delivery_window_start")) or _as_utc(order.get("created_at")) or generated_at
+        for order in orders
+    ]
+    ready_minutes = np.array([(ready - generated_at).total_seconds() / 60 for ready in ready_at])
+    latitudes = np.array([order["delivery_latitude"] for order in orders])
+    longitudes = np.array([order["delivery_longitude"] for order in orders])
+    xy = project_km(latitudes, longitudes)
+
+    labels = dbscan(xy, ready_minutes, radius_km, window_minutes, min_samples=min_orders)
+
+    batches: List[OrderBatch] = []
+    batched = np.zeros(len(orders), dtype=bool)
+    for label in np.unique(labels[labels != NOISE]):
+        for members in split_cluster(xy, np.nonzero(labels == label)[0], max_batch_size):
+            if len(members) < min_orders:
+                continue
+            batched[members] = True
+            members = sorted(members, key=lambda index: orders[index]["id"])
+            order_ids = [orders[index]["id"] for index in members]
+            centre = xy[members].mean(axis=0)
+            batches.append(OrderBatch(
+                batch_id=hashlib.sha1(",".join(order_ids).encode()).hexdigest()[:12],
+                order_ids=order_ids,
+                order_numbers=[orders[index].get("order_number") for index in members],
+                size=len(members),
+                centroid=RoutePoint(
+                    latitude=float(latitudes[members].mean()),
+                    longitude=float(longitudes[members].mean())
+                ),
+                radius_km=round(float(np.linalg.norm(xy[members] - centre, axis=1).max()), 3),
+                earliest_ready_at=min(ready_at[index] for index in members),
+                latest_ready_at=max(ready_at[index] for index in members)
+            ))
+
+    batches.sort(key=lambda batch: (-batch.size, batch.earliest_ready_at))
+    return OrderBatchResponse(
+        vendor_id=vendor_id,
+        batches=batches,
+        unbatched_order_ids=[order["id"] for order, in_batch in zip(orders, batched) if not in_batch],
+        generated_at=generated_at
+    )
+
+def _job_response(job: Job) -> OptimizationJobResponse:
+    return OptimizationJobResponse(
+        job_id=job.id,
+        kind=job.kind,
+        status=job.status,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        result=job.result,
+        error=job.error
+    )
+
+async def _ensure_vendor_access(vendor_id: str, current_user: dict):
+    if current_user["role"] == "vendor":
+        vendor = await db.vendors.find_one({"user_id": current_user["id"]}, {"_id": 0, "id": 1})
+        if not vendor or vendor["id"] != vendor_id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+
+async def _ensure_orders_access(orders: List[dict], current_user: dict):
+    role = current_user["role"]
+    if role == "vendor":
+        vendor = await db.vendors.find_one({"user_id": current_user["id"]}, {"_id": 0, "id": 1})
+        if not vendor or any(order["vendor_id"] != vendor["id"] for order in orders):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+    elif role == "driver":
+        driver = await db.drivers.find_one({"user_id": current_user["id"]}, {"_id": 0, "id": 1})
+        if not driver or any(order.get("driver_id") != driver["id"] for order in orders):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+    elif role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+
+def _as_utc(value: Any) -> Optional[datetime]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
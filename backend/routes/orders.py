@@ -6,25 +6,37 @@ from models import (
     OrderResponse,
     OrderStatus,
     CustomerLocationUpdate,
+    OrderAreaQuery,
     Assignment,
     AssignmentDecision,
-    AssignmentStatus
+    AssignmentStatus,
+    DriverStatus
 )
 from middleware import get_current_user, require_role
+from utils.route_plans import add_order_to_route_plan, apply_order_status_change, remove_order_from_route_plan
+from utils.dispatch import auto_dispatch, match_vendor_orders, offer_timeouts, reoffer, _assignment_document
 from utils import (
     get_coordinates,
     calculate_distance,
-    calculate_eta,
-    get_route_polyline,
+    get_directions,
     save_upload_file,
-    get_file_url
+    get_file_url,
+    hub_leg
 )
+from utils.polyline import trail_polyline
+from utils.geo import geo_point, geo_polygon, order_geo_points
 import os
-from datetime import datetime, timezone
-from typing import List, Optional
+from datetime import datetime, timezone, timedelta
+from typing import List, Literal, Optional
 
 router = APIRouter(prefix="/orders", tags=["Orders"])
 
+# Orders that can be (re)assigned: anything later is already in a driver's vehicle
+ASSIGNABLE_ORDER_STATUSES = [OrderStatus.PENDING, OrderStatus.ACCEPTED, OrderStatus.DRIVER_ASSIGNED]
+
+# Offers that can no longer be accepted or declined
+CLOSED_ASSIGNMENT_STATUSES = [AssignmentStatus.EXPIRED, AssignmentStatus.SUPERSEDED]
+
 mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
@@ -36,30 +48,36 @@ async def create_order(order_data: OrderCreate, current_user: dict = Depends(get
     """
     # Validate coordinates if not provided
     if not order_data.pickup_latitude or not order_data.pickup_longitude:
-        pickup_coords = get_coordinates(order_data.pickup_address)
+        pickup_coords = await get_coordinates(order_data.pickup_address)
         if pickup_coords:
             order_data.pickup_latitude, order_data.pickup_longitude = pickup_coords
     
     if not order_data.delivery_latitude or not order_data.delivery_longitude:
-        delivery_coords = get_coordinates(order_data.delivery_address)
+        delivery_coords = await get_coordinates(order_data.delivery_address)
         if delivery_coords:
             order_data.delivery_latitude, order_data.delivery_longitude = delivery_coords
     
-    # Calculate distance
-    distance = calculate_distance(
-        (order_data.pickup_latitude, order_data.pickup_longitude),
-        (order_data.delivery_latitude, order_data.delivery_longitude)
-    )
+    # Calculate distance (precomputed vendor -> zone matrix first, maps API otherwise)
+    pickup = (order_data.pickup_latitude, order_data.pickup_longitude)
+    delivery = (order_data.delivery_latitude, order_data.delivery_longitude)
+    leg = hub_leg(order_data.vendor_id, pickup, delivery)
+    distance = leg["distance_km"] if leg else await calculate_distance(pickup, delivery)
     
     # Create order
     order = Order(**order_data.model_dump())
     order.estimated_distance_km = distance
+    if leg and order.estimated_delivery_time is None:
+        # Seed the ETA with the pickup -> delivery drive time
+        order.estimated_delivery_time = order.created_at + timedelta(minutes=leg["duration_minutes"])
     order.delivery_fee = round(distance * 2.5, 2) if distance else 0  # $2.5 per km
     
     # Save to database
     order_dict = order.model_dump()
     order_dict['created_at'] = order_dict['created_at'].isoformat()
     order_dict['updated_at'] = order_dict['updated_at'].isoformat()
+    if order_dict.get('estimated_delivery_time'):
+        order_dict['estimated_delivery_time'] = order_dict['estimated_delivery_time'].isoformat()
+    order_dict.update(order_geo_points(order_dict))
     
     await db.orders.insert_one(order_dict)
     
@@ -185,6 +203,13 @@ async def update_order_status(
     
     await db.orders.update_one({"id": order_id}, {"$set": update_data})
     
+    # ETA tracking and the driver's stored route plan follow the new status
+    await apply_order_status_change(order, new_status)
+    
+    # Accepted orders without a driver go straight to auto-dispatch
+    if new_status == OrderStatus.ACCEPTED and not order.get("driver_id"):
+        await auto_dispatch(order_id)
+    
     # Fetch updated order
     updated_order = await db.orders.find_one({"id": order_id}, {"_id": 0})
     
@@ -196,6 +221,140 @@ async def update_order_status(
     
     return OrderResponse(**updated_order)
 
+@router.post("/dispatch/match", response_model=dict)
+async def match_waiting_orders(
+    vendor_id: Optional[str] = None,
+    current_user: dict = Depends(require_role(["vendor", "admin"]))
+):
+    """
+    Run a batch matching pass now: the vendor's accepted, unassigned orders
+    are matched to its available drivers in one optimal assignment (Vendor/Admin role)
+    """
+    if current_user["role"] == "vendor":
+        own_vendor_id = await _get_vendor_id_for_user(current_user["id"])
+        if vendor_id and vendor_id != own_vendor_id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+        vendor_id = own_vendor_id
+    if not vendor_id:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="vendor_id is required")
+    
+    return await match_vendor_orders(vendor_id)
+
+@router.post("/area", response_model=List[OrderResponse])
+async def get_orders_in_area(
+    area: OrderAreaQuery,
+    current_user: dict = Depends(require_role(["vendor", "admin"]))
+):
+    """
+    Orders whose pickup or delivery point lies inside a polygon, served by
+    the 2dsphere index on the order locations (Vendor/Admin role)
+    """
+    vendor_id = area.vendor_id
+    if current_user["role"] == "vendor":
+        own_vendor_id = await _get_vendor_id_for_user(current_user["id"])
+        if vendor_id and vendor_id != own_vendor_id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+        vendor_id = own_vendor_id
+    
+    try:
+        polygon = geo_polygon(area.polygon)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    query = {f"{area.location}_location": {"$geoWithin": {"$geometry": polygon}}}
+    if vendor_id:
+        query["vendor_id"] = vendor_id
+    if area.statuses:
+        query["status"] = {"$in": area.statuses}
+    
+    orders = await db.orders.find(query, {"_id": 0}).sort("created_at", -1).to_list(area.limit)
+    
+    # Parse datetime strings
+    for order in orders:
+        if isinstance(order.get('created_at'), str):
+            order['created_at'] = datetime.fromisoformat(order['created_at'])
+        if isinstance(order.get('updated_at'), str):
+            order['updated_at'] = datetime.fromisoformat(order['updated_at'])
+    
+    return [OrderResponse(**order) for order in orders]
+
+@router.get("/{order_id}/drivers/nearby", response_model=dict)
+async def get_drivers_near_order(
+    order_id: str,
+    radius_km: float = Query(5.0, gt=0, le=100),
+    limit: int = Query(20, ge=1, le=200),
+    location: Literal["pickup", "delivery"] = Query("pickup"),
+    driver_status: Optional[DriverStatus] = Query(None, alias="status"),
+    current_user: dict = Depends(require_role(["vendor", "admin"]))
+):
+    """
+    The order vendor's drivers within radius_km of its pickup (or delivery)
+    point, closest first, using $geoNear on the stored driver locations (Vendor/Admin role)
+    """
+    order = await db.orders.find_one({"id": order_id}, {"_id": 0})
+    if not order:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
+    if current_user["role"] == "vendor" and await _get_vendor_id_for_user(current_user["id"]) != order["vendor_id"]:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+    
+    point = order.get(f"{location}_location") or geo_point(
+        order.get(f"{location}_latitude"),
+        order.get(f"{location}_longitude")
+    )
+    if not point:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Order has no {location} coordinates")
+    
+    query = {"vendor_id": order["vendor_id"], "is_active": True}
+    if driver_status:
+        query["status"] = driver_status
+    
+    drivers = await db.drivers.aggregate([
+        {
+            "$geoNear": {
+                "near": point,
+                "key": "current_location",
+                "distanceField": "distance_m",
+                "maxDistance": radius_km * 1000,
+                "spherical": True,
+                "query": query
+            }
+        },
+        {"$limit": limit},
+        {
+            "$project": {
+                "_id": 0,
+                "id": 1,
+                "full_name": 1,
+                "phone": 1,
+                "vehicle_type": 1,
+                "status": 1,
+                "current_latitude": 1,
+                "current_longitude": 1,
+                "last_location_update": 1,
+                "distance_m": 1
+            }
+        }
+    ]).to_list(limit)
+    
+    return {
+        "order_id": order_id,
+        "count": len(drivers),
+        "drivers": [
+            {
+                "driver_id": driver["id"],
+                "full_name": driver.get("full_name"),
+                "phone": driver.get("phone"),
+                "vehicle_type": driver.get("vehicle_type"),
+                "status": driver.get("status"),
+                "latitude": driver.get("current_latitude"),
+                "longitude": driver.get("current_longitude"),
+                "distance_km": round(driver["distance_m"] / 1000, 3),
+                "last_location_update": driver.get("last_location_update")
+            }
+            for driver in drivers
+        ]
+    }
+
 @router.post("/{order_id}/assign", response_model=dict)
 async def assign_driver(
     order_id: str,
@@ -212,6 +371,12 @@ async def assign_driver(
             detail="Order not found"
         )
     
+    if order.get("status") not in ASSIGNABLE_ORDER_STATUSES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Order cannot be assigned in status {order.get('status')}"
+        )
+    
     driver = await db.drivers.find_one({"id": driver_id}, {"_id": 0})
     if not driver:
         raise HTTPException(
@@ -219,35 +384,64 @@ async def assign_driver(
             detail="Driver not found"
         )
     
-    # Update order
-    await db.orders.update_one(
-        {"id": order_id},
+    if not driver.get("is_active", True) or driver.get("status") not in (DriverStatus.AVAILABLE, DriverStatus.BUSY):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Driver is not available (status: {driver.get('status')})"
+        )
+    
+    assignment = Assignment(
+        order_id=order_id,
+        driver_id=driver_id,
+        vendor_id=order["vendor_id"],
+        expires_at=offer_timeouts.expires_at()
+    )
+    now_iso = datetime.now(timezone.utc).isoformat()
+    previous_assignment_id = order.get("assignment_id")
+    
+    # Driver, assignment and status in one update, conditional on the order
+    # still carrying the assignment read above (an expiring offer or an
+    # auto-dispatch may have changed it in the meantime)
+    updated = await db.orders.update_one(
+        {
+            "id": order_id,
+            "assignment_id": previous_assignment_id,
+            "status": {"$in": ASSIGNABLE_ORDER_STATUSES}
+        },
         {
             "$set": {
                 "driver_id": driver_id,
+                "assignment_id": assignment.id,
                 "status": OrderStatus.DRIVER_ASSIGNED,
-                "updated_at": datetime.now(timezone.utc).isoformat()
+                "updated_at": now_iso
             }
         }
     )
+    if not updated.matched_count:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Order assignment changed concurrently, please retry"
+        )
     
-    # Create assignment
-    assignment = Assignment(
-        order_id=order_id,
-        driver_id=driver_id,
-        vendor_id=order["vendor_id"]
-    )
+    await db.assignments.insert_one(_assignment_document(assignment))
+    offer_timeouts.schedule(assignment.id, assignment.expires_at)
     
-    assignment_dict = assignment.model_dump()
-    assignment_dict['assigned_at'] = assignment_dict['assigned_at'].isoformat()
+    # Close the offer this assignment replaces
+    if previous_assignment_id:
+        offer_timeouts.cancel(previous_assignment_id)
+        await db.assignments.update_one(
+            {
+                "id": previous_assignment_id,
+                "status": {"$in": [AssignmentStatus.PENDING, AssignmentStatus.ACCEPTED]}
+            },
+            {"$set": {"status": AssignmentStatus.SUPERSEDED, "superseded_at": now_iso}}
+        )
     
-    await db.assignments.insert_one(assignment_dict)
-    
-    # Update order with assignment ID
-    await db.orders.update_one(
-        {"id": order_id},
-        {"$set": {"assignment_id": assignment.id}}
-    )
+    # Move the order between stored route plans
+    previous_driver_id = order.get("driver_id")
+    if previous_driver_id and previous_driver_id != driver_id:
+        await remove_order_from_route_plan(previous_driver_id, order_id)
+    await add_order_to_route_plan(driver_id, {**order, "driver_id": driver_id, "status": OrderStatus.DRIVER_ASSIGNED})
     
     return {
         "message": "Driver assigned successfully",
@@ -296,37 +490,42 @@ async def respond_to_assignment(
         )
     if not assignment:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Assignment record not found")
+    if assignment.get("status") in CLOSED_ASSIGNMENT_STATUSES:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Assignment offer is no longer open")
     
     now_iso = datetime.now(timezone.utc).isoformat()
     decision_value = decision.action
     
     if decision_value == "accept":
-        await db.assignments.update_one(
-            {"id": assignment["id"]},
-            {
-                "$set": {
-                    "status": AssignmentStatus.ACCEPTED,
-                    "accepted_at": now_iso,
-                    "decline_reason": None
-                }
-            }
-        )
+        assignment_update = {
+            "status": AssignmentStatus.ACCEPTED,
+            "accepted_at": now_iso,
+            "decline_reason": None
+        }
+    else:
+        assignment_update = {
+            "status": AssignmentStatus.DECLINED,
+            "declined_at": now_iso,
+            "decline_reason": decision.reason
+        }
+    
+    # Conditional on the offer not having expired or been replaced since it was read
+    answered = await db.assignments.update_one(
+        {"id": assignment["id"], "status": {"$nin": CLOSED_ASSIGNMENT_STATUSES}},
+        {"$set": assignment_update}
+    )
+    if not answered.matched_count:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Assignment offer is no longer open")
+    offer_timeouts.cancel(assignment["id"])
+    
+    if decision_value == "accept":
         await db.orders.update_one(
             {"id": order_id},
             {"$set": {"status": OrderStatus.DRIVER_ASSIGNED, "updated_at": now_iso}}
         )
+        await add_order_to_route_plan(driver_id, {**order, "status": OrderStatus.DRIVER_ASSIGNED})
         result_message = "Assignment accepted"
     else:
-        await db.assignments.update_one(
-            {"id": assignment["id"]},
-            {
-                "$set": {
-                    "status": AssignmentStatus.DECLINED,
-                    "declined_at": now_iso,
-                    "decline_reason": decision.reason
-                }
-            }
-        )
         await db.orders.update_one(
             {"id": order_id},
             {
@@ -338,6 +537,9 @@ async def respond_to_assignment(
                 }
             }
         )
+        await remove_order_from_route_plan(driver_id, order_id)
+        # Cascade to the next-best driver who has not passed on this order
+        await reoffer(order_id)
         result_message = "Assignment declined"
     
     return {
@@ -355,6 +557,26 @@ async def _get_driver_id_for_user(user_id: str) -> Optional[str]:
     driver = await db.drivers.find_one({"user_id": user_id}, {"_id": 0, "id": 1})
     return driver["id"] if driver else None
 
+async def _get_order_trail_points(order: dict) -> List[tuple]:
+    """
+    GPS fixes recorded for the order's driver between pickup (or the last
+    order update) and now, oldest first
+    """
+    if not order.get("driver_id"):
+        return []
+    
+    started_at = _format_datetime(order.get("picked_up_at") or order.get("updated_at"))
+    query = {"driver_id": order["driver_id"]}
+    if started_at:
+        query["timestamp"] = {"$gte": started_at}
+    
+    events = await db.location_events.find(
+        query,
+        {"_id": 0, "latitude": 1, "longitude": 1}
+    ).sort("timestamp", 1).to_list(20000)
+    
+    return [(e["latitude"], e["longitude"]) for e in events]
+
 def _format_datetime(value: Optional[str]) -> Optional[str]:
     if value is None:
         return None
@@ -435,9 +657,14 @@ async def update_customer_location(
     }
 
 @router.get("/{order_id}/live", response_model=dict)
-async def get_live_order_snapshot(order_id: str, current_user: dict = Depends(get_current_user)):
+async def get_live_order_snapshot(
+    order_id: str,
+    trail_tolerance_m: float = Query(10.0, ge=0, description="Simplification tolerance for the travelled trail"),
+    current_user: dict = Depends(get_current_user)
+):
     """
-    Provide a live snapshot combining order info, customer share, and driver GPS
+    Provide a live snapshot combining order info, customer share, and driver GPS.
+    trail_polyline is the driver's travelled path, built locally from location events.
     """
     order = await db.orders.find_one({"id": order_id}, {"_id": 0})
     if not order:
@@ -451,6 +678,7 @@ async def get_live_order_snapshot(order_id: str, current_user: dict = Depends(ge
     driver_snapshot = None
     eta_minutes = None
     route_polyline = None
+    travelled_polyline = None
     
     if order.get("driver_id"):
         driver = await db.drivers.find_one(
@@ -476,17 +704,16 @@ async def get_live_order_snapshot(order_id: str, current_user: dict = Depends(ge
                 "longitude": driver["current_longitude"],
                 "last_update": _format_datetime(driver.get("last_location_update"))
             }
-            eta_minutes = calculate_eta(
+            # One Directions lookup serves both the ETA and the route polyline
+            directions = await get_directions(
                 (driver["current_latitude"], driver["current_longitude"]),
                 (order["delivery_latitude"], order["delivery_longitude"])
             )
-            try:
-                route_polyline = get_route_polyline(
-                    (driver["current_latitude"], driver["current_longitude"]),
-                    (order["delivery_latitude"], order["delivery_longitude"])
-                )
-            except Exception:
-                route_polyline = None
+            eta_minutes = int(directions["duration_minutes"])
+            route_polyline = directions["polyline"]
+            trail_points = await _get_order_trail_points(order)
+            if len(trail_points) >= 2:
+                travelled_polyline = trail_polyline(trail_points, trail_tolerance_m)
     
     customer_location = None
     if order.get("customer_current_latitude") and order.get("customer_current_longitude"):
@@ -514,7 +741,8 @@ async def get_live_order_snapshot(order_id: str, current_user: dict = Depends(ge
         "driver": driver_snapshot,
         "customer_location": customer_location,
         "eta_minutes": eta_minutes,
-        "route_polyline": route_polyline
+        "route_polyline": route_polyline,
+        "trail_polyline": travelled_polyline
     }
 
 @router.post("/{order_id}/proof", response_model=dict)
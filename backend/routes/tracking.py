@@ -37,7 +37,7 @@ async def track_order(tracking_token: str):
             }
             
             # Calculate ETA
-            eta_minutes = calculate_eta(
+            eta_minutes = await calculate_eta(
                 (driver["current_latitude"], driver["current_longitude"]),
                 (order["delivery_latitude"], order["delivery_longitude"])
             )
@@ -42,7 +42,7 @@ async def register_vendor(vendor_data: VendorCreate):
     await db.users.insert_one(user_dict)
     
     # Get coordinates for address
-    coords = get_coordinates(vendor_data.address)
+    coords = await get_coordinates(vendor_data.address)
     if coords:
         vendor_data.latitude, vendor_data.longitude = coords
     
@@ -1,6 +1,9 @@
 from fastapi import APIRouter, HTTPException, status, Request
 from motor.motor_asyncio import AsyncIOMotorClient
 from models import Order, OrderStatus
+from utils.dispatch import auto_dispatch
+from utils.geo import order_geo_points
+from utils.route_plans import apply_order_status_change
 import os
 from datetime import datetime, timezone
 import logging
@@ -48,6 +51,7 @@ async def woocommerce_order_created(request: Request):
         order_dict['created_at'] = order_dict['created_at'].isoformat()
         order_dict['updated_at'] = order_dict['updated_at'].isoformat()
         order_dict['wc_order_id'] = wc_order_id  # Store WC reference
+        order_dict.update(order_geo_points(order_dict))
         
         await db.orders.insert_one(order_dict)
         
@@ -103,6 +107,9 @@ async def woocommerce_order_updated(request: Request):
                 }
             }
         )
+        await apply_order_status_change(order, new_status)
+        if new_status == OrderStatus.ACCEPTED:
+            await auto_dispatch(order["id"])
         
         return {
             "success": True,
@@ -6,6 +6,9 @@ import os
 from datetime import datetime, timezone
 
 from models import Order, OrderResponse, OrderStatus, WooOrderPayload
+from utils.dispatch import auto_dispatch
+from utils.geo import order_geo_points
+from utils.route_plans import apply_order_status_change
 
 router = APIRouter(prefix="/woocommerce", tags=["WooCommerce"])
 
@@ -88,10 +91,15 @@ async def sync_order(payload: WooOrderPayload, _: None = Depends(verify_wc_secre
         "woo_status": payload.status,
         "updated_at": datetime.now(timezone.utc).isoformat()
     }
+    order_doc.update(order_geo_points(order_doc))
 
     existing = await db.orders.find_one({"woo_order_id": payload.woo_order_id}, {"_id": 0})
     if existing:
         await db.orders.update_one({"woo_order_id": payload.woo_order_id}, {"$set": order_doc})
+        if status_value != existing.get("status"):
+            await apply_order_status_change(existing, status_value)
+        if status_value == OrderStatus.ACCEPTED:
+            await auto_dispatch(existing["id"])
         updated = await db.orders.find_one({"woo_order_id": payload.woo_order_id}, {"_id": 0})
         return OrderResponse(**updated)
 
@@ -117,7 +125,10 @@ async def sync_order(payload: WooOrderPayload, _: None = Depends(verify_wc_secre
     order_dict = order.model_dump()
     order_dict["created_at"] = serialize_datetime(order_dict["created_at"])
     order_dict["updated_at"] = serialize_datetime(order_dict["updated_at"])
+    order_dict.update(order_geo_points(order_dict))
     await db.orders.insert_one(order_dict)
+    if status_value == OrderStatus.ACCEPTED and await auto_dispatch(order.id):
+        order = Order(**await db.orders.find_one({"id": order.id}, {"_id": 0}))
     return OrderResponse(**order.model_dump())
 
 
@@ -142,6 +153,9 @@ async def update_order_status(woo_order_id: str, payload: WooStatusUpdate, _: No
             }
         }
     )
+    await apply_order_status_change(order, medex_status)
+    if medex_status == OrderStatus.ACCEPTED:
+        await auto_dispatch(order["id"])
     return {"message": "Status updated", "status": medex_status}
 
 
@@ -30,6 +30,13 @@ from routes import (
     woocommerce_router
 )
 
+from utils import close_maps_client, geocode_cache_stats, route_cache_stats, leg_cache_stats, optimization_cache_stats, single_flight_stats, load_eta_model, get_eta_model, load_hub_matrix, get_hub_matrix
+from utils.eta_tracker import eta_tracker
+from utils.driver_index import driver_index
+from utils.dispatch import batch_matcher, offer_timeouts
+from utils.jobs import optimization_jobs
+from solvers.pool import shutdown_pool, pool_stats
+
 # Import WebSocket handlers
 from socket_handlers.handlers import (
     handle_driver_location,
@@ -103,7 +110,22 @@ async def health_check():
         await db.command("ping")
         return {
             "status": "healthy",
-            "database": "connected"
+            "database": "connected",
+            "caches": {
+                "geocode": geocode_cache_stats(),
+                "directions": route_cache_stats(),
+                "legs": leg_cache_stats(),
+                "optimizations": optimization_cache_stats()
+            },
+            "maps_single_flight": single_flight_stats(),
+            "eta_model": get_eta_model().info() if get_eta_model() else None,
+            "hub_matrix": get_hub_matrix().info() if get_hub_matrix() else None,
+            "eta_tracker": eta_tracker.stats(),
+            "driver_index": driver_index.stats(),
+            "dispatch_tick": batch_matcher.stats(),
+            "offer_timeouts": offer_timeouts.stats(),
+            "optimizer_pool": pool_stats(),
+            "optimization_jobs": optimization_jobs.stats()
         }
     except Exception as e:
         return {
@@ -112,11 +134,26 @@ async def health_check():
             "error": str(e)
         }
 
+# Scalar coordinate indexes superseded by the 2dsphere indexes: they cost a
+# write on every location ping but could not serve any geospatial query
+LEGACY_COORDINATE_INDEXES = {
+    "drivers": ["current_latitude_1", "current_longitude_1"],
+    "orders": ["pickup_latitude_1", "pickup_longitude_1", "delivery_latitude_1", "delivery_longitude_1"],
+    "location_events": ["latitude_1", "longitude_1"]
+}
+
 # Create database indexes on startup
 @app.on_event("startup")
 async def create_indexes():
     """Create MongoDB indexes for better performance"""
     try:
+        # Drop the legacy coordinate indexes from existing deployments
+        for collection, index_names in LEGACY_COORDINATE_INDEXES.items():
+            existing = await db[collection].index_information()
+            for index_name in index_names:
+                if index_name in existing:
+                    await db[collection].drop_index(index_name)
+        
         # Users index
         await db.users.create_index("email", unique=True)
         await db.users.create_index("id", unique=True)
@@ -126,9 +163,8 @@ async def create_indexes():
         await db.drivers.create_index("vendor_id")
         await db.drivers.create_index("user_id")
         await db.drivers.create_index("status")
-        # Regular indexes for driver location coordinates
-        await db.drivers.create_index("current_latitude")
-        await db.drivers.create_index("current_longitude")
+        # GeoJSON driver location for $geoNear queries
+        await db.drivers.create_index([("current_location", "2dsphere")])
         
         # Orders indexes
         await db.orders.create_index("id", unique=True)
@@ -139,21 +175,25 @@ async def create_indexes():
         await db.orders.create_index("driver_id")
         await db.orders.create_index("status")
         await db.orders.create_index("created_at")
-        # Regular indexes for pickup and delivery location coordinates
-        await db.orders.create_index("pickup_latitude")
-        await db.orders.create_index("pickup_longitude")
-        await db.orders.create_index("delivery_latitude")
-        await db.orders.create_index("delivery_longitude")
+        # GeoJSON pickup and delivery points for $geoNear / $geoWithin queries
+        await db.orders.create_index([("pickup_location", "2dsphere")])
+        await db.orders.create_index([("delivery_location", "2dsphere")])
         
         # Location events indexes
         await db.location_events.create_index("driver_id")
         await db.location_events.create_index("timestamp")
-        # Regular indexes for location event coordinates
-        await db.location_events.create_index("latitude")
-        await db.location_events.create_index("longitude")
         # TTL index to auto-delete old location events after 30 days
         await db.location_events.create_index("timestamp", expireAfterSeconds=2592000)
         
+        # Geocode cache indexes
+        await db.geocode_cache.create_index("address_key", unique=True)
+        # TTL index to re-geocode cached addresses after 90 days
+        await db.geocode_cache.create_index("cached_at", expireAfterSeconds=7776000)
+        
+        # Route plans indexes (one stored plan per driver)
+        await db.route_plans.create_index("driver_id", unique=True)
+        await db.route_plans.create_index("vendor_id")
+        
         # Vendors index
         await db.vendors.create_index("id", unique=True)
         await db.vendors.create_index("user_id")
@@ -163,15 +203,65 @@ async def create_indexes():
         await db.assignments.create_index("order_id")
         await db.assignments.create_index("driver_id")
         await db.assignments.create_index("vendor_id")
+        # Pending offers to reschedule on startup
+        await db.assignments.create_index([("status", 1), ("expires_at", 1)])
         
         logging.info("Database indexes created successfully")
     except Exception as e:
         logging.error(f"Error creating indexes: {e}")
 
+@app.on_event("startup")
+async def load_local_eta_model():
+    """Load the offline-trained ETA model (see jobs/train_eta_model.py)"""
+    load_eta_model()
+
+@app.on_event("startup")
+async def load_precomputed_hub_matrix():
+    """Load the vendor -> delivery zone matrix (see jobs/build_hub_matrix.py)"""
+    load_hub_matrix()
+
+@app.on_event("startup")
+async def warm_driver_index():
+    """Seed the live driver position index from last known locations"""
+    try:
+        await driver_index.load(db)
+    except Exception as e:
+        logging.error(f"Error warming driver index: {e}")
+
+@app.on_event("startup")
+async def start_dispatch_tick():
+    """Start batch driver-order matching when DISPATCH_BATCH_INTERVAL_SECONDS is set"""
+    batch_matcher.start()
+
+@app.on_event("startup")
+async def start_offer_timeouts():
+    """Reschedule pending assignment offers and start expiring unanswered ones"""
+    try:
+        await offer_timeouts.load(db)
+    except Exception as e:
+        logging.error(f"Error loading pending assignment offers: {e}")
+    offer_timeouts.start()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
     client.close()
 
+@app.on_event("shutdown")
+async def shutdown_maps_client():
+    await close_maps_client()
+
+@app.on_event("shutdown")
+async def stop_dispatch_tick():
+    await batch_matcher.stop()
+
+@app.on_event("shutdown")
+async def stop_offer_timeouts():
+    await offer_timeouts.stop()
+
+@app.on_event("shutdown")
+async def shutdown_optimizer_pool():
+    shutdown_pool()
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -1,6 +1,9 @@
 from fastapi import WebSocket, WebSocketDisconnect, Depends, Query, HTTPException, status
 from motor.motor_asyncio import AsyncIOMotorClient
-from utils import verify_token, calculate_eta
+from utils import verify_token, calculate_live_eta
+from utils.eta_tracker import eta_tracker
+from utils.driver_index import driver_index
+from utils.geo import geo_point
 from .manager import manager
 import os
 import logging
@@ -83,16 +86,26 @@ async def handle_driver_location(websocket: WebSocket, token: str = Query(...)):
                 speed = data.get("speed", 0)
                 heading = data.get("heading", 0)
                 
-                # Update driver location in DB
-                await db.drivers.update_one(
+                # Update driver location in DB; the same round trip returns the
+                # current status, which may have changed since the socket opened
+                stored = await db.drivers.find_one_and_update(
                     {"id": driver_id},
                     {
                         "$set": {
                             "current_latitude": latitude,
                             "current_longitude": longitude,
+                            "current_location": geo_point(latitude, longitude),
                             "last_location_update": datetime.now(timezone.utc).isoformat()
                         }
-                    }
+                    },
+                    projection={"_id": 0, "status": 1}
+                )
+                driver_index.update(
+                    driver_id,
+                    vendor_id,
+                    latitude,
+                    longitude,
+                    status=(stored or driver).get("status")
                 )
                 
                 # Store location event
@@ -130,10 +143,13 @@ async def handle_driver_location(websocket: WebSocket, token: str = Query(...)):
                 if active_order:
                     order_id = active_order["id"]
                     
-                    # Calculate ETA
-                    eta_minutes = calculate_eta(
+                    # Calculate ETA (throttled: recomputed only on movement, age or status change)
+                    eta_minutes = await eta_tracker.get_eta(
+                        order_id,
+                        active_order["status"],
                         (latitude, longitude),
-                        (active_order["delivery_latitude"], active_order["delivery_longitude"])
+                        (active_order["delivery_latitude"], active_order["delivery_longitude"]),
+                        calculate_live_eta
                     )
                     
                     # Broadcast to order tracking room
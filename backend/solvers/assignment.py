@@ -0,0 +1,78 @@
+import numpy as np
+from typing import Tuple
+
+def solve_assignment(cost: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Minimum-cost assignment of rows to columns (Hungarian method, shortest
+    augmenting paths with potentials, O(n^2 m) with NumPy inner loops).
+
+    The matrix may be rectangular; every row or every column (whichever is
+    fewer) is matched. Entries that are not finite are forbidden pairs: the
+    result matches as many allowed pairs as possible at minimum total cost
+    and never contains a forbidden one.
+    Returns (rows, cols) index arrays, sorted by row.
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    n, m = cost.shape
+    if n == 0 or m == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    transposed = n > m
+    if transposed:
+        cost = cost.T
+        n, m = m, n
+
+    allowed = np.isfinite(cost)
+    if not allowed.any():
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    # A forbidden pair costs more than any complete set of allowed pairs, so
+    # the optimum uses one only where no allowed alternative exists
+    span = float(np.abs(cost[allowed]).max())
+    c = np.where(allowed, cost, 2 * n * span + 1)
+
+    # 1-based potentials and matching as in the classic formulation;
+    # column 0 is a virtual start column
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    match = np.zeros(m + 1, dtype=np.int64)
+    way = np.zeros(m + 1, dtype=np.int64)
+
+    for row in range(1, n + 1):
+        match[0] = row
+        col0 = 0
+        min_slack = np.full(m, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[col0] = True
+            row0 = match[col0]
+            free = ~used[1:]
+            slack = c[row0 - 1] - u[row0] - v[1:]
+            better = free & (slack < min_slack)
+            min_slack[better] = slack[better]
+            way[1:][better] = col0
+
+            candidates = np.where(free, min_slack, np.inf)
+            col1 = int(np.argmin(candidates)) + 1
+            delta = candidates[col1 - 1]
+            visited = np.nonzero(used)[0]
+            u[match[visited]] += delta
+            v[visited] -= delta
+            min_slack[free] -= delta
+
+            col0 = col1
+            if match[col0] == 0:
+                break
+        # Flip the augmenting path back to the start column
+        while col0:
+            col1 = way[col0]
+            match[col0] = match[col1]
+            col0 = col1
+
+    cols = np.nonzero(match[1:])[0]
+    rows = match[1:][cols] - 1
+    keep = allowed[rows, cols]
+    rows, cols = rows[keep], cols[keep]
+    if transposed:
+        rows, cols = cols, rows
+    order = np.argsort(rows)
+    return rows[order], cols[order]
@@ -0,0 +1,88 @@
+import math
+import numpy as np
+from typing import List
+
+NOISE = -1
+
+def project_km(latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """Local equirectangular projection to kilometres (accurate at city scale)"""
+    lat0 = math.radians(float(np.mean(latitudes)))
+    return np.column_stack((
+        np.asarray(longitudes, dtype=np.float64) * 111.320 * math.cos(lat0),
+        np.asarray(latitudes, dtype=np.float64) * 110.540
+    ))
+
+def _neighbour_lists(xy: np.ndarray, times: np.ndarray, eps_km: float, eps_minutes: float) -> List[np.ndarray]:
+    """
+    Neighbours of every point within eps_km and eps_minutes. Points are
+    bucketed into eps-sized grid cells so each cell only compares against
+    its 3x3 neighbourhood, one NumPy block per cell.
+    """
+    n = len(xy)
+    cells = np.floor(xy / eps_km).astype(np.int64)
+    order = np.lexsort((cells[:, 1], cells[:, 0]))
+    sorted_cells = cells[order]
+    unique_cells, starts, counts = np.unique(sorted_cells, axis=0, return_index=True, return_counts=True)
+    cell_index = {(int(cx), int(cy)): (start, count) for (cx, cy), start, count in zip(unique_cells, starts, counts)}
+
+    neighbours: List[np.ndarray] = [np.empty(0, dtype=np.int64)] * n
+    for (cx, cy), (start, count) in cell_index.items():
+        members = order[start:start + count]
+        candidates = np.concatenate([
+            order[s:s + c]
+            for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+            for s, c in [cell_index.get((cx + dx, cy + dy), (0, 0))]
+        ])
+        offsets = xy[members][:, np.newaxis, :] - xy[candidates][np.newaxis, :, :]
+        close = (np.einsum("ijk,ijk->ij", offsets, offsets) <= eps_km ** 2) & (
+            np.abs(times[members][:, np.newaxis] - times[candidates][np.newaxis, :]) <= eps_minutes
+        )
+        for row, member in enumerate(members):
+            neighbours[member] = candidates[close[row]]
+    return neighbours
+
+def dbscan(
+    xy: np.ndarray,
+    times: np.ndarray,
+    eps_km: float,
+    eps_minutes: float,
+    min_samples: int = 2
+) -> np.ndarray:
+    """
+    DBSCAN over planar coordinates (km) and a time axis (minutes): two points
+    are neighbours when they are within eps_km and eps_minutes of each other.
+    Returns a cluster label per point, NOISE (-1) for unclustered points.
+    """
+    n = len(xy)
+    labels = np.full(n, NOISE, dtype=np.int64)
+    if n == 0:
+        return labels
+    neighbours = _neighbour_lists(np.asarray(xy, dtype=np.float64), np.asarray(times, dtype=np.float64), eps_km, eps_minutes)
+    core = np.array([len(found) >= min_samples for found in neighbours])
+
+    cluster = 0
+    for seed in np.nonzero(core)[0]:
+        if labels[seed] != NOISE:
+            continue
+        labels[seed] = cluster
+        frontier = [seed]
+        while frontier:
+            point = frontier.pop()
+            if not core[point]:
+                continue
+            found = neighbours[point]
+            fresh = found[labels[found] == NOISE]
+            labels[fresh] = cluster
+            frontier.extend(fresh.tolist())
+        cluster += 1
+    return labels
+
+def split_cluster(xy: np.ndarray, members: np.ndarray, max_size: int) -> List[np.ndarray]:
+    """Split an oversized cluster into contiguous chunks along its principal axis"""
+    if len(members) <= max_size:
+        return [members]
+    points = xy[members] - xy[members].mean(axis=0)
+    _, _, axes = np.linalg.svd(points, full_matrices=False)
+    ordered = members[np.argsort(points @ axes[0])]
+    chunks = math.ceil(len(members) / max_size)
+    return [chunk for chunk in np.array_split(ordered, chunks)]
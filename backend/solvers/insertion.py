@@ -0,0 +1,59 @@
+import numpy as np
+from typing import Tuple
+
+# Edge k of a planned route joins stop k to stop k + 1; the last edge is the
+# open end after the final stop (leg cost 0, nothing to reach afterwards).
+# "to_x[k]" is the cost from stop k to the new node x and "from_x[k]" the
+# cost from x to stop k + 1 (0 on the open end).
+
+def insertion_deltas(leg_cost: np.ndarray, to_node: np.ndarray, from_node: np.ndarray) -> np.ndarray:
+    """Extra cost of placing a node on each edge"""
+    return np.asarray(to_node) + np.asarray(from_node) - np.asarray(leg_cost)
+
+def best_insertion(
+    leg_cost: np.ndarray,
+    to_node: np.ndarray,
+    from_node: np.ndarray,
+    min_edge: int = 0
+) -> Tuple[float, int]:
+    """Cheapest edge for a single stop. Returns (delta cost, edge index)"""
+    deltas = insertion_deltas(leg_cost, to_node, from_node)[min_edge:]
+    edge = int(np.argmin(deltas))
+    return float(deltas[edge]), edge + min_edge
+
+def best_pair_insertion(
+    leg_cost: np.ndarray,
+    to_pickup: np.ndarray,
+    from_pickup: np.ndarray,
+    to_drop: np.ndarray,
+    from_drop: np.ndarray,
+    pickup_to_drop: float,
+    min_edge: int = 0
+) -> Tuple[float, int, int]:
+    """
+    Cheapest placement of a pickup and its drop-off (pickup first) in O(n).
+
+    Placing them on different edges i < j costs insert_pickup[i] +
+    insert_drop[j], so the best drop edge for every i is a suffix minimum.
+    Placing both on edge k costs to_pickup[k] + pickup_to_drop + from_drop[k]
+    - leg_cost[k]. Edges before min_edge (already driven) are excluded.
+    Returns (delta cost, pickup edge, drop edge).
+    """
+    insert_pickup = insertion_deltas(leg_cost, to_pickup, from_pickup)[min_edge:]
+    insert_drop = insertion_deltas(leg_cost, to_drop, from_drop)[min_edge:]
+    adjacent = (
+        np.asarray(to_pickup) + pickup_to_drop + np.asarray(from_drop) - np.asarray(leg_cost)
+    )[min_edge:]
+
+    best_k = int(np.argmin(adjacent))
+    best = (float(adjacent[best_k]), best_k + min_edge, best_k + min_edge)
+
+    if len(insert_drop) > 1:
+        # suffix_min[k]: cheapest drop edge among k .. end
+        suffix_min = np.minimum.accumulate(insert_drop[::-1])[::-1]
+        separate = insert_pickup[:-1] + suffix_min[1:]
+        i = int(np.argmin(separate))
+        if separate[i] < best[0]:
+            j = i + 1 + int(np.argmin(insert_drop[i + 1:]))
+            best = (float(separate[i]), i + min_edge, j + min_edge)
+    return best
@@ -0,0 +1,198 @@
+import time
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+
+IMPROVEMENT_EPSILON = 1e-9
+
+def _deadline_passed(deadline: Optional[float]) -> bool:
+    return deadline is not None and time.monotonic() >= deadline
+
+class _PickupDeliveryRoute:
+    """
+    Open route from node 0 with pickup -> delivery precedence.
+    A sink node (free to reach, never left) closes the route so every
+    insertion point is an edge.
+    """
+
+    def __init__(self, cost: np.ndarray, pairs: Sequence[Tuple[int, int]], singles: Sequence[int]):
+        n = cost.shape[0]
+        self.sink = n
+        self.cost = np.zeros((n + 1, n + 1))
+        self.cost[:n, :n] = cost
+        self.cost[n, :] = np.inf
+        self.pairs = [(int(p), int(d)) for p, d in pairs]
+        self.singles = [int(node) for node in singles]
+        self.partner: Dict[int, int] = {}
+        for p, d in self.pairs:
+            self.partner[p] = d
+            self.partner[d] = p
+        self.pickups = {p for p, _ in self.pairs}
+        self.tour = [0, self.sink]
+
+    def tour_cost(self, tour: List[int]) -> float:
+        nodes = np.asarray(tour)
+        return float(self.cost[nodes[:-1], nodes[1:]].sum())
+
+    def _insertion_deltas(self, tour: List[int], node: int) -> np.ndarray:
+        nodes = np.asarray(tour)
+        a, b = nodes[:-1], nodes[1:]
+        return self.cost[a, node] + self.cost[node, b] - self.cost[a, b]
+
+    def _best_pair_insertion(self, tour: List[int], p: int, d: int) -> Tuple[float, List[int]]:
+        """Cheapest placement of a pickup and its delivery (pickup first)"""
+        nodes = np.asarray(tour)
+        a, b = nodes[:-1], nodes[1:]
+        insert_p = self.cost[a, p] + self.cost[p, b] - self.cost[a, b]
+        insert_d = self.cost[a, d] + self.cost[d, b] - self.cost[a, b]
+        # Separate edges: pickup on edge i, delivery on a later edge j
+        separate = insert_p[:, np.newaxis] + insert_d[np.newaxis, :]
+        separate[np.tril_indices(len(a))] = np.inf
+        # Same edge: a -> p -> d -> b
+        adjacent = self.cost[a, p] + self.cost[p, d] + self.cost[d, b] - self.cost[a, b]
+
+        i, j = np.unravel_index(int(np.argmin(separate)), separate.shape)
+        k = int(np.argmin(adjacent))
+        if adjacent[k] <= separate[i, j]:
+            return float(adjacent[k]), tour[:k + 1] + [p, d] + tour[k + 1:]
+        return float(separate[i, j]), tour[:i + 1] + [p] + tour[i + 1:j + 1] + [d] + tour[j + 1:]
+
+    def construct(self, deadline: Optional[float] = None):
+        """
+        Insert the cheapest remaining pair (or single stop) one at a time.
+        Once the deadline passes the rest are appended greedily instead.
+        """
+        remaining_pairs = list(self.pairs)
+        remaining_singles = list(self.singles)
+        while remaining_pairs or remaining_singles:
+            if _deadline_passed(deadline):
+                self._append_nearest(remaining_pairs, remaining_singles)
+                return
+            best_delta, best_tour, best_item = np.inf, None, None
+            for pair in remaining_pairs:
+                delta, tour = self._best_pair_insertion(self.tour, *pair)
+                if delta < best_delta:
+                    best_delta, best_tour, best_item = delta, tour, pair
+            for node in remaining_singles:
+                deltas = self._insertion_deltas(self.tour, node)
+                e = int(np.argmin(deltas))
+                if deltas[e] < best_delta:
+                    best_delta, best_item = float(deltas[e]), node
+                    best_tour = self.tour[:e + 1] + [node] + self.tour[e + 1:]
+            self.tour = best_tour
+            if isinstance(best_item, tuple):
+                remaining_pairs.remove(best_item)
+            else:
+                remaining_singles.remove(best_item)
+
+    def _append_nearest(self, remaining_pairs: List[Tuple[int, int]], remaining_singles: List[int]):
+        """Append the remaining stops before the sink, nearest first (pickup then delivery)"""
+        items: List[Tuple[int, ...]] = [*remaining_pairs, *((node,) for node in remaining_singles)]
+        tail = self.tour[:-1]
+        while items:
+            first = np.array([item[0] for item in items])
+            item = items.pop(int(np.argmin(self.cost[tail[-1], first])))
+            tail.extend(item)
+        self.tour = tail + [self.sink]
+
+    def relocate_pairs(self, deadline: Optional[float]) -> bool:
+        """Remove a pickup/delivery pair and re-insert it at its best positions"""
+        improved = False
+        current = self.tour_cost(self.tour)
+        for p, d in self.pairs:
+            if _deadline_passed(deadline):
+                break
+            reduced = [node for node in self.tour if node != p and node != d]
+            delta, tour = self._best_pair_insertion(reduced, p, d)
+            new_cost = self.tour_cost(reduced) + delta
+            if new_cost < current - IMPROVEMENT_EPSILON:
+                self.tour, current, improved = tour, new_cost, True
+        return improved
+
+    def relocate_nodes(self, deadline: Optional[float]) -> bool:
+        """Move single stops, keeping every pickup ahead of its delivery"""
+        improved = False
+        current = self.tour_cost(self.tour)
+        for node in list(self.tour[1:-1]):
+            if _deadline_passed(deadline):
+                break
+            reduced = [other for other in self.tour if other != node]
+            deltas = self._insertion_deltas(reduced, node)
+            partner = self.partner.get(node)
+            if partner is not None:
+                # Inserting on edge e puts the node at position e + 1
+                q = reduced.index(partner)
+                edges = np.arange(len(deltas))
+                allowed = edges < q if node in self.pickups else edges >= q
+                deltas = np.where(allowed, deltas, np.inf)
+            e = int(np.argmin(deltas))
+            new_cost = self.tour_cost(reduced) + float(deltas[e])
+            if new_cost < current - IMPROVEMENT_EPSILON:
+                self.tour = reduced[:e + 1] + [node] + reduced[e + 1:]
+                current, improved = new_cost, True
+        return improved
+
+    def two_opt(self, deadline: Optional[float]) -> bool:
+        """
+        2-opt restricted to reversals that contain no complete pair (reversing
+        both ends of a pair would put its delivery before its pickup).
+        """
+        improved_any = False
+        improved = True
+        while improved and not _deadline_passed(deadline):
+            improved = False
+            tour = np.asarray(self.tour)
+            m = len(tour)
+            position = np.empty(self.sink + 1, dtype=np.int64)
+            position[tour] = np.arange(m)
+            pair_starts = np.array([position[p] for p, _ in self.pairs], dtype=np.int64)
+            pair_ends = np.array([position[d] for _, d in self.pairs], dtype=np.int64)
+            forward = np.concatenate(([0.0], np.cumsum(self.cost[tour[:-1], tour[1:]])))
+            backward = np.concatenate(([0.0], np.cumsum(self.cost[tour[1:], tour[:-1]])))
+            for i in range(m - 3):
+                inside = pair_starts >= i + 1
+                limit = int(pair_ends[inside].min()) if inside.any() else m - 1
+                j = np.arange(i + 2, min(limit, m - 1))
+                if len(j) == 0:
+                    continue
+                old = self.cost[tour[i], tour[i + 1]] + (forward[j] - forward[i + 1]) + self.cost[tour[j], tour[j + 1]]
+                new = self.cost[tour[i], tour[j]] + (backward[j] - backward[i + 1]) + self.cost[tour[i + 1], tour[j + 1]]
+                delta = new - old
+                best = int(np.argmin(delta))
+                if delta[best] < -IMPROVEMENT_EPSILON:
+                    jj = int(j[best])
+                    tour[i + 1:jj + 1] = tour[i + 1:jj + 1][::-1]
+                    self.tour = tour.tolist()
+                    improved = improved_any = True
+                    break
+        return improved_any
+
+def is_precedence_feasible(route: Sequence[int], pairs: Sequence[Tuple[int, int]]) -> bool:
+    position = {node: index for index, node in enumerate(route)}
+    return all(position[p] < position[d] for p, d in pairs)
+
+def solve_pickup_delivery(
+    cost: np.ndarray,
+    pairs: Sequence[Tuple[int, int]],
+    singles: Sequence[int] = (),
+    time_limit_seconds: Optional[float] = None
+) -> Tuple[List[int], float]:
+    """
+    Open route from node 0 visiting every pickup before its paired delivery.
+    pairs are (pickup_node, delivery_node); singles are stops without a
+    precedence constraint (e.g. orders already picked up).
+    Cheapest pair insertion (finished nearest-first if the deadline passes
+    first), then pair relocation, precedence-aware node relocation and
+    restricted 2-opt until no move improves or the deadline passes.
+    Returns (route starting at node 0, route cost).
+    """
+    deadline = time.monotonic() + time_limit_seconds if time_limit_seconds else None
+    route = _PickupDeliveryRoute(np.asarray(cost, dtype=np.float64), pairs, singles)
+    route.construct(deadline)
+    while not _deadline_passed(deadline):
+        improved = route.relocate_pairs(deadline)
+        improved = route.relocate_nodes(deadline) or improved
+        improved = route.two_opt(deadline) or improved
+        if not improved:
+            break
+    tour = route.tour[:-1]
+    return tour, route.tour_cost(route.tour)
@@ -0,0 +1,69 @@
+import os
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Worker processes for CPU-bound route optimization (keeps the event loop free)
+OPTIMIZER_WORKERS = int(os.environ.get("OPTIMIZER_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+# Upper bound on a caller-supplied optimization time budget
+OPTIMIZER_MAX_TIME_LIMIT_SECONDS = float(os.environ.get("OPTIMIZER_MAX_TIME_LIMIT_SECONDS", "30"))
+
+_executor: Optional[ProcessPoolExecutor] = None
+_running = 0
+_completed = 0
+
+def get_executor() -> ProcessPoolExecutor:
+    """
+    Lazily create the shared process pool. Workers are spawned rather than
+    forked so they never inherit the API process's threads (Mongo, HTTP).
+    """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=OPTIMIZER_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+def shutdown_pool():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+def time_budget(requested: Optional[float], default: float) -> float:
+    """Caller-supplied time limit, capped at OPTIMIZER_MAX_TIME_LIMIT_SECONDS"""
+    return min(requested or default, OPTIMIZER_MAX_TIME_LIMIT_SECONDS)
+
+async def run_in_pool(fn: Callable[..., Any], *args: Any) -> Any:
+    """
+    Run a picklable solver function in the process pool and await its result.
+    Solvers are anytime: they return the best solution found by the time
+    limit they are given. A crashed pool is replaced and the call retried once.
+    """
+    global _executor, _running, _completed
+    loop = asyncio.get_running_loop()
+    _running += 1
+    try:
+        try:
+            return await loop.run_in_executor(get_executor(), fn, *args)
+        except BrokenProcessPool:
+            logger.error("Optimizer process pool broke. Restarting it.")
+            _executor = None
+            return await loop.run_in_executor(get_executor(), fn, *args)
+    finally:
+        _running -= 1
+        _completed += 1
+
+def pool_stats() -> Dict[str, Any]:
+    return {
+        "workers": OPTIMIZER_WORKERS,
+        "started": _executor is not None,
+        "running": _running,
+        "completed": _completed
+    }
@@ -0,0 +1,163 @@
+import time
+import numpy as np
+from typing import List, Optional, Tuple
+
+# Instances with at most this many intermediate stops are solved exactly (Held-Karp)
+EXACT_MAX_STOPS = 10
+IMPROVEMENT_EPSILON = 1e-9
+
+def route_cost(cost: np.ndarray, route: List[int]) -> float:
+    """Total cost of visiting nodes in order"""
+    nodes = np.asarray(route)
+    return float(cost[nodes[:-1], nodes[1:]].sum())
+
+def _deadline_passed(deadline: Optional[float]) -> bool:
+    return deadline is not None and time.monotonic() >= deadline
+
+def held_karp(cost: np.ndarray) -> List[int]:
+    """
+    Exact open-path TSP by dynamic programming over subsets.
+    Node 0 is the start, node n-1 the end; every other node is visited once.
+    O(2^k * k^2) for k intermediate nodes, vectorized over the last node.
+    """
+    n = cost.shape[0]
+    k = n - 2
+    if k <= 0:
+        return list(range(n))
+
+    inner = cost[1:n - 1, 1:n - 1]
+    full = 1 << k
+    bits = 1 << np.arange(k)
+    dp = np.full((full, k), np.inf)
+    parent = np.full((full, k), -1, dtype=np.int64)
+    dp[bits, np.arange(k)] = cost[0, 1:n - 1]
+
+    for mask in range(1, full):
+        row = dp[mask]
+        if not np.isfinite(row).any():
+            continue
+        # candidates[i, j]: reach j next after ending at i
+        candidates = row[:, np.newaxis] + inner
+        best_prev = np.argmin(candidates, axis=0)
+        best_cost = candidates[best_prev, np.arange(k)]
+        free = (mask & bits) == 0
+        targets = np.nonzero(free)[0]
+        new_masks = mask | bits[targets]
+        improved = best_cost[targets] < dp[new_masks, targets]
+        dp[new_masks[improved], targets[improved]] = best_cost[targets][improved]
+        parent[new_masks[improved], targets[improved]] = best_prev[targets][improved]
+
+    last = int(np.argmin(dp[full - 1] + cost[1:n - 1, n - 1]))
+    order = []
+    mask = full - 1
+    while last != -1:
+        order.append(last + 1)
+        previous = int(parent[mask, last])
+        mask ^= 1 << last
+        last = previous
+    return [0] + order[::-1] + [n - 1]
+
+def nearest_neighbour(cost: np.ndarray) -> List[int]:
+    """Greedy construction: always move to the closest unvisited stop"""
+    n = cost.shape[0]
+    visited = np.zeros(n, dtype=bool)
+    visited[0] = visited[n - 1] = True
+    route = [0]
+    current = 0
+    for _ in range(n - 2):
+        distances = np.where(visited, np.inf, cost[current])
+        current = int(np.argmin(distances))
+        visited[current] = True
+        route.append(current)
+    route.append(n - 1)
+    return route
+
+def two_opt(cost: np.ndarray, route: List[int], deadline: Optional[float] = None) -> Tuple[List[int], bool]:
+    """
+    2-opt with fixed endpoints. Handles asymmetric costs by comparing the
+    forward and reversed cost of the segment via prefix sums.
+    Returns the improved route and whether any move was applied.
+    """
+    tour = np.asarray(route)
+    m = len(tour)
+    improved_any = False
+    improved = True
+    while improved and not _deadline_passed(deadline):
+        improved = False
+        forward = np.concatenate(([0.0], np.cumsum(cost[tour[:-1], tour[1:]])))
+        backward = np.concatenate(([0.0], np.cumsum(cost[tour[1:], tour[:-1]])))
+        for i in range(m - 3):
+            j = np.arange(i + 2, m - 1)
+            old = cost[tour[i], tour[i + 1]] + (forward[j] - forward[i + 1]) + cost[tour[j], tour[j + 1]]
+            new = cost[tour[i], tour[j]] + (backward[j] - backward[i + 1]) + cost[tour[i + 1], tour[j + 1]]
+            delta = new - old
+            best = int(np.argmin(delta))
+            if delta[best] < -IMPROVEMENT_EPSILON:
+                jj = int(j[best])
+                tour[i + 1:jj + 1] = tour[i + 1:jj + 1][::-1]
+                improved = improved_any = True
+                break
+    return tour.tolist(), improved_any
+
+def or_opt(cost: np.ndarray, route: List[int], deadline: Optional[float] = None, max_segment: int = 3) -> Tuple[List[int], bool]:
+    """
+    Or-opt: relocate segments of 1..max_segment consecutive stops (orientation
+    kept) to the cheapest other position. Endpoints stay fixed.
+    """
+    tour = list(route)
+    improved_any = False
+    improved = True
+    while improved and not _deadline_passed(deadline):
+        improved = False
+        m = len(tour)
+        nodes = np.asarray(tour)
+        edge = cost[nodes[:-1], nodes[1:]]
+        for length in range(1, max_segment + 1):
+            for s in range(1, m - length):
+                e = s + length - 1
+                removal_gain = edge[s - 1] + edge[e] - cost[nodes[s - 1], nodes[e + 1]]
+                positions = np.arange(m - 1)
+                allowed = (positions < s - 1) | (positions > e)
+                p = positions[allowed]
+                insert_cost = cost[nodes[p], nodes[s]] + cost[nodes[e], nodes[p + 1]] - edge[p]
+                delta = insert_cost - removal_gain
+                if len(delta) == 0:
+                    continue
+                best = int(np.argmin(delta))
+                if delta[best] < -IMPROVEMENT_EPSILON:
+                    target = int(p[best])
+                    segment = tour[s:e + 1]
+                    remaining = tour[:s] + tour[e + 1:]
+                    insert_at = target + 1 if target < s else target + 1 - length
+                    tour = remaining[:insert_at] + segment + remaining[insert_at:]
+                    improved = improved_any = True
+                    break
+            if improved:
+                break
+    return tour, improved_any
+
+def local_search(cost: np.ndarray, route: List[int], deadline: Optional[float] = None) -> List[int]:
+    """Alternate 2-opt and Or-opt until neither improves or the deadline passes"""
+    while not _deadline_passed(deadline):
+        route, improved_2opt = two_opt(cost, route, deadline)
+        route, improved_oropt = or_opt(cost, route, deadline)
+        if not improved_oropt:
+            break
+    return route
+
+def solve_open_tsp(cost: np.ndarray, time_limit_seconds: Optional[float] = None) -> Tuple[List[int], float]:
+    """
+    Shortest path from node 0 to node n-1 through every other node.
+    Exact for small instances, otherwise nearest neighbour + 2-opt/Or-opt.
+    Returns (route including both endpoints, route cost).
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    n = cost.shape[0]
+    if n <= 3:
+        route = list(range(n))
+    elif n - 2 <= EXACT_MAX_STOPS:
+        route = held_karp(cost)
+    else:
+        deadline = time.monotonic() + time_limit_seconds if time_limit_seconds else None
+        route = local_search(cost, nearest_neighbour(cost), deadline)
+    return route, route_cost(cost, route)
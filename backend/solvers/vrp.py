@@ -0,0 +1,210 @@
+import time
+import numpy as np
+from typing import Dict, List, Optional, Any
+from .tsp import local_search
+
+# Orders a vehicle can carry at once, by Driver.vehicle_type
+VEHICLE_CAPACITY: Dict[str, int] = {
+    "bike": 4,
+    "scooter": 6,
+    "car": 12,
+    "van": 30
+}
+DEFAULT_VEHICLE_CAPACITY = 8
+
+FEASIBILITY_EPSILON = 1e-6
+
+def vehicle_capacity(vehicle_type: Optional[str]) -> int:
+    return VEHICLE_CAPACITY.get((vehicle_type or "").lower(), DEFAULT_VEHICLE_CAPACITY)
+
+class _Route:
+    """One vehicle's open route: depot -> stops -> sink (a zero-cost end node)"""
+
+    def __init__(self, sink: int, capacity: int):
+        self.nodes = [0, sink]
+        self.capacity = capacity
+        self.load = 0
+        self.start = np.zeros(2)
+        self.max_shift = np.array([np.inf, np.inf])
+
+class _Planner:
+    def __init__(
+        self,
+        duration: np.ndarray,
+        demands: np.ndarray,
+        capacities: List[int],
+        window_start: np.ndarray,
+        window_end: np.ndarray,
+        service_minutes: float
+    ):
+        n = duration.shape[0]
+        self.sink = n
+        # Append the sink: reaching it is free from every node
+        self.duration = np.zeros((n + 1, n + 1))
+        self.duration[:n, :n] = duration
+        self.duration[n, :] = np.inf
+        self.demands = np.concatenate((demands, [0]))
+        self.early = np.concatenate((window_start, [0.0]))
+        self.late = np.concatenate((window_end, [np.inf]))
+        self.service = np.full(n + 1, service_minutes)
+        self.service[0] = 0.0
+        self.service[n] = 0.0
+        self.routes = [_Route(self.sink, capacity) for capacity in capacities]
+        self.unrouted = np.ones(n + 1, dtype=bool)
+        self.unrouted[[0, n]] = False
+        self.best_delta = np.full((len(self.routes), n + 1), np.inf)
+        self.best_position = np.zeros((len(self.routes), n + 1), dtype=np.int64)
+
+    def _schedule(self, route: _Route):
+        """Recompute service start times and push-forward slack for a route"""
+        nodes = np.asarray(route.nodes)
+        start = np.zeros(len(nodes))
+        arrival = np.zeros(len(nodes))
+        for i in range(1, len(nodes)):
+            arrival[i] = start[i - 1] + self.service[nodes[i - 1]] + self.duration[nodes[i - 1], nodes[i]]
+            start[i] = max(arrival[i], self.early[nodes[i]])
+        max_shift = np.full(len(nodes), np.inf)
+        for i in range(len(nodes) - 2, 0, -1):
+            waiting = start[i + 1] - arrival[i + 1]
+            max_shift[i] = min(self.late[nodes[i]] - start[i], waiting + max_shift[i + 1])
+        route.start = start
+        route.max_shift = max_shift
+
+    def _evaluate_route(self, index: int):
+        """Cheapest feasible insertion of every unrouted order into one route"""
+        route = self.routes[index]
+        candidates = np.nonzero(self.unrouted)[0]
+        self.best_delta[index, :] = np.inf
+        if len(candidates) == 0:
+            return
+
+        nodes = np.asarray(route.nodes)
+        a, b = nodes[:-1], nodes[1:]
+        departure_a = route.start[:-1] + self.service[a]
+        start_b = route.start[1:]
+        slack_b = route.max_shift[1:]
+
+        t_au = self.duration[np.ix_(candidates, a)]
+        t_ub = self.duration[np.ix_(candidates, b)]
+        t_ab = self.duration[a, b]
+
+        start_u = np.maximum(departure_a[np.newaxis, :] + t_au, self.early[candidates][:, np.newaxis])
+        new_start_b = np.maximum(
+            start_u + self.service[candidates][:, np.newaxis] + t_ub,
+            self.early[b][np.newaxis, :]
+        )
+        feasible = (
+            (start_u <= self.late[candidates][:, np.newaxis] + FEASIBILITY_EPSILON)
+            & (new_start_b - start_b[np.newaxis, :] <= slack_b[np.newaxis, :] + FEASIBILITY_EPSILON)
+            & (route.load + self.demands[candidates] <= route.capacity)[:, np.newaxis]
+        )
+        delta = np.where(feasible, t_au + t_ub - t_ab[np.newaxis, :], np.inf)
+        position = np.argmin(delta, axis=1)
+        self.best_delta[index, candidates] = delta[np.arange(len(candidates)), position]
+        self.best_position[index, candidates] = position
+
+    def construct(self, deadline: Optional[float] = None):
+        for index, route in enumerate(self.routes):
+            self._schedule(route)
+            self._evaluate_route(index)
+
+        while self.unrouted.any():
+            if deadline is not None and time.monotonic() >= deadline:
+                self._append_remaining()
+                return
+            flat = int(np.argmin(self.best_delta))
+            route_index, order = divmod(flat, self.best_delta.shape[1])
+            if not np.isfinite(self.best_delta[route_index, order]):
+                break
+            route = self.routes[route_index]
+            route.nodes.insert(int(self.best_position[route_index, order]) + 1, int(order))
+            route.load += int(self.demands[order])
+            self.unrouted[order] = False
+            self.best_delta[:, order] = np.inf
+            self._schedule(route)
+            self._evaluate_route(route_index)
+
+    def _append_remaining(self):
+        """
+        Greedy finish once the time budget is spent: earliest deadline first,
+        each order goes to the end of the route that reaches it soonest while
+        its window and the vehicle's capacity still allow. Appending never
+        delays the stops already on a route.
+        """
+        candidates = np.nonzero(self.unrouted)[0]
+        for order in candidates[np.argsort(self.late[candidates], kind="stable")]:
+            best_index, best_start = None, np.inf
+            for index, route in enumerate(self.routes):
+                if route.load + self.demands[order] > route.capacity:
+                    continue
+                last = route.nodes[-2]
+                arrival = route.start[-2] + self.service[last] + self.duration[last, order]
+                start = max(arrival, self.early[order])
+                if start <= self.late[order] + FEASIBILITY_EPSILON and start < best_start:
+                    best_index, best_start = index, start
+            if best_index is None:
+                continue
+            route = self.routes[best_index]
+            route.nodes.insert(len(route.nodes) - 1, int(order))
+            route.load += int(self.demands[order])
+            self.unrouted[order] = False
+            self._schedule(route)
+
+    def improve(self, deadline: Optional[float]):
+        """Intra-route 2-opt/Or-opt for routes whose stops carry no time window"""
+        for route in self.routes:
+            stops = route.nodes[1:-1]
+            if len(stops) < 3:
+                continue
+            if np.isfinite(self.late[stops]).any() or (self.early[stops] > 0).any():
+                continue
+            nodes = np.asarray(route.nodes)
+            sub_cost = self.duration[np.ix_(nodes, nodes)]
+            sub_cost[:, -1] = 0.0
+            sub_cost[-1, :] = 0.0
+            order = local_search(sub_cost, list(range(len(nodes))), deadline)
+            route.nodes = [int(nodes[i]) for i in order]
+            self._schedule(route)
+
+def plan_routes(
+    duration: np.ndarray,
+    demands: np.ndarray,
+    capacities: List[int],
+    window_start: np.ndarray,
+    window_end: np.ndarray,
+    service_minutes: float = 3.0,
+    time_limit_seconds: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Multi-vehicle open-route planner with capacities and time windows.
+
+    duration is an (n x n) travel-time matrix in minutes where node 0 is the
+    depot (pickup) and nodes 1..n-1 are deliveries. Windows are minutes from
+    the common start time (0 / inf when unconstrained). Every vehicle starts
+    at the depot at time 0 and ends at its last delivery.
+
+    Construction is a global cheapest feasible insertion whose candidate costs
+    are evaluated as NumPy blocks per route; only the route that changed is
+    re-evaluated after each insertion. If the time limit runs out during
+    construction, the remaining orders are appended to route ends greedily.
+
+    Returns dict with per-vehicle "routes" (node lists without the depot),
+    matching "arrivals" (service start minutes) and "unassigned" nodes.
+    """
+    deadline = time.monotonic() + time_limit_seconds if time_limit_seconds else None
+    planner = _Planner(
+        np.asarray(duration, dtype=np.float64),
+        np.asarray(demands, dtype=np.int64),
+        capacities,
+        np.asarray(window_start, dtype=np.float64),
+        np.asarray(window_end, dtype=np.float64),
+        service_minutes
+    )
+    planner.construct(deadline)
+    planner.improve(deadline)
+
+    return {
+        "routes": [route.nodes[1:-1] for route in planner.routes],
+        "arrivals": [route.start[1:-1].tolist() for route in planner.routes],
+        "unassigned": [int(node) for node in np.nonzero(planner.unrouted)[0]]
+    }
@@ -1,6 +1,11 @@
 from .jwt_handler import create_access_token, create_refresh_token, verify_token, get_password_hash, verify_password
-from .google_maps import get_coordinates, calculate_eta, get_route_polyline, calculate_distance, optimize_route
+from .google_maps import get_coordinates, get_directions, calculate_eta, calculate_live_eta, get_route_polyline, calculate_distance, optimize_route, get_distance_matrix, close_maps_client, route_cache_stats, leg_cache_stats, optimization_cache_stats, single_flight_stats, get_leg_costs
 from .file_handler import save_upload_file, get_file_url
+from .geocode_cache import geocode_cache_stats
+from .distance import haversine_km, haversine_one_to_many, haversine_matrix, path_length_km
+from .eta_model import load_eta_model, get_eta_model
+from .hub_matrix import load_hub_matrix, get_hub_matrix, hub_leg
+from .polyline import encode as encode_polyline, decode as decode_polyline, trail_polyline
 
 __all__ = [
     "create_access_token",
@@ -9,10 +14,32 @@ __all__ = [
     "get_password_hash",
     "verify_password",
     "get_coordinates",
+    "get_directions",
     "calculate_eta",
+    "calculate_live_eta",
     "get_route_polyline",
     "calculate_distance",
     "optimize_route",
+    "get_distance_matrix",
+    "close_maps_client",
+    "route_cache_stats",
+    "leg_cache_stats",
+    "optimization_cache_stats",
+    "get_leg_costs",
+    "single_flight_stats",
     "save_upload_file",
-    "get_file_url"
+    "get_file_url",
+    "geocode_cache_stats",
+    "haversine_km",
+    "haversine_one_to_many",
+    "haversine_matrix",
+    "path_length_km",
+    "load_eta_model",
+    "get_eta_model",
+    "load_hub_matrix",
+    "get_hub_matrix",
+    "hub_leg",
+    "encode_polyline",
+    "decode_polyline",
+    "trail_polyline"
 ]
\ No newline at end of file
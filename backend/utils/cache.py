@@ -0,0 +1,65 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+class TTLCache:
+    """
+    Bounded in-process LRU cache with per-entry time-to-live.
+
+    Not thread-safe; intended for use from the single asyncio event loop.
+    Hit/miss counters are exposed through stats() for the health endpoint.
+    """
+
+    def __init__(self, name: str, max_size: int = 1024, ttl_seconds: float = 300.0):
+        self.name = name
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return cached value or None if missing/expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        """Store value, evicting the least recently used entry when full"""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None
+        }
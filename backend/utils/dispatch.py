@@ -0,0 +1,596 @@
+import os
+import time
+import asyncio
+import logging
+import numpy as np
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from models import Assignment, AssignmentStatus, DriverStatus, OrderStatus
+from solvers.assignment import solve_assignment
+from solvers.pool import run_in_pool
+from .distance import haversine_matrix
+from .driver_index import DriverPosition, driver_index
+from .eta_model import ETA_ROAD_CIRCUITY, get_eta_model
+from .geo import geo_point
+from .google_maps import FALLBACK_SPEED_KMH, get_distance_matrix
+from .hub_matrix import hub_leg
+from .route_plans import ACTIVE_DRIVER_STATUSES, add_order_to_route_plan, remove_order_from_route_plan
+from .timer_wheel import TimerWheel
+
+logger = logging.getLogger(__name__)
+
+# Assign the best available driver as soon as an order is accepted
+AUTO_DISPATCH_ENABLED = os.environ.get("AUTO_DISPATCH_ENABLED", "true").lower() == "true"
+# Only the drivers closest in straight line get a road time-to-pickup
+DISPATCH_ROAD_CANDIDATES = int(os.environ.get("DISPATCH_ROAD_CANDIDATES", "10"))
+# Drivers whose last location fix is older than this are not dispatched (seconds)
+DISPATCH_MAX_FIX_AGE_SECONDS = float(os.environ.get("DISPATCH_MAX_FIX_AGE_SECONDS", "900"))
+# Drivers further than this (straight line, km) from the pickup are not dispatched
+DISPATCH_MAX_PICKUP_KM = float(os.environ.get("DISPATCH_MAX_PICKUP_KM", "15"))
+# Score (lower is better) = minutes to pickup
+#   + DISPATCH_LOAD_PENALTY_MINUTES per order the driver already carries
+#   + DISPATCH_FIX_AGE_PENALTY minutes per minute since the last location fix
+DISPATCH_LOAD_PENALTY_MINUTES = float(os.environ.get("DISPATCH_LOAD_PENALTY_MINUTES", "8"))
+DISPATCH_FIX_AGE_PENALTY = float(os.environ.get("DISPATCH_FIX_AGE_PENALTY", "0.5"))
+
+# Batch matching: every DISPATCH_BATCH_INTERVAL_SECONDS each vendor's waiting
+# orders are matched to its available drivers in one optimal assignment.
+# 0 disables the tick and accepted orders are dispatched one at a time.
+DISPATCH_BATCH_INTERVAL_SECONDS = float(os.environ.get("DISPATCH_BATCH_INTERVAL_SECONDS", "0"))
+# Drivers further than this (straight line, km) from a pickup are never matched to it
+DISPATCH_BATCH_MAX_PICKUP_KM = float(os.environ.get("DISPATCH_BATCH_MAX_PICKUP_KM", "15"))
+DISPATCH_BATCH_MAX_ORDERS = 500
+
+# A driver who does not answer an offer within this many seconds loses it and
+# the order moves to the next-best driver (0 = offers never expire)
+ASSIGNMENT_OFFER_TIMEOUT_SECONDS = float(os.environ.get("ASSIGNMENT_OFFER_TIMEOUT_SECONDS", "90"))
+# After this many declined or expired offers the order waits for a manual assignment
+ASSIGNMENT_MAX_OFFERS = int(os.environ.get("ASSIGNMENT_MAX_OFFERS", "5"))
+OFFER_TIMER_TICK_SECONDS = float(os.environ.get("OFFER_TIMER_TICK_SECONDS", "1"))
+OFFER_TIMER_SLOTS = 512
+
+# Lazy initialization of MongoDB client
+_client = None
+_db = None
+
+def _get_db():
+    global _client, _db
+    if _db is None:
+        mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+        db_name = os.environ.get('DB_NAME', 'medex_delivery')
+        _client = AsyncIOMotorClient(mongo_url)
+        _db = _client[db_name]
+    return _db
+
+def score_drivers(
+    minutes_to_pickup: np.ndarray,
+    active_orders: np.ndarray,
+    fix_age_seconds: np.ndarray
+) -> np.ndarray:
+    """Dispatch score per driver in minutes; lower is better"""
+    return (
+        minutes_to_pickup
+        + DISPATCH_LOAD_PENALTY_MINUTES * active_orders
+        + DISPATCH_FIX_AGE_PENALTY * fix_age_seconds / 60
+    )
+
+async def active_order_counts(driver_ids: Sequence[str]) -> Dict[str, int]:
+    """Orders each driver currently carries (assigned, picked up or out for delivery)"""
+    if not driver_ids:
+        return {}
+    cursor = _get_db().orders.aggregate([
+        {"$match": {"driver_id": {"$in": list(driver_ids)}, "status": {"$in": ACTIVE_DRIVER_STATUSES}}},
+        {"$group": {"_id": "$driver_id", "count": {"$sum": 1}}}
+    ])
+    return {row["_id"]: row["count"] async for row in cursor}
+
+async def available_driver_ids(driver_ids: Sequence[str]) -> Set[str]:
+    """
+    The drivers whose stored status is still available. The live index can
+    lag behind status changes made in another process, so dispatch confirms
+    its candidates here and corrects the index entries that were stale.
+    """
+    if not driver_ids:
+        return set()
+    drivers = await _get_db().drivers.find(
+        {"id": {"$in": list(driver_ids)}},
+        {"_id": 0, "id": 1, "status": 1, "is_active": 1}
+    ).to_list(None)
+    available = set()
+    for driver in drivers:
+        if driver.get("is_active", True) and driver.get("status") == DriverStatus.AVAILABLE:
+            available.add(driver["id"])
+        else:
+            driver_index.set_status(driver["id"], driver.get("status"))
+    return available
+
+async def passed_over_drivers(order_ids: Sequence[str]) -> Dict[str, Set[str]]:
+    """Drivers who declined or let an offer expire, per order"""
+    if not order_ids:
+        return {}
+    cursor = _get_db().assignments.find(
+        {
+            "order_id": {"$in": list(order_ids)},
+            "status": {"$in": [AssignmentStatus.DECLINED, AssignmentStatus.EXPIRED]}
+        },
+        {"_id": 0, "order_id": 1, "driver_id": 1}
+    )
+    passed: Dict[str, Set[str]] = {}
+    async for assignment in cursor:
+        passed.setdefault(assignment["order_id"], set()).add(assignment["driver_id"])
+    return passed
+
+def _assignment_document(assignment: Assignment) -> dict:
+    assignment_dict = assignment.model_dump()
+    assignment_dict['assigned_at'] = assignment_dict['assigned_at'].isoformat()
+    if assignment_dict['expires_at']:
+        assignment_dict['expires_at'] = assignment_dict['expires_at'].isoformat()
+    return assignment_dict
+
+async def rank_drivers(order: dict, exclude: Sequence[str] = ()) -> List[Dict[str, Any]]:
+    """
+    The vendor's available drivers with a recent location fix, best first.
+    The live driver index shortlists the DISPATCH_ROAD_CANDIDATES nearest in
+    straight line within DISPATCH_MAX_PICKUP_KM; their time to pickup comes
+    from the precomputed hub matrix where it covers the driver's zone,
+    otherwise from one Distance Matrix request.
+    """
+    pickup = (order["pickup_latitude"], order["pickup_longitude"])
+    nearest = driver_index.nearest(
+        pickup[0],
+        pickup[1],
+        k=DISPATCH_ROAD_CANDIDATES,
+        vendor_id=order["vendor_id"],
+        statuses=[DriverStatus.AVAILABLE],
+        max_km=DISPATCH_MAX_PICKUP_KM,
+        max_age_seconds=DISPATCH_MAX_FIX_AGE_SECONDS,
+        exclude=exclude
+    )
+    available = await available_driver_ids([position.driver_id for position, _ in nearest])
+    shortlist = [position for position, _ in nearest if position.driver_id in available]
+    if not shortlist:
+        return []
+    now = datetime.now(timezone.utc)
+    locations = [(position.latitude, position.longitude) for position in shortlist]
+
+    # Roads are treated as symmetric: the vendor -> driver zone leg stands in for driver -> pickup
+    minutes = np.full(len(shortlist), np.nan)
+    for row, location in enumerate(locations):
+        leg = hub_leg(order["vendor_id"], pickup, location)
+        if leg:
+            minutes[row] = leg["duration_minutes"]
+    missing = np.nonzero(np.isnan(minutes))[0]
+    if len(missing):
+        matrix = await get_distance_matrix([locations[row] for row in missing], [pickup])
+        minutes[missing] = matrix["duration_minutes"][:, 0]
+
+    driver_ids = [position.driver_id for position in shortlist]
+    loads = await active_order_counts(driver_ids)
+    active = np.array([loads.get(driver_id, 0) for driver_id in driver_ids], dtype=np.float64)
+    ages = np.array([position.age_seconds(now) for position in shortlist], dtype=np.float64)
+    scores = score_drivers(minutes, active, ages)
+
+    return [
+        {
+            "driver_id": driver_ids[row],
+            "minutes_to_pickup": round(float(minutes[row]), 2),
+            "active_orders": int(active[row]),
+            "fix_age_seconds": round(float(ages[row]), 1),
+            "score": round(float(scores[row]), 2)
+        }
+        for row in np.argsort(scores, kind="stable")
+    ]
+
+async def assign_order(order: dict, driver_id: str, auto_dispatched: bool = False) -> Optional[str]:
+    """
+    Claim an unassigned accepted order for a driver and record the assignment.
+    The claim is a single conditional update, so concurrent dispatchers cannot
+    both assign the same order. Returns the assignment ID, or None when the
+    order was no longer waiting for a driver or the driver is no longer available.
+    """
+    db = _get_db()
+    if driver_id not in await available_driver_ids([driver_id]):
+        return None
+    assignment = Assignment(
+        order_id=order["id"],
+        driver_id=driver_id,
+        vendor_id=order["vendor_id"],
+        auto_dispatched=auto_dispatched,
+        expires_at=offer_timeouts.expires_at()
+    )
+    claimed = await db.orders.update_one(
+        {"id": order["id"], "status": OrderStatus.ACCEPTED, "driver_id": None},
+        {
+            "$set": {
+                "driver_id": driver_id,
+                "assignment_id": assignment.id,
+                "status": OrderStatus.DRIVER_ASSIGNED,
+                "updated_at": datetime.now(timezone.utc).isoformat()
+            }
+        }
+    )
+    if not claimed.modified_count:
+        return None
+
+    await db.assignments.insert_one(_assignment_document(assignment))
+    offer_timeouts.schedule(assignment.id, assignment.expires_at)
+
+    await add_order_to_route_plan(driver_id, {**order, "driver_id": driver_id, "status": OrderStatus.DRIVER_ASSIGNED})
+    return assignment.id
+
+async def auto_dispatch(order_id: str, exclude: Sequence[str] = ()) -> Optional[Dict[str, Any]]:
+    """
+    Assign the best-scoring available driver to an accepted order.
+    Returns the chosen candidate with its assignment_id, or None when the
+    order is not waiting for a driver or no driver qualifies. With batch
+    matching enabled the order waits for the next tick instead.
+    """
+    if not AUTO_DISPATCH_ENABLED or DISPATCH_BATCH_INTERVAL_SECONDS > 0:
+        return None
+    try:
+        order = await _get_db().orders.find_one({"id": order_id}, {"_id": 0})
+        if not order or order.get("status") != OrderStatus.ACCEPTED or order.get("driver_id"):
+            return None
+        if geo_point(order.get("pickup_latitude"), order.get("pickup_longitude")) is None:
+            # (0, 0) placeholder or invalid pickup: nobody is near it, leave it for manual assignment
+            logger.info(f"Auto-dispatch skipped order {order_id}: no usable pickup coordinates")
+            return None
+
+        candidates = await rank_drivers(order, exclude)
+        if not candidates:
+            logger.info(f"Auto-dispatch found no available driver for order {order_id}")
+            return None
+
+        best = candidates[0]
+        assignment_id = await assign_order(order, best["driver_id"], auto_dispatched=True)
+        if assignment_id is None:
+            return None
+        logger.info(f"Auto-dispatched order {order_id} to driver {best['driver_id']} (score {best['score']})")
+        return {**best, "assignment_id": assignment_id, "order_id": order_id}
+    except Exception as e:
+        logger.error(f"Auto-dispatch failed for order {order_id}: {e}")
+        return None
+
+def pickup_cost_matrix(
+    drivers: Sequence[DriverPosition],
+    orders: Sequence[dict],
+    active_orders: np.ndarray,
+    now: Optional[datetime] = None
+) -> np.ndarray:
+    """
+    Drivers x orders dispatch scores (score_drivers) with time to pickup
+    estimated from straight-line distance, road circuity and the driver's
+    zone pace from the ETA model when one is loaded. Pairs further apart
+    than DISPATCH_BATCH_MAX_PICKUP_KM are forbidden (inf).
+    """
+    now = now or datetime.now(timezone.utc)
+    locations = [(driver.latitude, driver.longitude) for driver in drivers]
+    pickups = [(order["pickup_latitude"], order["pickup_longitude"]) for order in orders]
+    km = haversine_matrix(locations, pickups)
+
+    model = get_eta_model()
+    if model is not None:
+        pace = np.array([model.pace_minutes_per_km(location, now.hour) for location in locations])
+    else:
+        pace = np.full(len(locations), 60.0 / FALLBACK_SPEED_KMH)
+    minutes = km * ETA_ROAD_CIRCUITY * pace[:, np.newaxis]
+
+    ages = np.array([driver.age_seconds(now) for driver in drivers], dtype=np.float64)
+    cost = score_drivers(minutes, active_orders[:, np.newaxis], ages[:, np.newaxis])
+    cost[km > DISPATCH_BATCH_MAX_PICKUP_KM] = np.inf
+    return cost
+
+async def _write_matches(vendor_id: str, pairs: List[Tuple[dict, str]]) -> List[Dict[str, str]]:
+    """
+    Claim all matched orders with one bulk write of conditional updates, then
+    record assignments for the claims that won (an order may have been
+    assigned elsewhere since it was read).
+    """
+    db = _get_db()
+    now_iso = datetime.now(timezone.utc).isoformat()
+    expires_at = offer_timeouts.expires_at()
+    assignments = [
+        Assignment(
+            order_id=order["id"],
+            driver_id=driver_id,
+            vendor_id=vendor_id,
+            auto_dispatched=True,
+            expires_at=expires_at
+        )
+        for order, driver_id in pairs
+    ]
+    await db.orders.bulk_write([
+        UpdateOne(
+            {"id": assignment.order_id, "status": OrderStatus.ACCEPTED, "driver_id": None},
+            {
+                "$set": {
+                    "driver_id": assignment.driver_id,
+                    "assignment_id": assignment.id,
+                    "status": OrderStatus.DRIVER_ASSIGNED,
+                    "updated_at": now_iso
+                }
+            }
+        )
+        for assignment in assignments
+    ], ordered=False)
+
+    claimed = {
+        order["id"] for order in await db.orders.find(
+            {"assignment_id": {"$in": [assignment.id for assignment in assignments]}},
+            {"_id": 0, "id": 1}
+        ).to_list(None)
+    }
+    won = [(order, assignment) for (order, _), assignment in zip(pairs, assignments) if order["id"] in claimed]
+    if not won:
+        return []
+
+    await db.assignments.insert_many([_assignment_document(assignment) for _, assignment in won])
+    for _, assignment in won:
+        offer_timeouts.schedule(assignment.id, assignment.expires_at)
+
+    await asyncio.gather(*(
+        add_order_to_route_plan(
+            assignment.driver_id,
+            {**order, "driver_id": assignment.driver_id, "status": OrderStatus.DRIVER_ASSIGNED}
+        )
+        for order, assignment in won
+    ))
+    return [
+        {"order_id": order["id"], "driver_id": assignment.driver_id, "assignment_id": assignment.id}
+        for order, assignment in won
+    ]
+
+async def match_vendor_orders(vendor_id: str) -> Dict[str, Any]:
+    """
+    Match a vendor's accepted, unassigned orders to its available drivers in
+    one minimum-cost assignment (at most one new order per driver per run).
+    Drivers who declined or let an order's offer expire are not matched to it
+    again, and orders that ran out of offers are left for manual assignment.
+    """
+    orders = await _get_db().orders.find(
+        {"vendor_id": vendor_id, "status": OrderStatus.ACCEPTED, "driver_id": None},
+        {"_id": 0}
+    ).sort("accepted_at", 1).to_list(DISPATCH_BATCH_MAX_ORDERS)
+    drivers = driver_index.positions(vendor_id, [DriverStatus.AVAILABLE], DISPATCH_MAX_FIX_AGE_SECONDS)
+    if orders and drivers:
+        available = await available_driver_ids([driver.driver_id for driver in drivers])
+        drivers = [driver for driver in drivers if driver.driver_id in available]
+    result: Dict[str, Any] = {"vendor_id": vendor_id, "orders": len(orders), "drivers": len(drivers), "assigned": []}
+    if not orders or not drivers:
+        return result
+
+    loads = await active_order_counts([driver.driver_id for driver in drivers])
+    active = np.array([loads.get(driver.driver_id, 0) for driver in drivers], dtype=np.float64)
+    cost = pickup_cost_matrix(drivers, orders, active)
+
+    passed = await passed_over_drivers([order["id"] for order in orders])
+    if passed:
+        driver_rows = {driver.driver_id: row for row, driver in enumerate(drivers)}
+        for col, order in enumerate(orders):
+            passed_drivers = passed.get(order["id"], ())
+            if len(passed_drivers) >= ASSIGNMENT_MAX_OFFERS:
+                cost[:, col] = np.inf
+                continue
+            for driver_id in passed_drivers:
+                if driver_id in driver_rows:
+                    cost[driver_rows[driver_id], col] = np.inf
+    rows, cols = await run_in_pool(solve_assignment, cost)
+
+    pairs = [(orders[col], drivers[row].driver_id) for row, col in zip(rows.tolist(), cols.tolist())]
+    if pairs:
+        result["assigned"] = await _write_matches(vendor_id, pairs)
+        result["total_score"] = round(float(cost[rows, cols].sum()), 2)
+    return result
+
+class BatchMatcher:
+    """
+    Dispatch tick: every interval_seconds, each vendor with waiting orders is
+    matched independently by match_vendor_orders. Order claims are conditional
+    updates, so ticks running in several API processes cannot double-assign.
+    """
+
+    def __init__(self, interval_seconds: float = DISPATCH_BATCH_INTERVAL_SECONDS):
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+        self.ticks = 0
+        self.assigned = 0
+        self.failed = 0
+        self.last_tick_ms: Optional[float] = None
+
+    def start(self):
+        if self.interval_seconds > 0 and self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.tick()
+            except Exception as e:
+                logger.error(f"Dispatch tick failed: {e}")
+
+    async def tick(self) -> List[Dict[str, Any]]:
+        started = time.perf_counter()
+        vendor_ids = await _get_db().orders.distinct(
+            "vendor_id",
+            {"status": OrderStatus.ACCEPTED, "driver_id": None}
+        )
+        results = []
+        for vendor_id in vendor_ids:
+            try:
+                result = await match_vendor_orders(vendor_id)
+            except Exception as e:
+                logger.error(f"Batch matching failed for vendor {vendor_id}: {e}")
+                self.failed += 1
+                continue
+            self.assigned += len(result["assigned"])
+            results.append(result)
+        self.ticks += 1
+        self.last_tick_ms = round((time.perf_counter() - started) * 1000, 1)
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "interval_seconds": self.interval_seconds,
+            "running": self._task is not None,
+            "ticks": self.ticks,
+            "assigned": self.assigned,
+            "failed": self.failed,
+            "last_tick_ms": self.last_tick_ms
+        }
+
+# Global dispatch tick (started on application startup when enabled)
+batch_matcher = BatchMatcher()
+
+async def reoffer(order_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Offer a released order to the next-best driver, skipping every driver who
+    already declined it or let the offer expire. With batch matching enabled
+    the next tick does this instead.
+    """
+    passed = (await passed_over_drivers([order_id])).get(order_id, set())
+    if len(passed) >= ASSIGNMENT_MAX_OFFERS:
+        logger.warning(f"Order {order_id} was passed over by {len(passed)} drivers; leaving it for manual assignment")
+        return None
+    return await auto_dispatch(order_id, exclude=passed)
+
+async def expire_offer(assignment_id: str) -> bool:
+    """
+    Withdraw an unanswered offer: the assignment becomes expired, the order
+    goes back to waiting for a driver and is re-offered. Returns False when
+    the driver answered or the order moved on in the meantime.
+    """
+    db = _get_db()
+    assignment = await db.assignments.find_one({"id": assignment_id}, {"_id": 0})
+    if not assignment or assignment.get("status") != AssignmentStatus.PENDING:
+        return False
+    order_id = assignment["order_id"]
+    order = await db.orders.find_one({"id": order_id}, {"_id": 0, "assignment_id": 1, "status": 1})
+    if not order or order.get("assignment_id") != assignment_id or order.get("status") != OrderStatus.DRIVER_ASSIGNED:
+        return False
+
+    now_iso = datetime.now(timezone.utc).isoformat()
+    expired = await db.assignments.update_one(
+        {"id": assignment_id, "status": AssignmentStatus.PENDING},
+        {"$set": {"status": AssignmentStatus.EXPIRED, "expired_at": now_iso}}
+    )
+    if not expired.modified_count:
+        return False
+    await db.orders.update_one(
+        {"id": order_id, "assignment_id": assignment_id, "status": OrderStatus.DRIVER_ASSIGNED},
+        {
+            "$set": {
+                "status": OrderStatus.ACCEPTED,
+                "driver_id": None,
+                "assignment_id": None,
+                "updated_at": now_iso
+            }
+        }
+    )
+    await remove_order_from_route_plan(assignment["driver_id"], order_id)
+    logger.info(f"Offer of order {order_id} to driver {assignment['driver_id']} expired")
+
+    await reoffer(order_id)
+    return True
+
+class OfferTimeouts:
+    """
+    Expiry timers for pending assignment offers. All timers share one timer
+    wheel advanced by a single task, so open offers cost O(1) to schedule or
+    cancel and nothing polls the database per order. Each process rebuilds
+    its timers from pending assignments on startup; expiry is a conditional
+    update, so processes that hold the same timer expire an offer only once.
+    """
+
+    def __init__(
+        self,
+        timeout_seconds: float = ASSIGNMENT_OFFER_TIMEOUT_SECONDS,
+        tick_seconds: float = OFFER_TIMER_TICK_SECONDS,
+        slots: int = OFFER_TIMER_SLOTS
+    ):
+        self.timeout_seconds = timeout_seconds
+        self.wheel = TimerWheel(tick_seconds, slots)
+        self._task: Optional[asyncio.Task] = None
+        self.expired = 0
+        self.failed = 0
+
+    def expires_at(self, now: Optional[datetime] = None) -> Optional[datetime]:
+        """Deadline for an offer made now, or None when offers do not expire"""
+        if self.timeout_seconds <= 0:
+            return None
+        return (now or datetime.now(timezone.utc)) + timedelta(seconds=self.timeout_seconds)
+
+    def schedule(self, assignment_id: str, expires_at: Optional[datetime]):
+        if expires_at is None:
+            return
+        delay = (expires_at - datetime.now(timezone.utc)).total_seconds()
+        self.wheel.schedule(assignment_id, delay, assignment_id)
+
+    def cancel(self, assignment_id: str):
+        self.wheel.cancel(assignment_id)
+
+    def start(self):
+        if self.timeout_seconds > 0 and self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.wheel.tick_seconds)
+            due = self.wheel.advance()
+            if due:
+                await asyncio.gather(*(self._expire(assignment_id) for assignment_id in due))
+
+    async def _expire(self, assignment_id: str):
+        try:
+            if await expire_offer(assignment_id):
+                self.expired += 1
+        except Exception as e:
+            logger.error(f"Expiring offer {assignment_id} failed: {e}")
+            self.failed += 1
+
+    async def load(self, db):
+        """Schedule the pending offers recorded before this process started"""
+        cursor = db.assignments.find(
+            {"status": AssignmentStatus.PENDING, "expires_at": {"$ne": None}},
+            {"_id": 0, "id": 1, "expires_at": 1}
+        )
+        async for assignment in cursor:
+            expires_at = assignment["expires_at"]
+            if isinstance(expires_at, str):
+                expires_at = datetime.fromisoformat(expires_at)
+            if expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            self.schedule(assignment["id"], expires_at)
+        logger.info(f"Scheduled {len(self.wheel)} pending assignment offers")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "timeout_seconds": self.timeout_seconds,
+            "running": self._task is not None,
+            "expired": self.expired,
+            "failed": self.failed,
+            **self.wheel.stats()
+        }
+
+# Global offer expiry timers (started on application startup when enabled)
+offer_timeouts = OfferTimeouts()
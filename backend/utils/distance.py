@@ -0,0 +1,60 @@
+import math
+import numpy as np
+from typing import Sequence, Tuple
+
+EARTH_RADIUS_KM = 6371.0
+
+Coordinate = Tuple[float, float]
+
+def haversine_km(origin: Coordinate, destination: Coordinate) -> float:
+    """
+    Scalar great-circle distance in kilometers.
+    Plain math module: faster than NumPy for a single pair.
+    """
+    lat1 = math.radians(origin[0])
+    lat2 = math.radians(destination[0])
+    dlat = lat2 - lat1
+    dlng = math.radians(destination[1] - origin[1])
+    a = math.sin(dlat / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+def to_radians(points: Sequence[Coordinate]) -> np.ndarray:
+    """(N, 2) array of [lat, lng] in radians"""
+    array = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    return np.radians(array)
+
+def _haversine(lat1: np.ndarray, lng1: np.ndarray, lat2: np.ndarray, lng2: np.ndarray) -> np.ndarray:
+    # Inputs in radians; broadcasting decides the output shape
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def haversine_one_to_many(origin: Coordinate, points: Sequence[Coordinate]) -> np.ndarray:
+    """Distances (km) from one origin to each point, shape (N,)"""
+    if len(points) == 0:
+        return np.zeros(0)
+    rad = to_radians(points)
+    lat1, lng1 = math.radians(origin[0]), math.radians(origin[1])
+    return _haversine(lat1, lng1, rad[:, 0], rad[:, 1])
+
+def haversine_matrix(origins: Sequence[Coordinate], destinations: Sequence[Coordinate]) -> np.ndarray:
+    """Full N x M distance matrix (km) in a single vectorized pass"""
+    if len(origins) == 0 or len(destinations) == 0:
+        return np.zeros((len(origins), len(destinations)))
+    o = to_radians(origins)
+    d = to_radians(destinations)
+    return _haversine(o[:, 0:1], o[:, 1:2], d[np.newaxis, :, 0], d[np.newaxis, :, 1])
+
+def haversine_pairwise(origins: Sequence[Coordinate], destinations: Sequence[Coordinate]) -> np.ndarray:
+    """Element-wise distances (km) between origins[i] and destinations[i], shape (N,)"""
+    if len(origins) == 0:
+        return np.zeros(0)
+    o = to_radians(origins)
+    d = to_radians(destinations)
+    return _haversine(o[:, 0], o[:, 1], d[:, 0], d[:, 1])
+
+def path_length_km(points: Sequence[Coordinate]) -> float:
+    """Total length (km) of a polyline through the given points"""
+    if len(points) < 2:
+        return 0.0
+    rad = to_radians(points)
+    return float(_haversine(rad[:-1, 0], rad[:-1, 1], rad[1:, 0], rad[1:, 1]).sum())
@@ -0,0 +1,348 @@
+import os
+import math
+import heapq
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Collection, Dict, Iterable, List, Optional, Set, Tuple
+from .distance import haversine_one_to_many
+
+logger = logging.getLogger(__name__)
+
+# Grid cell size in degrees (0.01 deg is roughly 1.1km north-south)
+DRIVER_INDEX_CELL_DEGREES = float(os.environ.get("DRIVER_INDEX_CELL_DEGREES", "0.01"))
+
+KM_PER_DEGREE_LATITUDE = 110.574
+KM_PER_DEGREE_LONGITUDE = 111.320
+
+Cell = Tuple[int, int]
+
+@dataclass
+class DriverPosition:
+    driver_id: str
+    vendor_id: str
+    status: str
+    latitude: float
+    longitude: float
+    fixed_at: datetime
+    cell: Cell
+
+    def age_seconds(self, now: Optional[datetime] = None) -> float:
+        return max(0.0, ((now or datetime.now(timezone.utc)) - self.fixed_at).total_seconds())
+
+def _status_value(status: Any) -> str:
+    return getattr(status, "value", status)
+
+class DriverIndex:
+    """
+    In-process grid index of live driver positions for proximity queries.
+
+    Drivers are bucketed per vendor into square cells of cell_degrees. A
+    location ping moves a driver between two buckets in O(1), which suits
+    positions that change every few seconds better than a tree that has to
+    be rebuilt or rebalanced. k-nearest queries scan rings of cells outward
+    from the query point and stop as soon as no unscanned cell can hold a
+    closer driver, so their cost follows the local driver density rather
+    than the fleet size.
+
+    Not thread-safe; intended for use from the single asyncio event loop.
+    Each API process keeps its own index, fed by the location stream and
+    warmed from the drivers collection on startup.
+    """
+
+    def __init__(self, cell_degrees: float = DRIVER_INDEX_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self._positions: Dict[str, DriverPosition] = {}
+        self._cells: Dict[str, Dict[Cell, Set[str]]] = {}
+        self.updates = 0
+        self.queries = 0
+
+    def _cell(self, latitude: float, longitude: float) -> Cell:
+        return (
+            math.floor((latitude + 90.0) / self.cell_degrees),
+            math.floor((longitude + 180.0) / self.cell_degrees)
+        )
+
+    def update(
+        self,
+        driver_id: str,
+        vendor_id: str,
+        latitude: float,
+        longitude: float,
+        initial_status: Any = "offline",
+        fixed_at: Optional[datetime] = None,
+        status: Any = None
+    ):
+        """
+        Record a location fix. status, when given, is the driver's current
+        stored status and replaces the indexed one (other processes change it
+        without this index seeing set_status). Otherwise a driver already in
+        the index keeps its status and initial_status applies to new entries.
+        """
+        if latitude is None or longitude is None:
+            return
+        position = self._positions.get(driver_id)
+        cell = self._cell(latitude, longitude)
+        if status is not None:
+            status = _status_value(status)
+        elif position is not None:
+            status = position.status
+        else:
+            status = _status_value(initial_status)
+        if position is not None and (position.cell != cell or position.vendor_id != vendor_id):
+            self._discard(position)
+            position = None
+        if position is None:
+            self._cells.setdefault(vendor_id, {}).setdefault(cell, set()).add(driver_id)
+
+        self._positions[driver_id] = DriverPosition(
+            driver_id=driver_id,
+            vendor_id=vendor_id,
+            status=status,
+            latitude=latitude,
+            longitude=longitude,
+            fixed_at=fixed_at or datetime.now(timezone.utc),
+            cell=cell
+        )
+        self.updates += 1
+
+    def set_status(self, driver_id: str, status: Any):
+        position = self._positions.get(driver_id)
+        if position is not None:
+            position.status = _status_value(status)
+
+    def remove(self, driver_id: str):
+        position = self._positions.pop(driver_id, None)
+        if position is not None:
+            self._discard(position)
+
+    def get(self, driver_id: str) -> Optional[DriverPosition]:
+        return self._positions.get(driver_id)
+
+    def __contains__(self, driver_id: str) -> bool:
+        return driver_id in self._positions
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def _discard(self, position: DriverPosition):
+        vendor_cells = self._cells.get(position.vendor_id, {})
+        bucket = vendor_cells.get(position.cell)
+        if bucket is None:
+            return
+        bucket.discard(position.driver_id)
+        if not bucket:
+            del vendor_cells[position.cell]
+            if not vendor_cells:
+                del self._cells[position.vendor_id]
+
+    def _vendor_cells(self, vendor_id: Optional[str]) -> List[Dict[Cell, Set[str]]]:
+        if vendor_id is not None:
+            return [self._cells[vendor_id]] if vendor_id in self._cells else []
+        return list(self._cells.values())
+
+    def _matching(
+        self,
+        driver_ids: Iterable[str],
+        statuses: Optional[Collection[str]],
+        max_age_seconds: Optional[float],
+        exclude: Collection[str],
+        now: datetime
+    ) -> List[DriverPosition]:
+        matches = []
+        for driver_id in driver_ids:
+            position = self._positions[driver_id]
+            if statuses is not None and position.status not in statuses:
+                continue
+            if max_age_seconds is not None and position.age_seconds(now) > max_age_seconds:
+                continue
+            if driver_id in exclude:
+                continue
+            matches.append(position)
+        return matches
+
+    def positions(
+        self,
+        vendor_id: Optional[str] = None,
+        statuses: Optional[Collection[Any]] = None,
+        max_age_seconds: Optional[float] = None
+    ) -> List[DriverPosition]:
+        """Every indexed driver matching the vendor, status and fix age filters"""
+        statuses = {_status_value(status) for status in statuses} if statuses is not None else None
+        driver_ids = [driver_id for grid in self._vendor_cells(vendor_id) for bucket in grid.values() for driver_id in bucket]
+        return self._matching(driver_ids, statuses, max_age_seconds, (), datetime.now(timezone.utc))
+
+    def _cell_extent_km(self, latitude: float, span_degrees: float) -> Tuple[float, float]:
+        """Smallest north-south and east-west size of the cells within span_degrees of a latitude"""
+        height = self.cell_degrees * KM_PER_DEGREE_LATITUDE
+        poleward_latitude = min(89.0, abs(latitude) + span_degrees)
+        width = self.cell_degrees * KM_PER_DEGREE_LONGITUDE * math.cos(math.radians(poleward_latitude))
+        return height, width
+
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        k: int = 1,
+        vendor_id: Optional[str] = None,
+        statuses: Optional[Collection[Any]] = None,
+        max_km: Optional[float] = None,
+        max_age_seconds: Optional[float] = None,
+        exclude: Collection[str] = ()
+    ) -> List[Tuple[DriverPosition, float]]:
+        """
+        Up to k drivers nearest to a point as (position, straight-line km),
+        closest first, optionally filtered by vendor, status, distance and
+        age of the last fix.
+        """
+        self.queries += 1
+        grids = self._vendor_cells(vendor_id)
+        if k <= 0 or not grids:
+            return []
+        statuses = {_status_value(status) for status in statuses} if statuses is not None else None
+        exclude = set(exclude)
+        now = datetime.now(timezone.utc)
+        point = (latitude, longitude)
+        center_row, center_col = self._cell(latitude, longitude)
+        occupied = sum(len(grid) for grid in grids)
+
+        # Max-heap of the best k so far, as (-km, driver_id)
+        best: List[Tuple[float, str]] = []
+        positions: Dict[str, DriverPosition] = {}
+
+        def consider(found: List[str]):
+            matches = self._matching(found, statuses, max_age_seconds, exclude, now)
+            if not matches:
+                return
+            distances = haversine_one_to_many(point, [(match.latitude, match.longitude) for match in matches])
+            for match, km in zip(matches, distances.tolist()):
+                if max_km is not None and km > max_km:
+                    continue
+                positions[match.driver_id] = match
+                if len(best) < k:
+                    heapq.heappush(best, (-km, match.driver_id))
+                elif km < -best[0][0]:
+                    heapq.heapreplace(best, (-km, match.driver_id))
+
+        scanned = 0
+        ring = 0
+        while scanned < occupied:
+            if (8 * ring or 1) * len(grids) > occupied - scanned:
+                # The ring has more cells than are left occupied: take the rest at once
+                consider([
+                    driver_id
+                    for grid in grids for cell, bucket in grid.items()
+                    if max(abs(cell[0] - center_row), abs(cell[1] - center_col)) >= ring
+                    for driver_id in bucket
+                ])
+                break
+
+            cells = [(center_row, center_col)] if ring == 0 else (
+                [(center_row + dr, center_col + dc) for dr in (-ring, ring) for dc in range(-ring, ring + 1)]
+                + [(center_row + dr, center_col + dc) for dc in (-ring, ring) for dr in range(-ring + 1, ring)]
+            )
+            found: List[str] = []
+            for grid in grids:
+                for cell in cells:
+                    bucket = grid.get(cell)
+                    if bucket:
+                        scanned += 1
+                        found.extend(bucket)
+            consider(found)
+
+            # Anything outside rings 0..ring is at least ring cells away
+            bound_km = ring * min(self._cell_extent_km(latitude, (ring + 1) * self.cell_degrees))
+            if len(best) == k and -best[0][0] <= bound_km:
+                break
+            if max_km is not None and bound_km > max_km:
+                break
+            ring += 1
+
+        return [(positions[driver_id], km) for km, driver_id in sorted((-km, driver_id) for km, driver_id in best)]
+
+    def within(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        vendor_id: Optional[str] = None,
+        statuses: Optional[Collection[Any]] = None,
+        max_age_seconds: Optional[float] = None,
+        exclude: Collection[str] = ()
+    ) -> List[Tuple[DriverPosition, float]]:
+        """All drivers within radius_km of a point as (position, straight-line km), closest first"""
+        self.queries += 1
+        grids = self._vendor_cells(vendor_id)
+        if not grids:
+            return []
+        statuses = {_status_value(status) for status in statuses} if statuses is not None else None
+        center_row, center_col = self._cell(latitude, longitude)
+        height_km, width_km = self._cell_extent_km(latitude, radius_km / KM_PER_DEGREE_LATITUDE + self.cell_degrees)
+        rows = math.ceil(radius_km / height_km)
+        cols = math.ceil(radius_km / width_km)
+
+        found: List[str] = []
+        for grid in grids:
+            if (2 * rows + 1) * (2 * cols + 1) > len(grid):
+                # Fewer occupied cells than cells in the box: filter the occupied ones
+                cells = [
+                    cell for cell in grid
+                    if abs(cell[0] - center_row) <= rows and abs(cell[1] - center_col) <= cols
+                ]
+            else:
+                cells = [
+                    (center_row + dr, center_col + dc)
+                    for dr in range(-rows, rows + 1) for dc in range(-cols, cols + 1)
+                ]
+            for cell in cells:
+                found.extend(grid.get(cell, ()))
+
+        matches = self._matching(found, statuses, max_age_seconds, set(exclude), datetime.now(timezone.utc))
+        if not matches:
+            return []
+        distances = haversine_one_to_many((latitude, longitude), [(match.latitude, match.longitude) for match in matches])
+        return sorted(
+            ((match, km) for match, km in zip(matches, distances.tolist()) if km <= radius_km),
+            key=lambda pair: pair[1]
+        )
+
+    async def load(self, db):
+        """Warm the index from the last known positions of active drivers"""
+        cursor = db.drivers.find(
+            {"is_active": True, "current_latitude": {"$ne": None}, "current_longitude": {"$ne": None}},
+            {"_id": 0, "id": 1, "vendor_id": 1, "status": 1, "current_latitude": 1, "current_longitude": 1, "last_location_update": 1}
+        )
+        async for driver in cursor:
+            fixed_at = driver.get("last_location_update")
+            if isinstance(fixed_at, str):
+                fixed_at = datetime.fromisoformat(fixed_at)
+            if isinstance(fixed_at, datetime) and fixed_at.tzinfo is None:
+                fixed_at = fixed_at.replace(tzinfo=timezone.utc)
+            if driver["id"] in self._positions:
+                continue
+            self.update(
+                driver["id"],
+                driver["vendor_id"],
+                driver["current_latitude"],
+                driver["current_longitude"],
+                initial_status=driver.get("status", "offline"),
+                fixed_at=fixed_at or datetime.fromtimestamp(0, timezone.utc)
+            )
+        logger.info(f"Driver index warmed with {len(self._positions)} drivers")
+
+    def stats(self) -> Dict[str, Any]:
+        statuses: Dict[str, int] = {}
+        for position in self._positions.values():
+            statuses[position.status] = statuses.get(position.status, 0) + 1
+        return {
+            "drivers": len(self._positions),
+            "statuses": statuses,
+            "vendors": len(self._cells),
+            "cells": sum(len(grid) for grid in self._cells.values()),
+            "cell_degrees": self.cell_degrees,
+            "updates": self.updates,
+            "queries": self.queries
+        }
+
+# Global index shared by the location stream, dispatch and proximity views
+driver_index = DriverIndex()
@@ -0,0 +1,212 @@
+import os
+import math
+import logging
+import numpy as np
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Optional, Tuple, Dict, Any
+from .distance import haversine_km
+
+logger = logging.getLogger(__name__)
+
+ETA_MODEL_PATH = os.environ.get(
+    "ETA_MODEL_PATH",
+    str(Path(__file__).resolve().parent.parent / "data" / "eta_model.npz")
+)
+# Zone grid size in degrees (0.02 deg is roughly 2km)
+ETA_ZONE_SIZE_DEGREES = float(os.environ.get("ETA_ZONE_SIZE_DEGREES", "0.02"))
+# Straight-line to road distance factor
+ETA_ROAD_CIRCUITY = float(os.environ.get("ETA_ROAD_CIRCUITY", "1.3"))
+
+# Speeds outside this range (km/h) are GPS noise or stationary pings, not travel
+MIN_TRAVEL_SPEED_KMH = 2.0
+MAX_TRAVEL_SPEED_KMH = 130.0
+# Pseudo-count pulling sparse zone/hour cells toward the city-wide hourly pace
+PRIOR_WEIGHT = 20.0
+DEFAULT_SPEED_KMH = 30.0
+
+def _zone_keys(latitudes: np.ndarray, longitudes: np.ndarray, zone_size: float) -> np.ndarray:
+    """Pack grid cell (row, col) pairs into single int64 keys"""
+    rows = np.floor((latitudes + 90.0) / zone_size).astype(np.int64)
+    cols = np.floor((longitudes + 180.0) / zone_size).astype(np.int64)
+    return rows * 1_000_000 + cols
+
+class EtaModel:
+    """
+    Speed profile by zone and UTC hour of day, stored as pace (minutes per km).
+
+    zone_pace[i, h] is the smoothed pace in zone zone_keys[i] at hour h;
+    hourly_pace[h] is the city-wide pace used for zones without history.
+    """
+
+    def __init__(
+        self,
+        zone_keys: np.ndarray,
+        zone_pace: np.ndarray,
+        hourly_pace: np.ndarray,
+        zone_size: float = ETA_ZONE_SIZE_DEGREES,
+        samples: int = 0,
+        trained_at: Optional[str] = None
+    ):
+        self.zone_keys = zone_keys.astype(np.int64)
+        self.zone_pace = zone_pace.astype(np.float32)
+        self.hourly_pace = hourly_pace.astype(np.float32)
+        self.zone_size = zone_size
+        self.samples = samples
+        self.trained_at = trained_at
+        self._zone_index = {int(key): row for row, key in enumerate(self.zone_keys)}
+
+    def pace_minutes_per_km(self, location: Tuple[float, float], hour: int) -> float:
+        row = math.floor((location[0] + 90.0) / self.zone_size)
+        col = math.floor((location[1] + 180.0) / self.zone_size)
+        index = self._zone_index.get(row * 1_000_000 + col)
+        if index is None:
+            return float(self.hourly_pace[hour])
+        return float(self.zone_pace[index, hour])
+
+    def estimate_minutes(
+        self,
+        origin: Tuple[float, float],
+        destination: Tuple[float, float],
+        when: Optional[datetime] = None
+    ) -> int:
+        """
+        ETA rounded to whole minutes from straight-line distance and the origin
+        zone's pace; at least 1 minute whenever the points differ
+        """
+        hour = (when or datetime.now(timezone.utc)).astimezone(timezone.utc).hour
+        road_km = haversine_km(origin, destination) * ETA_ROAD_CIRCUITY
+        if road_km <= 0:
+            return 0
+        return max(1, round(road_km * self.pace_minutes_per_km(origin, hour)))
+
+    def save(self, path: str = ETA_MODEL_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # Write next to the target and rename so readers never load a partial file
+        partial = f"{path}.partial.npz"
+        np.savez_compressed(
+            partial,
+            zone_keys=self.zone_keys,
+            zone_pace=self.zone_pace,
+            hourly_pace=self.hourly_pace,
+            zone_size=np.float64(self.zone_size),
+            samples=np.int64(self.samples),
+            trained_at=np.str_(self.trained_at or "")
+        )
+        os.replace(partial, path)
+
+    @classmethod
+    def load(cls, path: str = ETA_MODEL_PATH) -> "EtaModel":
+        with np.load(path) as data:
+            return cls(
+                zone_keys=data["zone_keys"],
+                zone_pace=data["zone_pace"],
+                hourly_pace=data["hourly_pace"],
+                zone_size=float(data["zone_size"]),
+                samples=int(data["samples"]),
+                trained_at=str(data["trained_at"]) or None
+            )
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "zones": len(self.zone_keys),
+            "samples": self.samples,
+            "trained_at": self.trained_at,
+            "zone_size_degrees": self.zone_size
+        }
+
+def fit_eta_model(
+    latitudes: np.ndarray,
+    longitudes: np.ndarray,
+    speeds_kmh: np.ndarray,
+    hours: np.ndarray,
+    zone_size: float = ETA_ZONE_SIZE_DEGREES
+) -> EtaModel:
+    """
+    Build an EtaModel from raw GPS fixes. Paces are averaged (harmonic mean of
+    speed, which is the correct average for travel time over distance) and each
+    zone/hour cell is shrunk toward the city-wide pace for that hour.
+    """
+    mask = (speeds_kmh >= MIN_TRAVEL_SPEED_KMH) & (speeds_kmh <= MAX_TRAVEL_SPEED_KMH)
+    latitudes, longitudes = latitudes[mask], longitudes[mask]
+    hours = hours[mask].astype(np.int64)
+    pace = 60.0 / speeds_kmh[mask]
+
+    default_pace = 60.0 / DEFAULT_SPEED_KMH
+    hour_sum = np.bincount(hours, weights=pace, minlength=24)
+    hour_count = np.bincount(hours, minlength=24)
+    hourly_pace = (hour_sum + PRIOR_WEIGHT * default_pace) / (hour_count + PRIOR_WEIGHT)
+
+    keys = _zone_keys(latitudes, longitudes, zone_size)
+    zone_keys, zone_index = np.unique(keys, return_inverse=True)
+    cell = zone_index * 24 + hours
+    n_cells = len(zone_keys) * 24
+    cell_sum = np.bincount(cell, weights=pace, minlength=n_cells).reshape(-1, 24)
+    cell_count = np.bincount(cell, minlength=n_cells).reshape(-1, 24)
+    zone_pace = (cell_sum + PRIOR_WEIGHT * hourly_pace) / (cell_count + PRIOR_WEIGHT)
+
+    return EtaModel(
+        zone_keys=zone_keys,
+        zone_pace=zone_pace,
+        hourly_pace=hourly_pace,
+        zone_size=zone_size,
+        samples=int(mask.sum()),
+        trained_at=datetime.now(timezone.utc).isoformat()
+    )
+
+async def train_eta_model(db, days: int = 28, batch_size: int = 50000) -> EtaModel:
+    """
+    Batch job: stream recent location_events and fit a new model.
+    Only the fields needed for the profile are projected.
+    """
+    since = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+    cursor = db.location_events.find(
+        {"timestamp": {"$gte": since}, "speed": {"$gte": MIN_TRAVEL_SPEED_KMH}},
+        {"_id": 0, "latitude": 1, "longitude": 1, "speed": 1, "timestamp": 1}
+    ).batch_size(batch_size)
+
+    latitudes, longitudes, speeds, hours = [], [], [], []
+    async for event in cursor:
+        timestamp = event.get("timestamp")
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp)
+        if not timestamp:
+            continue
+        latitudes.append(event["latitude"])
+        longitudes.append(event["longitude"])
+        speeds.append(event["speed"])
+        hours.append(timestamp.astimezone(timezone.utc).hour if timestamp.tzinfo else timestamp.hour)
+
+    return fit_eta_model(
+        np.asarray(latitudes, dtype=np.float64),
+        np.asarray(longitudes, dtype=np.float64),
+        np.asarray(speeds, dtype=np.float64),
+        np.asarray(hours, dtype=np.int64)
+    )
+
+_model: Optional[EtaModel] = None
+
+def get_eta_model() -> Optional[EtaModel]:
+    return _model
+
+def set_eta_model(model: Optional[EtaModel]):
+    global _model
+    _model = model
+
+def load_eta_model(path: str = ETA_MODEL_PATH) -> Optional[EtaModel]:
+    """Load the trained model from disk if present (called on startup)"""
+    if not os.path.exists(path):
+        logger.info(f"No ETA model at {path}; live ETAs will use the maps API")
+        return None
+    try:
+        set_eta_model(EtaModel.load(path))
+        logger.info(f"Loaded ETA model: {_model.info()}")
+    except Exception as e:
+        logger.error(f"Error loading ETA model: {e}")
+    return _model
+
+def estimate_eta_minutes(origin: Tuple[float, float], destination: Tuple[float, float]) -> Optional[int]:
+    """Local ETA estimate, or None when no model has been trained"""
+    if _model is None:
+        return None
+    return _model.estimate_minutes(origin, destination)
@@ -0,0 +1,93 @@
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Any, Optional, Tuple
+from .distance import haversine_km
+
+# Recompute only after the driver moved this far (km) ...
+ETA_RECOMPUTE_DISTANCE_KM = float(os.environ.get("ETA_RECOMPUTE_DISTANCE_KM", "0.2"))
+# ... or this much time passed since the last computation
+ETA_RECOMPUTE_INTERVAL_SECONDS = float(os.environ.get("ETA_RECOMPUTE_INTERVAL_SECONDS", "60"))
+ETA_TRACKER_MAX_ORDERS = 50000
+
+EtaFunction = Callable[[Tuple[float, float], Tuple[float, float]], Awaitable[Optional[int]]]
+
+@dataclass
+class _EtaState:
+    latitude: float
+    longitude: float
+    status: str
+    eta_minutes: Optional[int]
+    computed_at: float
+
+class EtaTracker:
+    """
+    Per-order ETA throttle for live tracking broadcasts.
+
+    A fresh ETA is computed only when the driver has moved more than
+    ETA_RECOMPUTE_DISTANCE_KM, ETA_RECOMPUTE_INTERVAL_SECONDS have passed,
+    or the order status changed. In between, the last ETA is decayed by
+    the elapsed time.
+    """
+
+    def __init__(
+        self,
+        min_distance_km: float = ETA_RECOMPUTE_DISTANCE_KM,
+        max_interval_seconds: float = ETA_RECOMPUTE_INTERVAL_SECONDS,
+        max_orders: int = ETA_TRACKER_MAX_ORDERS
+    ):
+        self.min_distance_km = min_distance_km
+        self.max_interval_seconds = max_interval_seconds
+        self.max_orders = max_orders
+        self._states: "OrderedDict[str, _EtaState]" = OrderedDict()
+        self.recomputed = 0
+        self.reused = 0
+
+    async def get_eta(
+        self,
+        order_id: str,
+        status: str,
+        driver_location: Tuple[float, float],
+        destination: Tuple[float, float],
+        compute: EtaFunction
+    ) -> Optional[int]:
+        now = time.monotonic()
+        state = self._states.get(order_id)
+
+        if state is not None and state.eta_minutes is not None and state.status == status:
+            elapsed = now - state.computed_at
+            moved_km = haversine_km((state.latitude, state.longitude), driver_location)
+            if moved_km < self.min_distance_km and elapsed < self.max_interval_seconds:
+                self.reused += 1
+                return max(0, round(state.eta_minutes - elapsed / 60))
+
+        eta_minutes = await compute(driver_location, destination)
+        self.recomputed += 1
+        self._states[order_id] = _EtaState(
+            latitude=driver_location[0],
+            longitude=driver_location[1],
+            status=status,
+            eta_minutes=eta_minutes,
+            computed_at=now
+        )
+        self._states.move_to_end(order_id)
+        while len(self._states) > self.max_orders:
+            self._states.popitem(last=False)
+        return eta_minutes
+
+    def forget(self, order_id: str):
+        """Drop state for an order that is no longer being tracked"""
+        self._states.pop(order_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.recomputed + self.reused
+        return {
+            "tracked_orders": len(self._states),
+            "recomputed": self.recomputed,
+            "reused": self.reused,
+            "reuse_ratio": round(self.reused / total, 4) if total else None
+        }
+
+# Global tracker instance
+eta_tracker = EtaTracker()
@@ -0,0 +1,79 @@
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# GeoJSON fields served by 2dsphere indexes, with the scalar fields they mirror
+DRIVER_LOCATION_FIELDS = {"current_location": ("current_latitude", "current_longitude")}
+ORDER_LOCATION_FIELDS = {
+    "pickup_location": ("pickup_latitude", "pickup_longitude"),
+    "delivery_location": ("delivery_latitude", "delivery_longitude")
+}
+
+def geo_point(latitude: Optional[float], longitude: Optional[float]) -> Optional[Dict[str, Any]]:
+    """
+    GeoJSON point for a 2dsphere index (coordinates are [longitude, latitude]),
+    or None when the location is unknown or out of range (a 2dsphere index
+    rejects the whole write for an invalid point). (0, 0) is the placeholder
+    stored for addresses that have not been geocoded and is treated as unknown.
+    """
+    if latitude is None or longitude is None or (not latitude and not longitude):
+        return None
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    return {"type": "Point", "coordinates": [longitude, latitude]}
+
+def order_geo_points(order: Dict[str, Any]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """GeoJSON pickup/delivery points for an order document, to store next to its scalar fields"""
+    return {
+        field: geo_point(order.get(latitude), order.get(longitude))
+        for field, (latitude, longitude) in ORDER_LOCATION_FIELDS.items()
+    }
+
+def geo_polygon(points: Sequence[Tuple[float, float]]) -> Dict[str, Any]:
+    """
+    GeoJSON polygon from (lat, lng) vertices, closing the ring if needed.
+    Raises ValueError for fewer than 3 distinct vertices.
+    """
+    ring: List[List[float]] = [[float(lng), float(lat)] for lat, lng in points]
+    if len({tuple(vertex) for vertex in ring}) < 3:
+        raise ValueError("A polygon needs at least 3 distinct vertices")
+    if ring[0] != ring[-1]:
+        ring.append(ring[0])
+    return {"type": "Polygon", "coordinates": [ring]}
+
+async def backfill_geo_points(db) -> Dict[str, int]:
+    """
+    Write the GeoJSON fields for documents stored before they existed. Each
+    field is one server-side pipeline update, so no documents are read back.
+    Coordinates out of range are skipped, as geo_point does: a 2dsphere index
+    rejects them and would abort the rest of the update.
+    """
+    updated: Dict[str, int] = {}
+    for collection, fields in (("drivers", DRIVER_LOCATION_FIELDS), ("orders", ORDER_LOCATION_FIELDS)):
+        for field, (latitude, longitude) in fields.items():
+            missing = {
+                field: None,
+                latitude: {"$type": "number"},
+                longitude: {"$type": "number"},
+                "$or": [{latitude: {"$ne": 0}}, {longitude: {"$ne": 0}}]
+            }
+            result = await db[collection].update_many(
+                {
+                    **missing,
+                    "$and": [
+                        {latitude: {"$gte": -90, "$lte": 90}},
+                        {longitude: {"$gte": -180, "$lte": 180}}
+                    ]
+                },
+                [{"$set": {field: {"type": "Point", "coordinates": [f"${longitude}", f"${latitude}"]}}}]
+            )
+            updated[f"{collection}.{field}"] = result.modified_count
+            skipped = await db[collection].count_documents(missing)
+            if skipped:
+                logger.warning(f"Skipped {skipped} {collection} with out-of-range {latitude}/{longitude}")
+    return updated
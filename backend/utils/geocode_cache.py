@@ -0,0 +1,103 @@
+import os
+import re
+import logging
+from datetime import datetime, timezone
+from typing import Optional, Tuple, Dict, Any
+from motor.motor_asyncio import AsyncIOMotorClient
+from .cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+GEOCODE_CACHE_MAX_SIZE = int(os.environ.get("GEOCODE_CACHE_MAX_SIZE", "10000"))
+GEOCODE_CACHE_TTL_SECONDS = float(os.environ.get("GEOCODE_CACHE_TTL_SECONDS", "86400"))
+
+# Tier 1: in-process LRU in front of the persistent geocode_cache collection
+_memory_cache = TTLCache("geocode", max_size=GEOCODE_CACHE_MAX_SIZE, ttl_seconds=GEOCODE_CACHE_TTL_SECONDS)
+_persistent_hits = 0
+_persistent_misses = 0
+
+# Lazy initialization of MongoDB client
+_client = None
+_db = None
+
+def _get_db():
+    global _client, _db
+    if _db is None:
+        mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+        db_name = os.environ.get('DB_NAME', 'medex_delivery')
+        _client = AsyncIOMotorClient(mongo_url)
+        _db = _client[db_name]
+    return _db
+
+def normalize_address(address: str) -> str:
+    """
+    Canonical cache key for an address: lowercase, single spaces,
+    consistent comma spacing and no trailing punctuation.
+    """
+    key = address.lower().strip()
+    key = re.sub(r"\s*,\s*", ", ", key)
+    key = re.sub(r"\s+", " ", key)
+    return key.strip(" ,.;")
+
+async def get_cached_coordinates(address: str) -> Optional[Tuple[float, float]]:
+    """
+    Look up an address in the memory tier, then the Mongo tier.
+    Returns: (latitude, longitude) or None on a miss
+    """
+    global _persistent_hits, _persistent_misses
+    key = normalize_address(address)
+    if not key:
+        return None
+
+    coords = _memory_cache.get(key)
+    if coords is not None:
+        return coords
+
+    try:
+        doc = await _get_db().geocode_cache.find_one(
+            {"address_key": key},
+            {"_id": 0, "latitude": 1, "longitude": 1}
+        )
+    except Exception as e:
+        logger.error(f"Error reading geocode cache: {e}")
+        return None
+
+    if not doc:
+        _persistent_misses += 1
+        return None
+
+    _persistent_hits += 1
+    coords = (doc["latitude"], doc["longitude"])
+    _memory_cache.set(key, coords)
+    return coords
+
+async def store_coordinates(address: str, coords: Tuple[float, float]):
+    """Write a successful geocode through both cache tiers"""
+    key = normalize_address(address)
+    if not key:
+        return
+
+    _memory_cache.set(key, coords)
+    try:
+        await _get_db().geocode_cache.update_one(
+            {"address_key": key},
+            {
+                "$set": {
+                    "address": address,
+                    "latitude": coords[0],
+                    "longitude": coords[1],
+                    # Stored as a BSON date so the TTL index can expire it
+                    "cached_at": datetime.now(timezone.utc)
+                }
+            },
+            upsert=True
+        )
+    except Exception as e:
+        logger.error(f"Error writing geocode cache: {e}")
+
+def geocode_cache_stats() -> Dict[str, Any]:
+    return {
+        "memory": _memory_cache.stats(),
+        "persistent_hits": _persistent_hits,
+        "persistent_misses": _persistent_misses
+    }
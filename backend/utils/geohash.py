@@ -0,0 +1,62 @@
+from typing import Tuple
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+def encode(latitude: float, longitude: float, precision: int = 7) -> str:
+    """
+    Encode a coordinate as a geohash string.
+    Precision 6 is a ~1.2km x 0.6km cell, 7 is ~150m x 150m, 8 is ~38m x 19m.
+    """
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(chars) < precision:
+        if even:
+            mid = (lng_range[0] + lng_range[1]) / 2
+            if longitude >= mid:
+                bits = (bits << 1) | 1
+                lng_range[0] = mid
+            else:
+                bits = bits << 1
+                lng_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits = bits << 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(chars)
+
+def decode(geohash: str) -> Tuple[float, float]:
+    """Decode a geohash to the (latitude, longitude) of its cell center"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+
+    for char in geohash:
+        value = _BASE32.index(char)
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            target = lng_range if even else lat_range
+            mid = (target[0] + target[1]) / 2
+            if bit:
+                target[0] = mid
+            else:
+                target[1] = mid
+            even = not even
+
+    return ((lat_range[0] + lat_range[1]) / 2, (lng_range[0] + lng_range[1]) / 2)
@@ -1,207 +1,570 @@
 import os
-import requests
+import asyncio
+import hashlib
+import httpx
 from typing import Optional, Dict, Any, List, Tuple
 import logging
+import numpy as np
+from .geocode_cache import get_cached_coordinates, store_coordinates, normalize_address
+from .cache import TTLCache
+from . import geohash
+from .distance import haversine_km, haversine_matrix
+from .eta_model import estimate_eta_minutes
+from .singleflight import SingleFlight
+from solvers.tsp import solve_open_tsp
+from solvers.pool import run_in_pool, time_budget
 
 logger = logging.getLogger(__name__)
 
 GOOGLE_MAPS_API_KEY = os.environ.get("GOOGLE_MAPS_API_KEY", "")
+GOOGLE_MAPS_BASE_URL = "https://maps.googleapis.com/maps/api"
 
-def get_coordinates(address: str) -> Optional[Tuple[float, float]]:
+# Per-call deadline (seconds) covering the wait for a pool slot plus the HTTP round trip
+MAPS_TIMEOUT_SECONDS = float(os.environ.get("GOOGLE_MAPS_TIMEOUT_SECONDS", "10"))
+# Maximum number of in-flight upstream requests across the whole process
+MAPS_MAX_CONCURRENCY = int(os.environ.get("GOOGLE_MAPS_MAX_CONCURRENCY", "20"))
+# Keep-alive pool size for the shared HTTP client
+MAPS_MAX_CONNECTIONS = int(os.environ.get("GOOGLE_MAPS_MAX_CONNECTIONS", "50"))
+
+# Directions results are cached per (origin cell, destination cell) pair so that
+# near-duplicate queries from a slowly moving driver skip the upstream call
+ROUTE_CACHE_GEOHASH_PRECISION = int(os.environ.get("ROUTE_CACHE_GEOHASH_PRECISION", "7"))
+ROUTE_CACHE_TTL_SECONDS = float(os.environ.get("ROUTE_CACHE_TTL_SECONDS", "60"))
+ROUTE_CACHE_MAX_SIZE = int(os.environ.get("ROUTE_CACHE_MAX_SIZE", "20000"))
+
+# Distance Matrix API limits: 25 origins, 25 destinations, 100 elements per request
+MATRIX_MAX_ORIGINS = 25
+MATRIX_MAX_DESTINATIONS = 25
+MATRIX_MAX_ELEMENTS = 100
+# Tiles of one matrix request fetched concurrently (still bounded by MAPS_MAX_CONCURRENCY)
+MATRIX_MAX_PARALLEL_TILES = int(os.environ.get("DISTANCE_MATRIX_MAX_PARALLEL_TILES", "4"))
+# Square matrices over more points than this use straight-line travel costs
+# instead of a road Distance Matrix (whose cost grows with the square of the points)
+ROUTE_PLAN_ROAD_MATRIX_MAX_POINTS = int(os.environ.get("ROUTE_PLAN_ROAD_MATRIX_MAX_POINTS", "50"))
+
+# Directions API optimize:true accepts at most 23 intermediate waypoints
+GOOGLE_MAX_OPTIMIZED_WAYPOINTS = 23
+# Upper bound on local search time for large stop sets
+LOCAL_OPTIMIZER_TIME_LIMIT_SECONDS = float(os.environ.get("LOCAL_OPTIMIZER_TIME_LIMIT_SECONDS", "2"))
+
+# Optimization results keyed by the quantized stop set (precision 8 is ~38m x 19m),
+# so re-submitted runs skip the solver and the Directions API
+OPTIMIZE_CACHE_GEOHASH_PRECISION = int(os.environ.get("OPTIMIZE_CACHE_GEOHASH_PRECISION", "8"))
+OPTIMIZE_CACHE_TTL_SECONDS = float(os.environ.get("OPTIMIZE_CACHE_TTL_SECONDS", "300"))
+OPTIMIZE_CACHE_MAX_SIZE = int(os.environ.get("OPTIMIZE_CACHE_MAX_SIZE", "2000"))
+
+# Average speed used whenever a duration has to be estimated from straight-line distance
+FALLBACK_SPEED_KMH = 30.0
+
+# Road cost of single legs of planned routes, reused by incremental re-planning
+LEG_CACHE_TTL_SECONDS = float(os.environ.get("LEG_CACHE_TTL_SECONDS", "900"))
+
+_directions_cache = TTLCache("directions", max_size=ROUTE_CACHE_MAX_SIZE, ttl_seconds=ROUTE_CACHE_TTL_SECONDS)
+_leg_cache = TTLCache("legs", max_size=ROUTE_CACHE_MAX_SIZE, ttl_seconds=LEG_CACHE_TTL_SECONDS)
+_optimization_cache = TTLCache("optimizations", max_size=OPTIMIZE_CACHE_MAX_SIZE, ttl_seconds=OPTIMIZE_CACHE_TTL_SECONDS)
+
+# Concurrent identical lookups share a single upstream request
+_single_flight = SingleFlight("maps")
+
+_client: Optional[httpx.AsyncClient] = None
+_semaphore: Optional[asyncio.Semaphore] = None
+
+def _api_key_configured() -> bool:
+    return bool(GOOGLE_MAPS_API_KEY) and GOOGLE_MAPS_API_KEY != "YOUR_GOOGLE_MAPS_API_KEY_HERE"
+
+def get_maps_client() -> httpx.AsyncClient:
     """
-    Geocode address to latitude/longitude using Google Geocoding API
-    Returns: (latitude, longitude) or None
+    Shared async HTTP client with a pooled keep-alive connection set.
+    Created lazily so importing this module never opens sockets.
     """
-    if not GOOGLE_MAPS_API_KEY or GOOGLE_MAPS_API_KEY == "YOUR_GOOGLE_MAPS_API_KEY_HERE":
-        logger.warning("Google Maps API key not configured. Using mock coordinates.")
-        # Mock response for development
-        return (40.7128, -74.0060)  # Default NYC coordinates
-    
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url=GOOGLE_MAPS_BASE_URL,
+            timeout=httpx.Timeout(MAPS_TIMEOUT_SECONDS),
+            limits=httpx.Limits(
+                max_connections=MAPS_MAX_CONNECTIONS,
+                max_keepalive_connections=MAPS_MAX_CONNECTIONS
+            )
+        )
+    return _client
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(MAPS_MAX_CONCURRENCY)
+    return _semaphore
+
+async def close_maps_client():
+    """Close the shared HTTP client (called on application shutdown)"""
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+
+async def _maps_request(path: str, params: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Perform a GET against the Maps web service under the concurrency limit.
+    Raises asyncio.TimeoutError if the deadline passes before a response arrives.
+    """
+    async def _do_request() -> Dict[str, Any]:
+        async with _get_semaphore():
+            response = await get_maps_client().get(path, params={**params, "key": GOOGLE_MAPS_API_KEY})
+            return response.json()
+
+    return await asyncio.wait_for(_do_request(), timeout or MAPS_TIMEOUT_SECONDS)
+
+def _route_cache_key(kind: str, origin: Tuple[float, float], destination: Tuple[float, float]) -> Tuple[str, str, str]:
+    return (
+        kind,
+        geohash.encode(origin[0], origin[1], ROUTE_CACHE_GEOHASH_PRECISION),
+        geohash.encode(destination[0], destination[1], ROUTE_CACHE_GEOHASH_PRECISION)
+    )
+
+def single_flight_stats() -> Dict[str, Any]:
+    return _single_flight.stats()
+
+def route_cache_stats() -> Dict[str, Any]:
+    return {
+        **_directions_cache.stats(),
+        "geohash_precision": ROUTE_CACHE_GEOHASH_PRECISION
+    }
+
+def leg_cache_stats() -> Dict[str, Any]:
+    return _leg_cache.stats()
+
+async def _fetch_coordinates(address: str) -> Optional[Tuple[float, float]]:
     try:
-        url = "https://maps.googleapis.com/maps/api/geocode/json"
-        params = {
-            "address": address,
-            "key": GOOGLE_MAPS_API_KEY
-        }
-        response = requests.get(url, params=params, timeout=10)
-        data = response.json()
-        
+        data = await _maps_request("/geocode/json", {"address": address})
+
         if data["status"] == "OK" and data.get("results"):
             location = data["results"][0]["geometry"]["location"]
-            return (location["lat"], location["lng"])
+            coords = (location["lat"], location["lng"])
+            await store_coordinates(address, coords)
+            return coords
         else:
             logger.error(f"Geocoding failed: {data.get('status')}")
             return None
+    except asyncio.TimeoutError:
+        logger.error("Geocoding timed out")
+        return None
     except Exception as e:
         logger.error(f"Error in geocoding: {e}")
         return None
 
-def calculate_distance(origin: Tuple[float, float], destination: Tuple[float, float]) -> Optional[float]:
+async def get_coordinates(address: str) -> Optional[Tuple[float, float]]:
     """
-    Calculate distance in kilometers using Google Distance Matrix API
-    Returns: distance in km or None
+    Geocode address to latitude/longitude using Google Geocoding API.
+    Served from the geocode cache when the normalized address was seen before.
+    Returns: (latitude, longitude) or None
     """
-    if not GOOGLE_MAPS_API_KEY or GOOGLE_MAPS_API_KEY == "YOUR_GOOGLE_MAPS_API_KEY_HERE":
-        logger.warning("Google Maps API key not configured. Using mock distance.")
-        # Simple Haversine approximation for mock
-        from math import radians, cos, sin, asin, sqrt
-        lat1, lon1 = origin
-        lat2, lon2 = destination
-        lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
-        dlon = lon2 - lon1
-        dlat = lat2 - lat1
-        a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-        c = 2 * asin(sqrt(a))
-        km = 6371 * c
-        return round(km, 2)
-    
+    if not _api_key_configured():
+        logger.warning("Google Maps API key not configured. Using mock coordinates.")
+        # Mock response for development
+        return (40.7128, -74.0060)  # Default NYC coordinates
+
+    cached = await get_cached_coordinates(address)
+    if cached:
+        return cached
+
+    return await _single_flight.do(
+        ("geocode", normalize_address(address)),
+        lambda: _fetch_coordinates(address)
+    )
+
+def _estimated_directions(origin: Tuple[float, float], destination: Tuple[float, float]) -> Dict[str, Any]:
+    """Directions-shaped result from straight-line distance and the local ETA model"""
+    distance_km = round(haversine_km(origin, destination), 2)
+    duration_minutes = estimate_eta_minutes(origin, destination)
+    if duration_minutes is None:
+        duration_minutes = round(distance_km / FALLBACK_SPEED_KMH * 60, 2)
+    return {
+        "distance_km": distance_km,
+        "duration_minutes": duration_minutes,
+        "polyline": None,
+        "legs": [],
+        "estimated": True
+    }
+
+async def _fetch_directions(
+    cache_key: Tuple[str, str, str],
+    origin: Tuple[float, float],
+    destination: Tuple[float, float]
+) -> Optional[Dict[str, Any]]:
     try:
-        url = "https://maps.googleapis.com/maps/api/distancematrix/json"
-        params = {
-            "origins": f"{origin[0]},{origin[1]}",
-            "destinations": f"{destination[0]},{destination[1]}",
-            "key": GOOGLE_MAPS_API_KEY
-        }
-        response = requests.get(url, params=params, timeout=10)
-        data = response.json()
-        
-        if data["status"] == "OK" and data.get("rows"):
-            element = data["rows"][0]["elements"][0]
-            if element["status"] == "OK":
-                distance_meters = element["distance"]["value"]
-                return round(distance_meters / 1000, 2)  # Convert to km
-        
-        logger.error(f"Distance calculation failed: {data.get('status')}")
-        return None
+        data = await _maps_request("/directions/json", {
+            "origin": f"{origin[0]},{origin[1]}",
+            "destination": f"{destination[0]},{destination[1]}"
+        })
+
+        if data["status"] == "OK" and data.get("routes"):
+            route = data["routes"][0]
+            legs = [
+                {
+                    "distance_km": round(leg["distance"]["value"] / 1000, 2),
+                    "duration_minutes": round(leg["duration"]["value"] / 60, 2),
+                    "start_location": (leg["start_location"]["lat"], leg["start_location"]["lng"]) if leg.get("start_location") else None,
+                    "end_location": (leg["end_location"]["lat"], leg["end_location"]["lng"]) if leg.get("end_location") else None
+                }
+                for leg in route.get("legs", [])
+            ]
+            directions = {
+                "distance_km": round(sum(leg["distance_km"] for leg in legs), 2),
+                "duration_minutes": round(sum(leg["duration_minutes"] for leg in legs), 2),
+                "polyline": route.get("overview_polyline", {}).get("points"),
+                "legs": legs,
+                "estimated": False
+            }
+            _directions_cache.set(cache_key, directions)
+            return directions
+
+        logger.error(f"Directions request failed: {data.get('status')}")
+    except asyncio.TimeoutError:
+        logger.error("Directions request timed out")
     except Exception as e:
-        logger.error(f"Error calculating distance: {e}")
-        return None
+        logger.error(f"Error getting directions: {e}")
+    return None
+
+async def get_directions(origin: Tuple[float, float], destination: Tuple[float, float]) -> Dict[str, Any]:
+    """
+    Single Directions lookup shared by the ETA, polyline and distance helpers.
+    Results are cached per geohash cell pair for ROUTE_CACHE_TTL_SECONDS and
+    concurrent identical lookups are coalesced. When the API is not configured
+    or fails, an estimate is returned instead (estimated=True, no polyline).
+    Returns: dict with distance_km, duration_minutes, polyline, legs, estimated
+    """
+    if not _api_key_configured():
+        logger.warning("Google Maps API key not configured. Using estimated directions.")
+        return _estimated_directions(origin, destination)
+
+    cache_key = _route_cache_key("directions", origin, destination)
+    cached = _directions_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    directions = await _single_flight.do(cache_key, lambda: _fetch_directions(cache_key, origin, destination))
+    return directions or _estimated_directions(origin, destination)
+
+async def calculate_distance(origin: Tuple[float, float], destination: Tuple[float, float]) -> Optional[float]:
+    """
+    Road distance in kilometers (view over get_directions)
+    Returns: distance in km or None
+    """
+    directions = await get_directions(origin, destination)
+    return directions["distance_km"]
 
-def calculate_eta(driver_location: Tuple[float, float], destination: Tuple[float, float]) -> Optional[int]:
+async def calculate_eta(driver_location: Tuple[float, float], destination: Tuple[float, float]) -> Optional[int]:
     """
-    Calculate ETA in minutes using Google Directions API
+    ETA in minutes (view over get_directions). Falls back to the local ETA
+    model, then to a 30 km/h estimate, when the API is unavailable.
     Returns: ETA in minutes or None
     """
-    if not GOOGLE_MAPS_API_KEY or GOOGLE_MAPS_API_KEY == "YOUR_GOOGLE_MAPS_API_KEY_HERE":
-        logger.warning("Google Maps API key not configured. Using mock ETA.")
-        # Mock: assume 30 km/h average speed
-        distance = calculate_distance(driver_location, destination)
-        if distance:
-            return int((distance / 30) * 60)  # Convert to minutes
-        return 15  # Default 15 minutes
-    
-    try:
-        url = "https://maps.googleapis.com/maps/api/directions/json"
-        params = {
-            "origin": f"{driver_location[0]},{driver_location[1]}",
-            "destination": f"{destination[0]},{destination[1]}",
-            "key": GOOGLE_MAPS_API_KEY
-        }
-        response = requests.get(url, params=params, timeout=10)
-        data = response.json()
-        
-        if data["status"] == "OK" and data.get("routes"):
-            duration_seconds = data["routes"][0]["legs"][0]["duration"]["value"]
-            return int(duration_seconds / 60)  # Convert to minutes
-        
-        logger.error(f"ETA calculation failed: {data.get('status')}")
-        return None
-    except Exception as e:
-        logger.error(f"Error calculating ETA: {e}")
-        return None
+    directions = await get_directions(driver_location, destination)
+    return int(directions["duration_minutes"])
+
+async def calculate_live_eta(driver_location: Tuple[float, float], destination: Tuple[float, float]) -> Optional[int]:
+    """
+    ETA for high-frequency driver location updates.
+    Uses the local ETA model when one is trained; otherwise calculate_eta.
+    Returns: ETA in minutes or None
+    """
+    local_eta = estimate_eta_minutes(driver_location, destination)
+    if local_eta is not None:
+        return local_eta
+    return await calculate_eta(driver_location, destination)
 
-def get_route_polyline(origin: Tuple[float, float], destination: Tuple[float, float]) -> Optional[str]:
+async def get_route_polyline(origin: Tuple[float, float], destination: Tuple[float, float]) -> Optional[str]:
     """
-    Get encoded polyline for route using Google Directions API
+    Encoded polyline for the route (view over get_directions)
     Returns: encoded polyline string or None
     """
-    if not GOOGLE_MAPS_API_KEY or GOOGLE_MAPS_API_KEY == "YOUR_GOOGLE_MAPS_API_KEY_HERE":
-        logger.warning("Google Maps API key not configured. Cannot generate polyline.")
-        return None
-    
-    try:
-        url = "https://maps.googleapis.com/maps/api/directions/json"
-        params = {
-            "origin": f"{origin[0]},{origin[1]}",
-            "destination": f"{destination[0]},{destination[1]}",
-            "key": GOOGLE_MAPS_API_KEY
-        }
-        response = requests.get(url, params=params, timeout=10)
-        data = response.json()
-        
-        if data["status"] == "OK" and data.get("routes"):
-            polyline = data["routes"][0]["overview_polyline"]["points"]
-            return polyline
-        
-        logger.error(f"Polyline generation failed: {data.get('status')}")
-        return None
-    except Exception as e:
-        logger.error(f"Error getting polyline: {e}")
-        return None
+    directions = await get_directions(origin, destination)
+    return directions["polyline"]
 
-def optimize_route(
+async def _optimize_route_with_google(
     origin: Tuple[float, float],
     waypoints: List[Tuple[float, float]],
-    destination: Optional[Tuple[float, float]] = None
+    destination: Tuple[float, float]
 ) -> Optional[Dict[str, Any]]:
-    """
-    Optimize route order using Google Directions API (optimize:true).
-    Returns dict with waypoint order, distance, duration, polyline.
-    """
-    if not waypoints:
-        return None
-    
-    destination = destination or origin
-    
-    if not GOOGLE_MAPS_API_KEY or GOOGLE_MAPS_API_KEY == "YOUR_GOOGLE_MAPS_API_KEY_HERE":
-        logger.warning("Google Maps API key not configured. Returning original waypoint order.")
-        waypoint_order = list(range(len(waypoints)))
-        total_distance = 0.0
-        total_duration = 0.0
-        prev = origin
-        for idx in waypoint_order:
-            wp = waypoints[idx]
-            dist = calculate_distance(prev, wp) or 0
-            total_distance += dist
-            prev = wp
-        total_distance += calculate_distance(prev, destination) or 0
-        return {
-            "waypoint_order": waypoint_order,
-            "ordered_waypoints": waypoint_order,
-            "total_distance_km": round(total_distance, 2),
-            "total_duration_minutes": None,
-            "polyline": None
-        }
-    
     try:
         waypoints_param = "optimize:true|" + "|".join(f"{lat},{lng}" for lat, lng in waypoints)
-        url = "https://maps.googleapis.com/maps/api/directions/json"
-        params = {
+        data = await _maps_request("/directions/json", {
             "origin": f"{origin[0]},{origin[1]}",
             "destination": f"{destination[0]},{destination[1]}",
-            "waypoints": waypoints_param,
-            "key": GOOGLE_MAPS_API_KEY
-        }
-        response = requests.get(url, params=params, timeout=10)
-        data = response.json()
-        
+            "waypoints": waypoints_param
+        })
+
         if data["status"] != "OK" or not data.get("routes"):
             logger.error(f"Route optimization failed: {data.get('status')}")
             return None
-        
+
         route = data["routes"][0]
         waypoint_order = route.get("waypoint_order", list(range(len(waypoints))))
         legs = route.get("legs", [])
         total_distance = sum(leg["distance"]["value"] for leg in legs if leg.get("distance"))
         total_duration = sum(leg["duration"]["value"] for leg in legs if leg.get("duration"))
-        
+
         return {
             "waypoint_order": waypoint_order,
             "ordered_waypoints": waypoint_order,
             "total_distance_km": round(total_distance / 1000, 2) if total_distance else None,
             "total_duration_minutes": round(total_duration / 60, 2) if total_duration else None,
-            "polyline": route.get("overview_polyline", {}).get("points")
+            "polyline": route.get("overview_polyline", {}).get("points"),
+            "strategy": "google"
         }
+    except asyncio.TimeoutError:
+        logger.error("Route optimization timed out")
+        return None
     except Exception as e:
         logger.error(f"Error optimizing route: {e}")
-        return None
\ No newline at end of file
+        return None
+
+async def _optimize_route_locally(
+    origin: Tuple[float, float],
+    waypoints: List[Tuple[float, float]],
+    destination: Tuple[float, float],
+    time_limit_seconds: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Built-in solver over a distance matrix (road costs when the API is configured
+    and the stop count is within ROUTE_PLAN_ROAD_MATRIX_MAX_POINTS, straight-line
+    costs above it). The solver runs in the optimizer process pool within the
+    time budget.
+    """
+    points = [origin, *waypoints, destination]
+    if len(points) <= ROUTE_PLAN_ROAD_MATRIX_MAX_POINTS:
+        matrix = await get_distance_matrix(points, points)
+    else:
+        distance_km = haversine_matrix(points, points)
+        matrix = {"distance_km": distance_km, "duration_minutes": distance_km / FALLBACK_SPEED_KMH * 60}
+    route, _ = await run_in_pool(
+        solve_open_tsp,
+        matrix["duration_minutes"],
+        time_budget(time_limit_seconds, LOCAL_OPTIMIZER_TIME_LIMIT_SECONDS)
+    )
+
+    legs_from, legs_to = route[:-1], route[1:]
+    waypoint_order = [node - 1 for node in route[1:-1]]
+    return {
+        "waypoint_order": waypoint_order,
+        "ordered_waypoints": waypoint_order,
+        "total_distance_km": round(float(matrix["distance_km"][legs_from, legs_to].sum()), 2),
+        "total_duration_minutes": round(float(matrix["duration_minutes"][legs_from, legs_to].sum()), 2),
+        "polyline": None,
+        "strategy": "local"
+    }
+
+def _canonical_stops(
+    origin: Tuple[float, float],
+    waypoints: List[Tuple[float, float]],
+    destination: Tuple[float, float],
+    strategy: str
+) -> Tuple[str, List[int]]:
+    """
+    Hash of the quantized origin, destination and sorted stop cells, plus the
+    caller's waypoint index at each position of that canonical ordering.
+    """
+    cells = [geohash.encode(lat, lng, OPTIMIZE_CACHE_GEOHASH_PRECISION) for lat, lng in waypoints]
+    canonical = sorted(range(len(waypoints)), key=cells.__getitem__)
+    key_source = "|".join([
+        strategy,
+        geohash.encode(origin[0], origin[1], OPTIMIZE_CACHE_GEOHASH_PRECISION),
+        geohash.encode(destination[0], destination[1], OPTIMIZE_CACHE_GEOHASH_PRECISION),
+        *(cells[index] for index in canonical)
+    ])
+    return hashlib.sha1(key_source.encode()).hexdigest(), canonical
+
+def optimization_cache_stats() -> Dict[str, Any]:
+    return {
+        **_optimization_cache.stats(),
+        "geohash_precision": OPTIMIZE_CACHE_GEOHASH_PRECISION
+    }
+
+async def optimize_route(
+    origin: Tuple[float, float],
+    waypoints: List[Tuple[float, float]],
+    destination: Optional[Tuple[float, float]] = None,
+    strategy: str = "auto",
+    time_limit_seconds: Optional[float] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Optimize route order.
+    strategy "google" uses Directions API optimize:true (max 23 waypoints),
+    "local" uses the built-in TSP solver, "auto" picks Google when it is
+    configured and the stop count fits, otherwise the local solver, which
+    returns its best route within time_limit_seconds.
+    Results are cached by the quantized stop set regardless of the order the
+    stops are given in, and concurrent identical requests share one solve.
+    Returns dict with waypoint order, distance, duration, polyline, strategy.
+    """
+    if not waypoints:
+        return None
+
+    destination = destination or origin
+    cache_key, canonical = _canonical_stops(origin, waypoints, destination, strategy)
+
+    async def _solve_canonical() -> Dict[str, Any]:
+        result = await _solve_route(origin, waypoints, destination, strategy, time_limit_seconds)
+        # Store the visiting order as positions in the canonical ordering
+        position = {index: rank for rank, index in enumerate(canonical)}
+        entry = {**result, "waypoint_order": [position[index] for index in result["waypoint_order"]]}
+        _optimization_cache.set(cache_key, entry)
+        return entry
+
+    entry = _optimization_cache.get(cache_key)
+    if entry is None:
+        entry = await _single_flight.do(("optimize", cache_key), _solve_canonical)
+
+    waypoint_order = [canonical[rank] for rank in entry["waypoint_order"]]
+    return {**entry, "waypoint_order": waypoint_order, "ordered_waypoints": waypoint_order}
+
+async def _solve_route(
+    origin: Tuple[float, float],
+    waypoints: List[Tuple[float, float]],
+    destination: Tuple[float, float],
+    strategy: str,
+    time_limit_seconds: Optional[float]
+) -> Dict[str, Any]:
+    use_google = (
+        strategy != "local"
+        and _api_key_configured()
+        and len(waypoints) <= GOOGLE_MAX_OPTIMIZED_WAYPOINTS
+    )
+    if use_google:
+        result = await _optimize_route_with_google(origin, waypoints, destination)
+        if result:
+            return result
+        logger.warning("Falling back to local route optimization")
+    elif strategy == "google":
+        logger.warning("Google route optimization unavailable for this request. Using local solver.")
+
+    return await _optimize_route_locally(origin, waypoints, destination, time_limit_seconds)
+
+def _matrix_tiles(n_origins: int, n_destinations: int) -> List[Tuple[slice, slice]]:
+    """Split an N x M matrix into row/column blocks that respect the API limits"""
+    cols = min(n_destinations, MATRIX_MAX_DESTINATIONS, MATRIX_MAX_ELEMENTS)
+    rows = min(n_origins, MATRIX_MAX_ORIGINS, max(1, MATRIX_MAX_ELEMENTS // cols))
+    return [
+        (slice(r, min(r + rows, n_origins)), slice(c, min(c + cols, n_destinations)))
+        for r in range(0, n_origins, rows)
+        for c in range(0, n_destinations, cols)
+    ]
+
+async def _fetch_matrix_tile(
+    origins: List[Tuple[float, float]],
+    destinations: List[Tuple[float, float]]
+) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Fetch one tile. Returns (distance_km, duration_minutes) arrays with NaN
+    for cells the API could not route, or None if the whole tile failed.
+    """
+    try:
+        data = await _maps_request("/distancematrix/json", {
+            "origins": "|".join(f"{lat},{lng}" for lat, lng in origins),
+            "destinations": "|".join(f"{lat},{lng}" for lat, lng in destinations)
+        })
+    except asyncio.TimeoutError:
+        logger.error("Distance matrix tile timed out")
+        return None
+    except Exception as e:
+        logger.error(f"Error fetching distance matrix tile: {e}")
+        return None
+
+    if data.get("status") != "OK" or not data.get("rows"):
+        logger.error(f"Distance matrix tile failed: {data.get('status')}")
+        return None
+
+    distances = np.full((len(origins), len(destinations)), np.nan)
+    durations = np.full((len(origins), len(destinations)), np.nan)
+    for i, row in enumerate(data["rows"][:len(origins)]):
+        for j, element in enumerate(row.get("elements", [])[:len(destinations)]):
+            if element.get("status") == "OK":
+                distances[i, j] = element["distance"]["value"] / 1000
+                durations[i, j] = element["duration"]["value"] / 60
+    return distances, durations
+
+async def get_distance_matrix(
+    origins: List[Tuple[float, float]],
+    destinations: List[Tuple[float, float]]
+) -> Dict[str, Any]:
+    """
+    Road distance/duration matrix for any number of origins and destinations.
+    The request is split into tiles within Distance Matrix API limits, tiles are
+    fetched concurrently, and any cell that could not be fetched is filled with a
+    haversine estimate (flagged in the "estimated" mask).
+    Returns dict with N x M numpy arrays: distance_km, duration_minutes, estimated
+    """
+    n_origins, n_destinations = len(origins), len(destinations)
+    fallback_km = haversine_matrix(origins, destinations)
+    distances = np.full((n_origins, n_destinations), np.nan)
+    durations = np.full((n_origins, n_destinations), np.nan)
+
+    if n_origins and n_destinations and _api_key_configured():
+        tile_slots = asyncio.Semaphore(MATRIX_MAX_PARALLEL_TILES)
+        tiles = _matrix_tiles(n_origins, n_destinations)
+
+        async def _run_tile(rows: slice, cols: slice):
+            async with tile_slots:
+                return await _fetch_matrix_tile(origins[rows], destinations[cols])
+
+        results = await asyncio.gather(*(_run_tile(rows, cols) for rows, cols in tiles))
+        for (rows, cols), result in zip(tiles, results):
+            if result is not None:
+                distances[rows, cols], durations[rows, cols] = result
+    elif n_origins and n_destinations:
+        logger.warning("Google Maps API key not configured. Using haversine distance matrix.")
+
+    estimated = np.isnan(distances) | np.isnan(durations)
+    distances = np.where(estimated, fallback_km, distances)
+    durations = np.where(estimated, fallback_km / FALLBACK_SPEED_KMH * 60, durations)
+
+    return {
+        "distance_km": np.round(distances, 3),
+        "duration_minutes": np.round(durations, 2),
+        "estimated": estimated
+    }
+
+def store_leg_costs(
+    origins: List[Tuple[float, float]],
+    destinations: List[Tuple[float, float]],
+    distance_km: np.ndarray,
+    duration_minutes: np.ndarray,
+    estimated: np.ndarray
+):
+    """Remember road costs of individual legs origins[k] -> destinations[k]; estimates are skipped"""
+    for origin, destination, km, minutes, is_estimate in zip(origins, destinations, distance_km, duration_minutes, estimated):
+        if not is_estimate:
+            _leg_cache.set(_route_cache_key("leg", origin, destination), (float(km), float(minutes)))
+
+async def get_leg_costs(points: List[Tuple[float, float]]) -> Dict[str, Any]:
+    """
+    Road costs of consecutive legs points[k] -> points[k + 1].
+    Legs seen before (in a plan or a distance matrix) come from the leg
+    cache; the rest are looked up concurrently through get_directions.
+    Returns dict with (n - 1) numpy arrays: distance_km, duration_minutes, estimated
+    """
+    legs = list(zip(points[:-1], points[1:]))
+    distances = np.zeros(len(legs))
+    durations = np.zeros(len(legs))
+    estimated = np.zeros(len(legs), dtype=bool)
+    missing = []
+    for index, (origin, destination) in enumerate(legs):
+        cached = _leg_cache.get(_route_cache_key("leg", origin, destination))
+        if cached is None:
+            missing.append(index)
+        else:
+            distances[index], durations[index] = cached
+
+    results = await asyncio.gather(*(get_directions(*legs[index]) for index in missing))
+    for index, directions in zip(missing, results):
+        distances[index] = directions["distance_km"] or 0.0
+        durations[index] = directions["duration_minutes"] or 0.0
+        estimated[index] = directions["estimated"]
+        if not directions["estimated"]:
+            _leg_cache.set(_route_cache_key("leg", *legs[index]), (distances[index], durations[index]))
+
+    return {
+        "distance_km": distances,
+        "duration_minutes": durations,
+        "estimated": estimated
+    }
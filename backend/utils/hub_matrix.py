@@ -0,0 +1,248 @@
+import os
+import math
+import time
+import logging
+import numpy as np
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Optional, Tuple, Dict, Any, List
+from .distance import haversine_km
+from .eta_model import _zone_keys
+from .google_maps import get_distance_matrix
+
+logger = logging.getLogger(__name__)
+
+HUB_MATRIX_PATH = os.environ.get(
+    "HUB_MATRIX_PATH",
+    str(Path(__file__).resolve().parent.parent / "data" / "hub_matrix.npz")
+)
+# Delivery zone grid size in degrees (0.02 deg is roughly 2km)
+HUB_ZONE_SIZE_DEGREES = float(os.environ.get("HUB_ZONE_SIZE_DEGREES", "0.02"))
+# Zones need this many recent deliveries to get a column; at most this many zones are kept
+HUB_MIN_ZONE_ORDERS = int(os.environ.get("HUB_MIN_ZONE_ORDERS", "3"))
+HUB_MAX_ZONES = int(os.environ.get("HUB_MAX_ZONES", "500"))
+# Running processes check the matrix file for a newer version this often (seconds)
+HUB_MATRIX_RELOAD_SECONDS = float(os.environ.get("HUB_MATRIX_RELOAD_SECONDS", "300"))
+
+# The pickup must be this close (km) to the vendor location the row was built from
+HUB_PICKUP_MATCH_KM = 0.2
+# Below this straight-line distance (km) to the zone centroid, scaling the centroid
+# leg to the actual destination is too noisy and callers should route live
+HUB_MIN_CENTROID_KM = 0.5
+
+class HubMatrix:
+    """
+    Road distance/duration from each vendor pickup to each delivery zone centroid.
+
+    distance_km[v, z] and duration_minutes[v, z] are the road costs from
+    vendor_ids[v] (at vendor_locations[v]) to the centroid of zone zone_keys[z];
+    estimated[v, z] marks cells the maps API could not route.
+    """
+
+    def __init__(
+        self,
+        vendor_ids: np.ndarray,
+        vendor_locations: np.ndarray,
+        zone_keys: np.ndarray,
+        zone_centroids: np.ndarray,
+        distance_km: np.ndarray,
+        duration_minutes: np.ndarray,
+        estimated: np.ndarray,
+        zone_size: float = HUB_ZONE_SIZE_DEGREES,
+        built_at: Optional[str] = None
+    ):
+        self.vendor_ids = vendor_ids.astype(str)
+        self.vendor_locations = vendor_locations.astype(np.float64)
+        self.zone_keys = zone_keys.astype(np.int64)
+        self.zone_centroids = zone_centroids.astype(np.float64)
+        self.distance_km = distance_km.astype(np.float32)
+        self.duration_minutes = duration_minutes.astype(np.float32)
+        self.estimated = estimated.astype(bool)
+        self.zone_size = zone_size
+        self.built_at = built_at
+        self._vendor_index = {vendor_id: row for row, vendor_id in enumerate(self.vendor_ids)}
+        self._zone_index = {int(key): col for col, key in enumerate(self.zone_keys)}
+
+    def zone_of(self, location: Tuple[float, float]) -> Optional[int]:
+        row = math.floor((location[0] + 90.0) / self.zone_size)
+        col = math.floor((location[1] + 180.0) / self.zone_size)
+        return self._zone_index.get(row * 1_000_000 + col)
+
+    def leg(
+        self,
+        vendor_id: str,
+        pickup: Tuple[float, float],
+        destination: Tuple[float, float]
+    ) -> Optional[Dict[str, float]]:
+        """
+        Road cost from a vendor pickup to a destination, or None when the
+        matrix does not cover it (unknown vendor or zone, pickup away from
+        the vendor, destination next to the centroid, or an estimated cell).
+        The centroid leg is scaled by the ratio of straight-line distances
+        to the destination and to the centroid.
+        """
+        row = self._vendor_index.get(vendor_id)
+        col = self.zone_of(destination)
+        if row is None or col is None or self.estimated[row, col]:
+            return None
+        vendor_location = tuple(self.vendor_locations[row])
+        if haversine_km(pickup, vendor_location) > HUB_PICKUP_MATCH_KM:
+            return None
+        centroid_km = haversine_km(vendor_location, tuple(self.zone_centroids[col]))
+        if centroid_km < HUB_MIN_CENTROID_KM:
+            return None
+        scale = haversine_km(vendor_location, destination) / centroid_km
+        return {
+            "distance_km": round(float(self.distance_km[row, col]) * scale, 3),
+            "duration_minutes": round(float(self.duration_minutes[row, col]) * scale, 2)
+        }
+
+    def save(self, path: str = HUB_MATRIX_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # Write next to the target and rename so readers never load a partial file
+        partial = f"{path}.partial.npz"
+        np.savez_compressed(
+            partial,
+            vendor_ids=self.vendor_ids,
+            vendor_locations=self.vendor_locations,
+            zone_keys=self.zone_keys,
+            zone_centroids=self.zone_centroids,
+            distance_km=self.distance_km,
+            duration_minutes=self.duration_minutes,
+            estimated=self.estimated,
+            zone_size=np.float64(self.zone_size),
+            built_at=np.str_(self.built_at or "")
+        )
+        os.replace(partial, path)
+
+    @classmethod
+    def load(cls, path: str = HUB_MATRIX_PATH) -> "HubMatrix":
+        with np.load(path) as data:
+            return cls(
+                vendor_ids=data["vendor_ids"],
+                vendor_locations=data["vendor_locations"],
+                zone_keys=data["zone_keys"],
+                zone_centroids=data["zone_centroids"],
+                distance_km=data["distance_km"],
+                duration_minutes=data["duration_minutes"],
+                estimated=data["estimated"],
+                zone_size=float(data["zone_size"]),
+                built_at=str(data["built_at"]) or None
+            )
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "vendors": len(self.vendor_ids),
+            "zones": len(self.zone_keys),
+            "estimated_cells": int(self.estimated.sum()),
+            "built_at": self.built_at,
+            "zone_size_degrees": self.zone_size
+        }
+
+def delivery_zones(
+    latitudes: np.ndarray,
+    longitudes: np.ndarray,
+    zone_size: float = HUB_ZONE_SIZE_DEGREES,
+    min_orders: int = HUB_MIN_ZONE_ORDERS,
+    max_zones: int = HUB_MAX_ZONES
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Busiest delivery zones and the centroid of the deliveries in each.
+    Returns (zone_keys, centroids) with centroids as an (n, 2) lat/lng array.
+    """
+    keys = _zone_keys(latitudes, longitudes, zone_size)
+    zone_keys, zone_index, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    centroids = np.column_stack((
+        np.bincount(zone_index, weights=latitudes, minlength=len(zone_keys)) / np.maximum(counts, 1),
+        np.bincount(zone_index, weights=longitudes, minlength=len(zone_keys)) / np.maximum(counts, 1)
+    ))
+    busiest = np.argsort(-counts, kind="stable")[:max_zones]
+    busiest = np.sort(busiest[counts[busiest] >= min_orders])
+    return zone_keys[busiest], centroids[busiest]
+
+async def build_hub_matrix(db, days: int = 28, zone_size: float = HUB_ZONE_SIZE_DEGREES) -> HubMatrix:
+    """
+    Batch job: derive delivery zones from recent orders and fetch the road
+    matrix from every active vendor with a location to every zone centroid.
+    """
+    vendors = await db.vendors.find(
+        {"is_active": True, "latitude": {"$ne": None}, "longitude": {"$ne": None}},
+        {"_id": 0, "id": 1, "latitude": 1, "longitude": 1}
+    ).to_list(None)
+
+    since = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+    cursor = db.orders.find(
+        {"created_at": {"$gte": since}},
+        {"_id": 0, "delivery_latitude": 1, "delivery_longitude": 1}
+    )
+    latitudes, longitudes = [], []
+    async for order in cursor:
+        if order.get("delivery_latitude") is None or order.get("delivery_longitude") is None:
+            continue
+        latitudes.append(order["delivery_latitude"])
+        longitudes.append(order["delivery_longitude"])
+
+    zone_keys, centroids = delivery_zones(
+        np.asarray(latitudes, dtype=np.float64),
+        np.asarray(longitudes, dtype=np.float64),
+        zone_size
+    )
+    vendor_points: List[Tuple[float, float]] = [(vendor["latitude"], vendor["longitude"]) for vendor in vendors]
+    shape = (len(vendor_points), len(zone_keys))
+    if vendor_points and len(zone_keys):
+        matrix = await get_distance_matrix(vendor_points, [tuple(point) for point in centroids.tolist()])
+    else:
+        matrix = {"distance_km": np.zeros(shape), "duration_minutes": np.zeros(shape), "estimated": np.ones(shape, dtype=bool)}
+
+    return HubMatrix(
+        vendor_ids=np.array([vendor["id"] for vendor in vendors], dtype=str),
+        vendor_locations=np.asarray(vendor_points, dtype=np.float64).reshape(-1, 2),
+        zone_keys=zone_keys,
+        zone_centroids=centroids,
+        distance_km=matrix["distance_km"],
+        duration_minutes=matrix["duration_minutes"],
+        estimated=matrix["estimated"],
+        zone_size=zone_size,
+        built_at=datetime.now(timezone.utc).isoformat()
+    )
+
+_matrix: Optional[HubMatrix] = None
+_loaded_mtime: Optional[float] = None
+_checked_at = 0.0
+
+def load_hub_matrix(path: str = HUB_MATRIX_PATH) -> Optional[HubMatrix]:
+    """Load the precomputed matrix from disk if present (called on startup)"""
+    global _matrix, _loaded_mtime, _checked_at
+    _checked_at = time.monotonic()
+    if not os.path.exists(path):
+        logger.info(f"No hub matrix at {path}; fees and ETAs will use the maps API")
+        return None
+    try:
+        mtime = os.path.getmtime(path)
+        _matrix = HubMatrix.load(path)
+        _loaded_mtime = mtime
+        logger.info(f"Loaded hub matrix: {_matrix.info()}")
+    except Exception as e:
+        logger.error(f"Error loading hub matrix: {e}")
+    return _matrix
+
+def get_hub_matrix(path: str = HUB_MATRIX_PATH) -> Optional[HubMatrix]:
+    """Current matrix, reloaded when the job has written a newer file"""
+    global _checked_at
+    if time.monotonic() - _checked_at >= HUB_MATRIX_RELOAD_SECONDS:
+        try:
+            changed = os.path.getmtime(path) != _loaded_mtime
+        except OSError:
+            changed = False
+        if changed:
+            load_hub_matrix(path)
+        else:
+            _checked_at = time.monotonic()
+    return _matrix
+
+def hub_leg(vendor_id: str, pickup: Tuple[float, float], destination: Tuple[float, float]) -> Optional[Dict[str, float]]:
+    """Precomputed vendor -> destination road cost, or None when not covered"""
+    matrix = get_hub_matrix()
+    if matrix is None or not vendor_id:
+        return None
+    return matrix.leg(vendor_id, pickup, destination)
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs stay pollable for this long (seconds)
+JOB_RESULT_TTL_SECONDS = float(os.environ.get("JOB_RESULT_TTL_SECONDS", "3600"))
+JOB_REGISTRY_MAX_JOBS = 1000
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    owner_id: str
+    status: str = "queued"
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    finished_monotonic: Optional[float] = None
+    task: Optional[asyncio.Task] = None
+
+class JobRegistry:
+    """
+    In-process registry of background jobs for submit/poll APIs.
+    Each job runs as an asyncio task; its JSON-ready result (or error) is
+    kept for JOB_RESULT_TTL_SECONDS after it finishes.
+    """
+
+    def __init__(self, name: str, max_jobs: int = JOB_REGISTRY_MAX_JOBS, ttl_seconds: float = JOB_RESULT_TTL_SECONDS):
+        self.name = name
+        self.max_jobs = max_jobs
+        self.ttl_seconds = ttl_seconds
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self.submitted = 0
+        self.failed = 0
+
+    def submit(self, kind: str, owner_id: str, run: Callable[[], Awaitable[Dict[str, Any]]]) -> Job:
+        self._evict()
+        job = Job(id=str(uuid.uuid4()), kind=kind, owner_id=owner_id)
+        self._jobs[job.id] = job
+        self.submitted += 1
+        job.task = asyncio.ensure_future(self._run(job, run))
+        return job
+
+    async def _run(self, job: Job, run: Callable[[], Awaitable[Dict[str, Any]]]):
+        job.status = "running"
+        job.started_at = datetime.now(timezone.utc)
+        try:
+            job.result = await run()
+            job.status = "completed"
+        except Exception as e:
+            logger.error(f"{self.name} job {job.id} failed: {e}")
+            job.error = getattr(e, "detail", None) or str(e)
+            job.status = "failed"
+            self.failed += 1
+        finally:
+            job.finished_at = datetime.now(timezone.utc)
+            job.finished_monotonic = time.monotonic()
+            job.task = None
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def _evict(self):
+        now = time.monotonic()
+        for job_id in [
+            job.id for job in self._jobs.values()
+            if job.finished_monotonic is not None and now - job.finished_monotonic > self.ttl_seconds
+        ]:
+            del self._jobs[job_id]
+        while len(self._jobs) >= self.max_jobs:
+            finished = next((job.id for job in self._jobs.values() if job.finished_monotonic is not None), None)
+            if finished is None:
+                break
+            del self._jobs[finished]
+
+    def stats(self) -> Dict[str, Any]:
+        statuses: Dict[str, int] = {}
+        for job in self._jobs.values():
+            statuses[job.status] = statuses.get(job.status, 0) + 1
+        return {
+            "name": self.name,
+            "jobs": statuses,
+            "submitted": self.submitted,
+            "failed": self.failed
+        }
+
+# Global registry for route optimization jobs
+optimization_jobs = JobRegistry("optimization")
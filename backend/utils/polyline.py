@@ -0,0 +1,92 @@
+import math
+import numpy as np
+from typing import List, Sequence, Tuple
+
+Coordinate = Tuple[float, float]
+
+def _encode_value(value: int, out: List[str]):
+    value = ~(value << 1) if value < 0 else value << 1
+    while value >= 0x20:
+        out.append(chr((0x20 | (value & 0x1f)) + 63))
+        value >>= 5
+    out.append(chr(value + 63))
+
+def encode(points: Sequence[Coordinate], precision: int = 5) -> str:
+    """Encode coordinates with the Google encoded polyline algorithm"""
+    factor = 10 ** precision
+    out: List[str] = []
+    prev_lat = prev_lng = 0
+    for lat, lng in points:
+        lat_i = int(round(lat * factor))
+        lng_i = int(round(lng * factor))
+        _encode_value(lat_i - prev_lat, out)
+        _encode_value(lng_i - prev_lng, out)
+        prev_lat, prev_lng = lat_i, lng_i
+    return "".join(out)
+
+def decode(polyline: str, precision: int = 5) -> List[Coordinate]:
+    """Decode a Google encoded polyline into (latitude, longitude) pairs"""
+    factor = 10 ** precision
+    points: List[Coordinate] = []
+    index = lat = lng = 0
+    length = len(polyline)
+    while index < length:
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                byte = ord(polyline[index]) - 63
+                index += 1
+                result |= (byte & 0x1f) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lng += deltas[1]
+        points.append((lat / factor, lng / factor))
+    return points
+
+def simplify(points: Sequence[Coordinate], tolerance_m: float = 10.0) -> List[Coordinate]:
+    """
+    Douglas-Peucker simplification with a tolerance in meters.
+    Points are projected to a local equirectangular plane, which is accurate
+    at city scale. Perpendicular distances for each segment are computed in
+    one NumPy pass; recursion is replaced by an explicit stack.
+    """
+    n = len(points)
+    if n < 3 or tolerance_m <= 0:
+        return list(points)
+
+    coords = np.asarray(points, dtype=np.float64)
+    lat0 = math.radians(float(coords[:, 0].mean()))
+    xy = np.empty_like(coords)
+    xy[:, 0] = coords[:, 1] * 111320.0 * math.cos(lat0)
+    xy[:, 1] = coords[:, 0] * 110540.0
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        segment = xy[end] - xy[start]
+        offsets = xy[start + 1:end] - xy[start]
+        segment_length = math.hypot(segment[0], segment[1])
+        if segment_length == 0:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        else:
+            distances = np.abs(segment[0] * offsets[:, 1] - segment[1] * offsets[:, 0]) / segment_length
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance_m:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+
+    return [tuple(point) for point in coords[keep].tolist()]
+
+def trail_polyline(points: Sequence[Coordinate], tolerance_m: float = 10.0) -> str:
+    """Encoded polyline of a GPS trail after simplification"""
+    return encode(simplify(points, tolerance_m))
@@ -0,0 +1,375 @@
+import os
+import asyncio
+import logging
+import uuid
+import numpy as np
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from models import OrderStatus, PickupDeliveryStop, RoutePoint
+from solvers.insertion import best_insertion, best_pair_insertion
+from solvers.pdp import solve_pickup_delivery
+from solvers.pool import run_in_pool, time_budget
+from .google_maps import (
+    FALLBACK_SPEED_KMH,
+    ROUTE_PLAN_ROAD_MATRIX_MAX_POINTS,
+    get_distance_matrix,
+    get_leg_costs,
+    store_leg_costs
+)
+from .distance import haversine_matrix
+from .eta_tracker import eta_tracker
+from .polyline import encode as encode_polyline
+
+logger = logging.getLogger(__name__)
+
+ROUTE_PLAN_TIME_LIMIT_SECONDS = float(os.environ.get("ROUTE_PLAN_TIME_LIMIT_SECONDS", "3"))
+
+# Orders whose parcel is already on board only need their drop-off
+PICKED_UP_STATUSES = [OrderStatus.PICKED_UP, OrderStatus.OUT_FOR_DELIVERY]
+# Orders that belong on a driver's stored plan
+ACTIVE_DRIVER_STATUSES = [OrderStatus.DRIVER_ASSIGNED, *PICKED_UP_STATUSES]
+
+# Lazy initialization of MongoDB client
+_client = None
+_db = None
+
+def _get_db():
+    global _client, _db
+    if _db is None:
+        mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+        db_name = os.environ.get('DB_NAME', 'medex_delivery')
+        _client = AsyncIOMotorClient(mongo_url)
+        _db = _client[db_name]
+    return _db
+
+def order_stops(order: dict) -> List[PickupDeliveryStop]:
+    """Pickup and drop-off stops of an order (drop-off only once picked up)"""
+    delivery = PickupDeliveryStop(
+        latitude=order["delivery_latitude"],
+        longitude=order["delivery_longitude"],
+        label=order.get("customer_name"),
+        order_id=order["id"],
+        order_number=order.get("order_number"),
+        stop_type="delivery",
+        address=order.get("delivery_address")
+    )
+    if order.get("status") in PICKED_UP_STATUSES:
+        return [delivery]
+    pickup = PickupDeliveryStop(
+        latitude=order["pickup_latitude"],
+        longitude=order["pickup_longitude"],
+        order_id=order["id"],
+        order_number=order.get("order_number"),
+        stop_type="pickup",
+        address=order.get("pickup_address")
+    )
+    return [pickup, delivery]
+
+async def plan_cost_matrices(points: List[Tuple[float, float]]) -> Tuple[np.ndarray, np.ndarray, bool]:
+    """Distance (km) and duration (minutes) matrices between all plan points"""
+    if len(points) <= ROUTE_PLAN_ROAD_MATRIX_MAX_POINTS:
+        matrix = await get_distance_matrix(points, points)
+        return matrix["distance_km"], matrix["duration_minutes"], bool(matrix["estimated"].any())
+    distance_km = haversine_matrix(points, points)
+    return distance_km, distance_km / FALLBACK_SPEED_KMH * 60, True
+
+async def solve_order_run(
+    origin: RoutePoint,
+    orders: List[dict],
+    time_limit_seconds: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Optimized stop sequence for a set of orders where every order is picked
+    up before it is delivered. Orders already picked up contribute only their
+    drop-off. Returns dict with stops, totals and the estimated flag.
+    """
+    # Node 0 is the origin; every stop gets its own node
+    stops: List[PickupDeliveryStop] = []
+    pairs: List[Tuple[int, int]] = []
+    singles: List[int] = []
+    for order in orders:
+        stops_for_order = order_stops(order)
+        stops.extend(stops_for_order)
+        if len(stops_for_order) == 2:
+            pairs.append((len(stops) - 1, len(stops)))
+        else:
+            singles.append(len(stops))
+    points = [(origin.latitude, origin.longitude)] + [(stop.latitude, stop.longitude) for stop in stops]
+
+    distance_km, duration_minutes, estimated = await plan_cost_matrices(points)
+    route, total_duration = await run_in_pool(
+        solve_pickup_delivery,
+        duration_minutes,
+        pairs,
+        singles,
+        time_budget(time_limit_seconds, ROUTE_PLAN_TIME_LIMIT_SECONDS)
+    )
+
+    return {
+        "stops": [stops[node - 1] for node in route[1:]],
+        "total_distance_km": round(float(distance_km[route[:-1], route[1:]].sum()), 2),
+        "total_duration_minutes": round(total_duration, 2),
+        "estimated": estimated
+    }
+
+def _insertion_delta(
+    leg: np.ndarray,
+    to_node: np.ndarray,
+    from_node: np.ndarray,
+    pickup_to_drop: float,
+    edges: List[int]
+) -> float:
+    """Cost change of inserting new stops on the given edges (pickup first)"""
+    if len(edges) == 2 and edges[0] == edges[1]:
+        edge = edges[0]
+        return float(to_node[0, edge] + pickup_to_drop + from_node[1, edge] - leg[edge])
+    return float(sum(to_node[x, edge] + from_node[x, edge] - leg[edge] for x, edge in enumerate(edges)))
+
+async def insert_order_stops(
+    origin: RoutePoint,
+    stops: List[PickupDeliveryStop],
+    new_stops: List[PickupDeliveryStop]
+) -> Dict[str, Any]:
+    """
+    Place an order's new stops (pickup first) at the cheapest positions of
+    an existing sequence without reordering it. Existing legs come from the
+    leg cost cache; candidate costs are fetched once and cached for the next
+    insertion. Returns dict with stops, inserted_positions, deltas, totals
+    and the estimated flag.
+    """
+    sequence = [(origin.latitude, origin.longitude)] + [(stop.latitude, stop.longitude) for stop in stops]
+    new_points = [(stop.latitude, stop.longitude) for stop in new_stops]
+
+    legs, to_new, from_new = await asyncio.gather(
+        get_leg_costs(sequence),
+        get_distance_matrix(sequence, new_points),
+        get_distance_matrix(new_points, sequence[1:] + new_points)
+    )
+    for matrix, origins, destinations in (
+        (to_new, sequence, new_points),
+        (from_new, new_points, sequence[1:] + new_points)
+    ):
+        rows, cols = np.indices(matrix["distance_km"].shape)
+        store_leg_costs(
+            [origins[row] for row in rows.ravel()],
+            [destinations[col] for col in cols.ravel()],
+            matrix["distance_km"].ravel(),
+            matrix["duration_minutes"].ravel(),
+            matrix["estimated"].ravel()
+        )
+
+    # Per-edge costs: edge e joins sequence[e] -> sequence[e + 1], the last edge is the open end
+    n = len(stops)
+
+    def _edge_costs(kind: str):
+        leg = np.append(legs[kind], 0.0)
+        to_node = to_new[kind].T
+        from_node = np.hstack((from_new[kind][:, :n], np.zeros((len(new_stops), 1))))
+        pickup_to_drop = float(from_new[kind][0, n + 1]) if len(new_stops) == 2 else 0.0
+        return leg, to_node, from_node, pickup_to_drop
+
+    leg_minutes, to_minutes, from_minutes, pickup_to_drop_minutes = _edge_costs("duration_minutes")
+    if len(new_stops) == 2:
+        delta_minutes, pickup_edge, drop_edge = best_pair_insertion(
+            leg_minutes,
+            to_minutes[0], from_minutes[0],
+            to_minutes[1], from_minutes[1],
+            pickup_to_drop_minutes
+        )
+        edges = [pickup_edge, drop_edge]
+    else:
+        delta_minutes, edge = best_insertion(leg_minutes, to_minutes[0], from_minutes[0])
+        edges = [edge]
+    delta_km = _insertion_delta(*_edge_costs("distance_km"), edges)
+
+    # Edge e places a stop at index e of the stop list; insert the drop-off
+    # first so the pickup edge index stays valid and lands ahead of it
+    updated = list(stops)
+    for edge, stop in reversed(list(zip(edges, new_stops))):
+        updated.insert(edge, stop)
+    order_id = new_stops[0].order_id
+
+    return {
+        "stops": updated,
+        "inserted_positions": [index for index, stop in enumerate(updated) if stop.order_id == order_id],
+        "delta_distance_km": round(float(delta_km), 2),
+        "delta_duration_minutes": round(float(delta_minutes), 2),
+        "total_distance_km": round(float(legs["distance_km"].sum() + delta_km), 2),
+        "total_duration_minutes": round(float(legs["duration_minutes"].sum() + delta_minutes), 2),
+        "estimated": bool(legs["estimated"].any() or to_new["estimated"].any() or from_new["estimated"].any())
+    }
+
+# --- Stored plans (route_plans collection, one document per driver) ---
+
+def _driver_origin(driver: dict) -> Optional[RoutePoint]:
+    if driver.get("current_latitude") is None or driver.get("current_longitude") is None:
+        return None
+    return RoutePoint(latitude=driver["current_latitude"], longitude=driver["current_longitude"])
+
+def _plan_origin(driver: dict, plan: dict) -> Optional[RoutePoint]:
+    """Driver's live position, else the origin the plan was computed from"""
+    origin = _driver_origin(driver)
+    if origin is None and plan.get("origin"):
+        origin = RoutePoint(**plan["origin"])
+    return origin
+
+async def get_route_plan(driver_id: str) -> Optional[dict]:
+    return await _get_db().route_plans.find_one({"driver_id": driver_id}, {"_id": 0})
+
+async def save_route_plan(
+    driver: dict,
+    origin: Optional[RoutePoint],
+    result: Dict[str, Any],
+    expected_version: Optional[int] = None
+) -> Optional[dict]:
+    """
+    Store a driver's plan and bump its version. With expected_version the
+    write only succeeds if nobody changed the plan since it was read;
+    returns None on such a conflict. The polyline joins the origin and the
+    stops in planned order (straight segments, no Directions request).
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    path = [(origin.latitude, origin.longitude)] if origin else []
+    path += [(stop.latitude, stop.longitude) for stop in result["stops"]]
+    query: Dict[str, Any] = {"driver_id": driver["id"]}
+    if expected_version is not None:
+        query["version"] = expected_version
+    update = {
+        "$set": {
+            "vendor_id": driver.get("vendor_id"),
+            "status": "current",
+            "origin": origin.model_dump() if origin else None,
+            "stops": [stop.model_dump() for stop in result["stops"]],
+            "polyline": encode_polyline(path) if path else None,
+            "total_distance_km": result["total_distance_km"],
+            "total_duration_minutes": result["total_duration_minutes"],
+            "estimated": result.get("estimated", False),
+            "updated_at": now
+        },
+        "$inc": {"version": 1},
+        "$setOnInsert": {"id": str(uuid.uuid4()), "created_at": now}
+    }
+    try:
+        plan = await _get_db().route_plans.find_one_and_update(
+            query,
+            update,
+            upsert=expected_version is None,
+            return_document=ReturnDocument.AFTER
+        )
+    except Exception as e:
+        logger.error(f"Error saving route plan for driver {driver['id']}: {e}")
+        return None
+    if plan:
+        plan.pop("_id", None)
+    return plan
+
+async def invalidate_route_plan(driver_id: str):
+    """Mark a plan stale; the next read recomputes it"""
+    await _get_db().route_plans.update_one(
+        {"driver_id": driver_id},
+        {
+            "$set": {"status": "stale", "updated_at": datetime.now(timezone.utc).isoformat()},
+            "$inc": {"version": 1}
+        }
+    )
+
+async def build_route_plan(driver: dict, time_limit_seconds: Optional[float] = None) -> dict:
+    """Optimize the driver's active orders from scratch and store the result"""
+    orders = await _get_db().orders.find(
+        {"driver_id": driver["id"], "status": {"$in": ACTIVE_DRIVER_STATUSES}},
+        {"_id": 0}
+    ).to_list(None)
+    origin = _driver_origin(driver)
+    if orders:
+        origin = origin or RoutePoint(latitude=orders[0]["pickup_latitude"], longitude=orders[0]["pickup_longitude"])
+        result = await solve_order_run(origin, orders, time_limit_seconds)
+    else:
+        result = {"stops": [], "total_distance_km": 0.0, "total_duration_minutes": 0.0, "estimated": False}
+    return await save_route_plan(driver, origin, result)
+
+async def get_or_build_route_plan(driver: dict, refresh: bool = False) -> dict:
+    """Stored plan for a driver, recomputed only when missing, stale or refresh is requested"""
+    plan = await get_route_plan(driver["id"])
+    if plan and plan.get("status") == "current" and not refresh:
+        return plan
+    return await build_route_plan(driver)
+
+async def add_order_to_route_plan(driver_id: str, order: dict):
+    """
+    Patch a driver's current plan with a newly assigned order by cheapest
+    insertion. Without a current plan nothing is stored; the plan is built
+    on the next read.
+    """
+    plan = await get_route_plan(driver_id)
+    if not plan or plan.get("status") != "current":
+        return
+    stops = [PickupDeliveryStop(**stop) for stop in plan.get("stops", [])]
+    if any(stop.order_id == order["id"] for stop in stops):
+        return
+
+    driver = await _get_db().drivers.find_one({"id": driver_id}, {"_id": 0})
+    if not driver:
+        return
+    new_stops = order_stops(order)
+    origin = _plan_origin(driver, plan) or RoutePoint(latitude=new_stops[0].latitude, longitude=new_stops[0].longitude)
+    try:
+        result = await insert_order_stops(origin, stops, new_stops)
+    except Exception as e:
+        logger.error(f"Error patching route plan for driver {driver_id}: {e}")
+        await invalidate_route_plan(driver_id)
+        return
+    if await save_route_plan(driver, origin, result, expected_version=plan["version"]) is None:
+        await invalidate_route_plan(driver_id)
+
+async def remove_order_from_route_plan(driver_id: str, order_id: str, stop_type: Optional[str] = None):
+    """
+    Patch a driver's current plan after an order (or one of its stops, e.g.
+    the pickup once collected) left it. Totals are re-summed from cached
+    leg costs; the remaining sequence is kept.
+    """
+    plan = await get_route_plan(driver_id)
+    if not plan or plan.get("status") != "current":
+        return
+    stops = [PickupDeliveryStop(**stop) for stop in plan.get("stops", [])]
+    remaining = [
+        stop for stop in stops
+        if not (stop.order_id == order_id and (stop_type is None or stop.stop_type == stop_type))
+    ]
+    if len(remaining) == len(stops):
+        return
+
+    driver = await _get_db().drivers.find_one({"id": driver_id}, {"_id": 0})
+    if not driver:
+        return
+    origin = _plan_origin(driver, plan)
+    if origin is None and remaining:
+        origin = RoutePoint(latitude=remaining[0].latitude, longitude=remaining[0].longitude)
+    points = [(origin.latitude, origin.longitude)] if origin else []
+    points += [(stop.latitude, stop.longitude) for stop in remaining]
+    legs = await get_leg_costs(points)
+    result = {
+        "stops": remaining,
+        "total_distance_km": round(float(legs["distance_km"].sum()), 2),
+        "total_duration_minutes": round(float(legs["duration_minutes"].sum()), 2),
+        "estimated": bool(legs["estimated"].any())
+    }
+    if await save_route_plan(driver, origin, result, expected_version=plan["version"]) is None:
+        await invalidate_route_plan(driver_id)
+
+async def apply_order_status_change(order: dict, new_status: OrderStatus):
+    """
+    Side effects of an order status change, shared by every path that sets
+    one (API, WooCommerce sync and webhooks): finished orders stop being
+    ETA-tracked, and the driver's stored plan drops the stops left behind.
+    """
+    if new_status in (OrderStatus.DELIVERED, OrderStatus.CANCELLED):
+        eta_tracker.forget(order["id"])
+    driver_id = order.get("driver_id")
+    if not driver_id:
+        return
+    if new_status in PICKED_UP_STATUSES:
+        await remove_order_from_route_plan(driver_id, order["id"], stop_type="pickup")
+    elif new_status in (OrderStatus.DELIVERED, OrderStatus.CANCELLED):
+        await remove_order_from_route_plan(driver_id, order["id"])
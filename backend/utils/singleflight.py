@@ -0,0 +1,39 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+class SingleFlight:
+    """
+    Request coalescing: concurrent calls with the same key share one in-flight
+    coroutine and its result (or exception).
+
+    The shared call runs as its own task, so a caller that is cancelled
+    (e.g. a client disconnect) does not cancel the upstream request for
+    everyone else waiting on it.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "in_flight": len(self._inflight),
+            "calls": self.calls,
+            "coalesced": self.coalesced
+        }
@@ -0,0 +1,80 @@
+import math
+import time
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+class TimerWheel:
+    """
+    Hashed timing wheel: timers are bucketed into `slots` slots of
+    `tick_seconds` each, so scheduling and cancelling are O(1) and each tick
+    only looks at the timers in one slot. A timer further away than one turn
+    of the wheel carries a count of the remaining turns.
+
+    The wheel does not run by itself: call advance() periodically and handle
+    the payloads it returns. Deadlines are accurate to one tick. Not
+    thread-safe; intended for use from the single asyncio event loop.
+    """
+
+    def __init__(self, tick_seconds: float = 1.0, slots: int = 512):
+        self.tick_seconds = tick_seconds
+        self._slots: List[Dict[Hashable, Tuple[int, Any]]] = [{} for _ in range(slots)]
+        self._slot_of: Dict[Hashable, int] = {}
+        self._cursor = 0
+        self._ticks = 0
+        self._started_at = time.monotonic()
+        self.scheduled = 0
+        self.cancelled = 0
+        self.fired = 0
+
+    def schedule(self, key: Hashable, delay_seconds: float, payload: Any = None, now: Optional[float] = None):
+        """Fire payload after delay_seconds, replacing any timer with the same key"""
+        self.cancel(key)
+        # Counted from the current time, not from the cursor, which may lag behind it
+        elapsed = (now if now is not None else time.monotonic()) - self._started_at
+        due_tick = math.ceil((elapsed + max(0.0, delay_seconds)) / self.tick_seconds)
+        ticks = max(1, due_tick - self._ticks)
+        slot = (self._cursor + ticks) % len(self._slots)
+        self._slots[slot][key] = ((ticks - 1) // len(self._slots), payload)
+        self._slot_of[key] = slot
+        self.scheduled += 1
+
+    def cancel(self, key: Hashable) -> bool:
+        slot = self._slot_of.pop(key, None)
+        if slot is None:
+            return False
+        del self._slots[slot][key]
+        self.cancelled += 1
+        return True
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._slot_of
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def advance(self, now: Optional[float] = None) -> List[Any]:
+        """Move the wheel up to the current time and return the payloads that are due"""
+        due_ticks = int(((now if now is not None else time.monotonic()) - self._started_at) / self.tick_seconds)
+        fired = []
+        while self._ticks < due_ticks:
+            self._ticks += 1
+            self._cursor = (self._cursor + 1) % len(self._slots)
+            bucket = self._slots[self._cursor]
+            for key, (rounds, payload) in list(bucket.items()):
+                if rounds:
+                    bucket[key] = (rounds - 1, payload)
+                    continue
+                del bucket[key]
+                del self._slot_of[key]
+                fired.append(payload)
+        self.fired += len(fired)
+        return fired
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._slot_of),
+            "tick_seconds": self.tick_seconds,
+            "slots": len(self._slots),
+            "scheduled": self.scheduled,
+            "cancelled": self.cancelled,
+            "fired": self.fired
+        }